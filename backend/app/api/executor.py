@@ -0,0 +1,102 @@
+# backend/app/api/executor.py
+"""
+Bounded executor for CPU-bound ML work called from async route handlers.
+
+Handlers `await ml_executor.run(fn, ...)` instead of calling the ML code
+directly, so the event loop keeps serving other connections while a request
+is being computed. At most `max_workers` calls run at once and at most
+`max_queue` more wait for a worker; anything beyond that is rejected
+immediately with ExecutorSaturated (the routes turn it into 503 +
+Retry-After) so a burst cannot build an unbounded backlog.
+
+Settings (environment):
+  ML_EXECUTOR             "thread" (default) or "process"
+  ML_MAX_WORKERS          concurrent ML calls (default: min(4, CPU count))
+  ML_MAX_QUEUE            calls allowed to wait for a worker (default 32)
+  ML_RETRY_AFTER_SECONDS  Retry-After value sent with 503 (default 1)
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+ML_EXECUTOR = os.environ.get("ML_EXECUTOR", "thread")
+ML_MAX_WORKERS = int(os.environ.get("ML_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+ML_MAX_QUEUE = int(os.environ.get("ML_MAX_QUEUE", "32"))
+ML_RETRY_AFTER_SECONDS = int(os.environ.get("ML_RETRY_AFTER_SECONDS", "1"))
+
+
+class ExecutorSaturated(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("ML executor is saturated, retry later")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    def __init__(self, kind: str = ML_EXECUTOR, max_workers: int = ML_MAX_WORKERS,
+                 max_queue: int = ML_MAX_QUEUE, retry_after: int = ML_RETRY_AFTER_SECONDS):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind {kind!r}; expected 'thread' or 'process'")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._pool: Executor = None
+        self._in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Executor:
+        # Created lazily so importing the router never spawns threads/processes
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.kind == "process":
+                        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ml")
+        return self._pool
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the pool, or raise ExecutorSaturated.
+
+        The slot is released when the job finishes, not when the caller stops
+        waiting: a cancelled request (client gone, timeout) leaves its job
+        running on the pool, and that job still counts against the bound.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(self.retry_after)
+            self._in_flight += 1
+        try:
+            future = self._get_pool().submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+# Shared by every router doing ML work
+ml_executor = BoundedExecutor()
@@ -0,0 +1,94 @@
+# backend/app/api/routes/admin.py
+"""
+Admin endpoints for hot-swapping the served models / catalog.
+
+  POST /admin/reload     rebuild the snapshot in the background (202); with
+                         ?wait=true only answer once it is active
+  GET  /admin/snapshot   active / standby version, whether a rebuild is running
+  POST /admin/rollback   swap the previous snapshot back in
+  POST /admin/courses    {"upsert": [course, ...], "delete": [id, ...]}:
+                         incremental catalog changes by course id, applied
+                         as one snapshot (all or nothing; needs the semantic
+                         recommender loaded, see ml_engine/catalog_delta.py)
+
+See ml_engine/snapshot.py. Requests keep being served from the active
+snapshot while a new one builds. Each worker process has its own snapshot.
+
+Every request must send ADMIN_TOKEN in the X-Admin-Token header. Without a
+(non-empty) ADMIN_TOKEN configured the endpoints are disabled and answer 403.
+"""
+import hmac
+import os
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from ml_engine.snapshot import get_snapshot_manager
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+
+def _check_token(token: Optional[str]):
+    # Fail closed: no configured token means nobody may call these
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest((token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+class CourseChanges(BaseModel):
+    upsert: List[Dict[str, Any]] = Field(default_factory=list)
+    delete: List[Union[str, int]] = Field(default_factory=list)
+
+
+@router.post("/reload", response_model=Dict[str, Any])
+async def reload_snapshot(wait: bool = False, x_admin_token: Optional[str] = Header(None)):
+    _check_token(x_admin_token)
+    manager = get_snapshot_manager()
+    try:
+        # wait=True joins the builder thread: keep that off the event loop
+        status = await run_in_threadpool(manager.reload, wait)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return JSONResponse(status, status_code=200 if wait else 202)
+
+
+@router.get("/snapshot", response_model=Dict[str, Any])
+async def snapshot_status(x_admin_token: Optional[str] = Header(None)):
+    _check_token(x_admin_token)
+    return get_snapshot_manager().status()
+
+
+@router.post("/rollback", response_model=Dict[str, Any])
+async def rollback_snapshot(x_admin_token: Optional[str] = Header(None)):
+    _check_token(x_admin_token)
+    manager = get_snapshot_manager()
+    if not manager.rollback():
+        raise HTTPException(status_code=409, detail="No previous snapshot to roll back to")
+    return manager.status()
+
+
+@router.post("/courses", response_model=Dict[str, Any])
+async def change_courses(payload: CourseChanges, x_admin_token: Optional[str] = Header(None)):
+    _check_token(x_admin_token)
+    rec = get_snapshot_manager().recommender
+    if rec is None:
+        raise HTTPException(status_code=503, detail="Semantic recommender not loaded in this process")
+    # Upserts and deletes land in one snapshot: a rejected batch applies nothing
+    try:
+        changed = await run_in_threadpool(rec.change_courses, payload.upsert, payload.delete)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    out = {}
+    if payload.upsert:
+        out["upsert"] = {k: changed[k] for k in ("upserted", "encoded", "reused", "version")}
+    if payload.delete:
+        out["delete"] = {k: changed[k] for k in ("deleted", "missing", "version")}
+    out["version"] = changed["version"]
+    return out
@@ -4,11 +4,13 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 
+from app.api.executor import ExecutorSaturated, ml_executor
+
 # Try importing the ML function from possible locations.
 # This makes the router resilient whether your ml package is inside backend/ml_engine
 # or located at ../src (LearnPathAI-ML/src). Adjust later if needed.
 try:
-    from ml_engine.pathway_engine import generate_learning_pathway
+    from ml_engine.pathway_engine import generate_learning_pathway, generate_learning_pathway_batch
 except Exception:
     try:
         from src.pathway_engine import generate_learning_pathway
@@ -24,6 +26,20 @@ except Exception:
                 "recommended_certifications": ["Foundational cert (stub)"],
             }
 
+    # src/ and the stub have no batch entry point: loop over the single one
+    def generate_learning_pathway_batch(profiles):
+        return [
+            generate_learning_pathway(
+                user_profile=p.get("user_profile") or {},
+                current_skills=p.get("current_skills") or [],
+                career_aspiration=p.get("career_aspiration") or "",
+            )
+            for p in profiles
+        ]
+
+# Upper bound on learners per /recommendations/batch call
+MAX_BATCH_SIZE = 5000
+
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
@@ -34,18 +50,58 @@ class RecommendationRequest(BaseModel):
     career_aspiration: str = Field(..., example="Data Analyst")
 
 
+class BatchRecommendationRequest(BaseModel):
+    items: List[RecommendationRequest]
+
+
+def _saturated(e: ExecutorSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Recommendation service is busy, please retry",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 @router.post("/", response_model=Dict[str, Any])
 async def get_recommendations(payload: RecommendationRequest):
     """
     Accepts a user's profile + skills + aspiration and returns a recommended learning pathway.
+    The ML work runs on the bounded ML executor, never on the event loop.
     """
     try:
-        result = generate_learning_pathway(
+        result = await ml_executor.run(
+            generate_learning_pathway,
             user_profile=payload.user_profile,
             current_skills=payload.current_skills,
             career_aspiration=payload.career_aspiration,
         )
         return result
+    except ExecutorSaturated as e:
+        raise _saturated(e)
     except Exception as e:
         # In dev, return error string; in prod, hide internals.
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch", response_model=Dict[str, Any])
+async def get_recommendations_batch(payload: BatchRecommendationRequest):
+    """
+    Batch version of the endpoint above for re-profiling and cohort imports.
+    Returns {"results": [...]} in the same order as the submitted items.
+    """
+    if len(payload.items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} items per batch")
+    try:
+        results = await ml_executor.run(generate_learning_pathway_batch, [
+            {
+                "user_profile": item.user_profile,
+                "current_skills": item.current_skills,
+                "career_aspiration": item.career_aspiration,
+            }
+            for item in payload.items
+        ])
+        return {"results": results}
+    except ExecutorSaturated as e:
+        raise _saturated(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
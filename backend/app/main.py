@@ -23,6 +23,31 @@ except Exception as e:
     # Log to console for dev; in production use proper logging
     print("Warning: recommendations router not included:", e)
 
+try:
+    from app.api.routes.admin import router as admin_router
+    app.include_router(admin_router)
+except Exception as e:
+    print("Warning: admin router not included:", e)
+
+@app.on_event("startup")
+def _start_warm_up():
+    # Loading the clustering model imports scikit-learn (~2s); the initial
+    # snapshot (model + curated DB + warmed pathway cache) is built in the
+    # background so the app accepts connections immediately. A request that
+    # arrives first loads the pathway state itself. Under gunicorn's
+    # preload_app the master already loaded it: start() adopts that state
+    # instead of reloading it in every worker.
+    try:
+        from ml_engine.snapshot import get_snapshot_manager
+        get_snapshot_manager().start()
+    except Exception as e:
+        print("Warning: pathway cache warm-up skipped:", e)
+
+@app.on_event("shutdown")
+def _shutdown_ml_executor():
+    from app.api.executor import ml_executor
+    ml_executor.shutdown()
+
 # A simple root endpoint so you can see the app is live
 @app.get("/", tags=["root"])
 def read_root():
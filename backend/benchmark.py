@@ -0,0 +1,505 @@
+# backend/benchmark.py
+"""
+Performance checks for the ML engine.
+
+Usage (from the backend directory):
+    python benchmark.py index [--courses N] [--dim D] [--queries Q] [--nprobe P]
+        Recall@k and latency of the approximate course index vs. exact search
+        on a synthetic clustered catalog.
+
+    python benchmark.py exact [--courses N] [--queries Q]
+        Regression check: the float32 / argpartition ExactIndex must return the
+        same ranking as the original sklearn cosine_similarity + full argsort.
+        Exits non-zero on a mismatch.
+
+    python benchmark.py filters [--courses N] [--queries Q]
+        Latency of filtered (sector / NSQF level / duration) vs. unfiltered
+        exact search on a mock NSQF catalog.
+
+    python benchmark.py compression [--courses N] [--pca-dim D ...] [--rescore-factor R ...]
+        Recall@k, latency and resident bytes of the int8 / PCA+int8 compressed
+        index (full vectors memory-mapped for rescoring) vs. exact search.
+
+    python benchmark.py importtime [--runs R] [--scale S]
+        `python -X importtime` of the app / rule-based pathway / inference
+        client against per-module budgets; fails (exit 1) if a budget is
+        exceeded or a heavy dependency (torch, sklearn, pandas, ...) is
+        imported eagerly.
+
+    python benchmark.py workers [--workers 1 2 4] [--seconds S] [--semantic]
+        Preload-then-fork vs. independently loading workers: per-worker
+        RSS / PSS / private memory and total throughput of the pathway
+        (and, with --semantic, recommend()) path vs. worker count.
+
+    python benchmark.py encoder [--backend torch|onnx] [--precision int8|float32]
+        Latency of an optimized encoder (int8 quantization / ONNX Runtime) vs.
+        the float32 torch model, and the top-5 overlap of recommend() results
+        between the two on the course catalog. Needs sentence-transformers.
+
+    python benchmark.py retrieval [--courses N] [--queries Q]
+        BM25 index build time / bytes per posting, and per-query latency and
+        keyword precision@k (share of hits containing the queried skill) of
+        lexical, hybrid and dense retrieval. Dense / hybrid need
+        sentence-transformers; without it only the lexical mode is measured.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to sys.path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_catalog(n: int, dim: int, n_topics: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors; a rough stand-in for course embeddings."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    labels = rng.integers(0, n_topics, size=n)
+    return topics[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def synthetic_queries(catalog: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    """Queries near (but not on) catalog items."""
+    rng = np.random.default_rng(seed)
+    picks = catalog[rng.integers(0, len(catalog), size=n)]
+    return picks + 0.3 * rng.normal(size=picks.shape).astype(np.float32)
+
+
+def bench_index(args):
+    from backend.ml_engine.course_index import ExactIndex, build_index, measure_recall
+
+    print(f"Building synthetic catalog: {args.courses} x {args.dim}")
+    catalog = synthetic_catalog(args.courses, args.dim)
+    queries = synthetic_queries(catalog, args.queries)
+    exact = ExactIndex(catalog)
+
+    for nprobe in args.nprobe:
+        index = build_index(catalog, "ivf", nprobe=nprobe)
+        stats = measure_recall(index, exact, queries, top_k=args.top_k)
+        print(
+            f"ivf n_lists={index.n_lists:<5} nprobe={nprobe:<4} "
+            f"recall@{args.top_k}={stats[f'recall@{args.top_k}']:.3f}  "
+            f"{stats['latency_ms']:.3f} ms/query vs exact {stats['reference_latency_ms']:.3f} ms "
+            f"({stats['speedup']:.1f}x)"
+        )
+
+
+def legacy_top_k(catalog: np.ndarray, query: np.ndarray, top_k: int):
+    """The original PathwayRecommender.recommend scoring, kept as the reference."""
+    from sklearn.metrics.pairwise import cosine_similarity
+    sims = cosine_similarity(np.asarray(query, dtype=np.float64).reshape(1, -1),
+                             np.asarray(catalog, dtype=np.float64))[0]
+    top = sims.argsort()[::-1][:top_k]
+    return top, sims[top]
+
+
+def bench_exact(args):
+    from backend.ml_engine.course_index import ExactIndex
+
+    catalog = synthetic_catalog(args.courses, args.dim)
+    queries = synthetic_queries(catalog, args.queries)
+    index = ExactIndex(catalog)
+
+    mismatches = 0
+    legacy_time = new_time = 0.0
+    for q in queries:
+        start = time.perf_counter()
+        ref_idx, ref_scores = legacy_top_k(catalog, q, args.top_k)
+        legacy_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        idx, scores = index.search(q, args.top_k)
+        new_time += time.perf_counter() - start
+
+        # Scores must agree to float32 precision; indices may only differ
+        # where two courses are tied at that precision.
+        if not np.allclose(scores, ref_scores, atol=1e-5):
+            mismatches += 1
+        elif not np.array_equal(idx, ref_idx):
+            differ = idx != ref_idx
+            if not np.allclose(scores[differ], ref_scores[differ], atol=1e-6):
+                mismatches += 1
+
+    n = len(queries)
+    print(
+        f"exact: {n} queries over {args.courses} courses, {mismatches} ranking mismatches; "
+        f"{1000 * new_time / n:.3f} ms/query vs legacy {1000 * legacy_time / n:.3f} ms "
+        f"({legacy_time / new_time:.1f}x)"
+    )
+    if mismatches:
+        sys.exit(1)
+
+
+def bench_filters(args):
+    from backend.data.loader import generate_mock_nsqf_courses
+    from backend.ml_engine.course_filters import CourseFilterIndex
+    from backend.ml_engine.course_index import ExactIndex
+
+    courses = generate_mock_nsqf_courses(args.courses)
+    catalog = synthetic_catalog(args.courses, args.dim)
+    queries = synthetic_queries(catalog, args.queries)
+    index = ExactIndex(catalog)
+    filter_index = CourseFilterIndex(courses)
+
+    cases = [
+        ("unfiltered", None),
+        ("sector", {"sector": "Healthcare"}),
+        ("sector+level", {"sector": "Healthcare", "nsqf_level": 5}),
+        ("sector+level+provider", {"sector": "Healthcare", "nsqf_level": 5,
+                                   "provider": "National Skill Training Institute - North"}),
+        ("duration<=150", {"duration_hours": {"max": 150}}),
+    ]
+    for name, filters in cases:
+        start = time.perf_counter()
+        for q in queries:
+            candidates = filter_index.candidates(filters)
+            index.search(q, args.top_k, candidates=candidates)
+        elapsed = time.perf_counter() - start
+        n_candidates = args.courses if filters is None else len(filter_index.candidates(filters))
+        print(f"{name:<24} candidates={n_candidates:<8} {1000 * elapsed / len(queries):.3f} ms/query")
+
+
+def bench_compression(args):
+    import tempfile
+    from backend.ml_engine.course_index import CompressedIndex, ExactIndex, measure_recall
+
+    print(f"Building synthetic catalog: {args.courses} x {args.dim}")
+    catalog = synthetic_catalog(args.courses, args.dim)
+    queries = synthetic_queries(catalog, args.queries)
+    exact = ExactIndex(catalog)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Rescoring reads the full vectors through a memory map, as in production
+        path = os.path.join(tmp, "vectors.npy")
+        np.save(path, exact.vectors)
+        mapped = np.load(path, mmap_mode="r")
+        full_bytes = exact.vectors.nbytes
+
+        for pca_dim in args.pca_dim:
+            for factor in args.rescore_factor:
+                index = CompressedIndex(mapped, pca_dim=pca_dim or None, rescore_factor=factor)
+                stats = measure_recall(index, exact, queries, top_k=args.top_k)
+                per_million = index.nbytes() / args.courses * 1_000_000 / 2**20
+                print(
+                    f"{'int8' if not pca_dim else f'pca{pca_dim}+int8':<12} rescore x{factor:<3} "
+                    f"recall@{args.top_k}={stats[f'recall@{args.top_k}']:.3f}  "
+                    f"{stats['latency_ms']:.3f} ms/query vs exact {stats['reference_latency_ms']:.3f} ms  "
+                    f"RAM {index.nbytes() / 2**20:.1f} MiB vs {full_bytes / 2**20:.1f} MiB "
+                    f"(~{per_million:.0f} MiB per 1M courses)"
+                )
+            del index
+
+
+SAMPLE_ASPIRATIONS = [
+    "Data Analyst", "I want to become a data scientist", "Machine learning engineer",
+    "Web developer with React", "Cloud / DevOps engineer", "Cybersecurity analyst",
+    "Electrician in the power sector", "Healthcare assistant", "Retail store manager",
+    "Automotive service technician", "Graphic designer", "Software developer",
+]
+SAMPLE_SKILLS = ["python", "sql", "excel", "javascript", "react", "docker", "aws",
+                 "communication", "wiring", "customer service", "java", "linux"]
+
+
+def sample_user_texts(n: int, seed: int = 0):
+    from backend.ml_engine.features import build_profile_text
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(n):
+        asp = SAMPLE_ASPIRATIONS[rng.integers(len(SAMPLE_ASPIRATIONS))]
+        skills = list(rng.choice(SAMPLE_SKILLS, size=rng.integers(1, 5), replace=False))
+        texts.append(build_profile_text(asp, skills))
+    return texts
+
+
+# module -> import-time budget in ms (measured from the backend directory)
+IMPORT_BUDGETS_MS = {
+    "inference": 100,                  # thin client: stdlib only
+    "ml_engine.pathway_engine": 300,   # rule-based path: numpy, no sklearn
+    "ml_engine.recommender": 400,      # semantic path: torch deferred to first encode
+    "app.main": 900,                   # FastAPI app incl. router (fastapi itself ~0.4s)
+}
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "sklearn", "scipy", "pandas", "joblib")
+
+
+def measure_import(module: str, runs: int = 3):
+    """(best cumulative import time in ms, heavy modules loaded, top self-time entries)."""
+    import subprocess
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    best, heavy, top = None, [], []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=backend_dir, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+        entries = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            parts = line[len("import time:"):].split("|")
+            try:
+                entries.append((int(parts[0]), int(parts[1]), parts[2].strip()))
+            except ValueError:
+                continue  # header line
+        total = next((cum for _, cum, name in entries if name == module), None)
+        if total is not None and (best is None or total < best):
+            best = total
+            top = sorted(entries, reverse=True)[:5]
+        heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return (best or 0) / 1000, heavy, top
+
+
+def bench_importtime(args):
+    failed = False
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        budget *= args.scale
+        ms, heavy, top = measure_import(module, args.runs)
+        ok = ms <= budget and not heavy
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<26} {ms:8.1f} ms (budget {budget:.0f} ms)"
+              + (f"  heavy imports: {', '.join(heavy)}" if heavy else ""))
+        if not ok or args.verbose:
+            for self_us, _, name in top:
+                print(f"       {self_us / 1000:7.1f} ms self  {name}")
+    if failed:
+        sys.exit(1)
+
+
+SAMPLE_PROFILES = [
+    {"user_profile": {"avg_score": s, "experience_years": y}, "current_skills": sk, "career_aspiration": a}
+    for s in (0.3, 0.55, 0.8) for y in (0, 2, 5)
+    for sk in (["python"], ["excel", "sql"], ["java", "docker", "aws"])
+    for a in ("Data Analyst", "Data Scientist", "Web Developer", "Software Engineer")
+]
+
+
+def _worker_loop(n_workers, preloaded, semantic, ready, go, seconds, results):
+    from backend.ml_engine.preload import partition_threads, preload
+    partition_threads(n_workers)  # as gunicorn.conf.py's post_fork does
+    if not preloaded:
+        preload(semantic=semantic, freeze=False)  # every worker loads its own copy
+    from backend.ml_engine.pathway_engine import generate_learning_pathway
+    rec = None
+    if semantic:
+        from backend.ml_engine.features import get_recommender
+        rec = get_recommender()
+    ready.wait()
+    go.wait()
+    done, i = 0, 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        p = SAMPLE_PROFILES[i % len(SAMPLE_PROFILES)]
+        generate_learning_pathway(**p)
+        if rec is not None:
+            rec.recommend(f"Aspiration: {p['career_aspiration']}. Skills: {', '.join(p['current_skills'])}.")
+        done += 1
+        i += 7
+    results.put(done)
+
+
+def _run_workers(n_workers, preloaded, semantic, seconds, out):
+    """Coordinator (fresh interpreter): optionally preload, fork n workers, measure."""
+    import multiprocessing as mp
+    from backend.ml_engine.preload import memory_usage, preload
+    if preloaded:
+        preload(semantic=semantic)
+    fork = mp.get_context("fork")
+    ready = fork.Barrier(n_workers + 1)
+    go = fork.Barrier(n_workers + 1)
+    results = fork.Queue()
+    procs = []
+    for w in range(n_workers):
+        proc = fork.Process(target=_worker_loop, args=(n_workers, preloaded, semantic, ready, go, seconds, results))
+        proc.start()
+        procs.append(proc)
+    ready.wait()  # all workers loaded
+    go.wait()
+    time.sleep(seconds / 2)
+    mem = [memory_usage(p.pid) for p in procs]
+    total = sum(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+    out.put({
+        "rss": np.mean([m.get("rss", 0) for m in mem]),
+        "pss": np.mean([m.get("pss", 0) for m in mem]),
+        "private": np.mean([m.get("private", 0) for m in mem]),
+        "throughput": total / seconds,
+    })
+
+
+def bench_workers(args):
+    import multiprocessing as mp
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("workers: needs Linux /proc/<pid>/smaps_rollup for PSS")
+        sys.exit(2)
+    spawn = mp.get_context("spawn")  # every configuration starts from a clean interpreter
+    print(f"{'mode':<12} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'private':>9} {'req/s':>9}")
+    for preloaded in (False, True):
+        for n in args.workers:
+            out = spawn.Queue()
+            coordinator = spawn.Process(target=_run_workers, args=(n, preloaded, args.semantic, args.seconds, out))
+            coordinator.start()
+            r = out.get()
+            coordinator.join()
+            print(f"{'preload' if preloaded else 'independent':<12} {n:>7} "
+                  f"{r['rss'] / 2**20:>9.1f}MB {r['pss'] / 2**20:>9.1f}MB {r['private'] / 2**20:>7.1f}MB "
+                  f"{r['throughput']:>9.0f}")
+
+
+def bench_encoder(args):
+    from backend.data.loader import generate_mock_nsqf_courses
+    from backend.ml_engine.recommender import PathwayRecommender
+
+    def make(backend, precision):
+        return PathwayRecommender(model_name=args.model, backend=backend, precision=precision, batching=False)
+
+    baseline = make("torch", "float32")
+    if baseline.vectorizer is None:
+        print("encoder: sentence-transformers is not installed; nothing to compare")
+        sys.exit(2)
+    candidate = make(args.backend, args.precision)
+    # No batching / cache: measure the model itself
+    baseline.embedding_cache = candidate.embedding_cache = None
+
+    texts = sample_user_texts(args.queries)
+    courses = generate_mock_nsqf_courses(args.courses)
+
+    def latency(rec):
+        rec.encode(texts[:4])  # warm-up
+        start = time.perf_counter()
+        for t in texts:
+            rec.encode([t])
+        single = 1000 * (time.perf_counter() - start) / len(texts)
+        start = time.perf_counter()
+        rec.encode(texts)
+        batched = 1000 * (time.perf_counter() - start) / len(texts)
+        return single, batched
+
+    base_single, base_batched = latency(baseline)
+    cand_single, cand_batched = latency(candidate)
+    name = f"{args.backend}/{args.precision}"
+    print(f"torch/float32  {base_single:.2f} ms/query single, {base_batched:.2f} ms/query batched")
+    print(f"{name:<14} {cand_single:.2f} ms/query single, {cand_batched:.2f} ms/query batched "
+          f"({base_single / cand_single:.2f}x / {base_batched / cand_batched:.2f}x)")
+
+    # Each model ranks the catalog with its own course vectors, as in production
+    baseline.fit_courses(courses)
+    candidate.fit_courses(courses)
+    overlaps = []
+    for t in texts:
+        ref = {c["id"] for c in baseline.recommend(t, top_k=args.top_k, mode="dense")}
+        got = {c["id"] for c in candidate.recommend(t, top_k=args.top_k, mode="dense")}
+        overlaps.append(len(ref & got) / max(1, len(ref)))
+    print(f"top-{args.top_k} overlap vs torch/float32 over {len(texts)} queries, {args.courses} courses: "
+          f"mean {np.mean(overlaps):.3f}, min {np.min(overlaps):.3f}")
+
+
+def bench_retrieval(args):
+    import random
+    from backend.data.loader import generate_mock_nsqf_courses
+    from backend.ml_engine.course_store import CourseStore
+    from backend.ml_engine.lexical_index import LexicalIndex
+    from backend.ml_engine.recommender import PathwayRecommender
+
+    courses = generate_mock_nsqf_courses(args.courses)
+    store = CourseStore.from_records(courses)
+    start = time.perf_counter()
+    lexical = LexicalIndex.build(store)
+    build = time.perf_counter() - start
+    print(f"BM25 index: {len(store)} courses, {len(lexical.vocab)} terms, {len(lexical.rows)} postings, "
+          f"built in {build:.2f}s, {lexical.nbytes() / 2**20:.1f} MiB "
+          f"({lexical.nbytes() / max(1, len(lexical.rows)):.1f} bytes/posting)")
+
+    # Exact-keyword queries: one skill of a random course
+    rng = random.Random(0)
+    keywords = [rng.choice(c["skills"].split(", ")) for c in rng.sample(courses, min(args.queries, len(courses)))]
+
+    rec = PathwayRecommender(batching=False)
+    rec.embedding_cache = None  # measure the model, not the cache
+    rec.set_catalog(store, rec.embed_catalog(store), lexical=lexical)
+    modes = ["lexical"] + (["hybrid", "dense"] if rec.encoder_available else [])
+    if not rec.encoder_available:
+        print("sentence-transformers is not installed: dense / hybrid skipped")
+    for mode in modes:
+        rec.recommend(keywords[0], top_k=args.top_k, mode=mode)  # warm-up
+        precision = []
+        start = time.perf_counter()
+        for kw in keywords:
+            hits = rec.recommend(kw, top_k=args.top_k, mode=mode)
+            precision.append(sum(kw.lower() in f"{h['title']} {h.get('skills', '')}".lower() for h in hits)
+                             / args.top_k)
+        ms = 1000 * (time.perf_counter() - start) / len(keywords)
+        print(f"{mode:<8} {ms:8.2f} ms/query   keyword precision@{args.top_k} {np.mean(precision):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("index", help="ANN index recall/latency vs. exact search")
+    p.add_argument("--courses", type=int, default=50000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=5)
+    p.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    p.set_defaults(func=bench_index)
+
+    p = sub.add_parser("exact", help="exact search regression check vs. the legacy ranking")
+    p.add_argument("--courses", type=int, default=20000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=5)
+    p.set_defaults(func=bench_exact)
+
+    p = sub.add_parser("filters", help="filtered vs. unfiltered search latency")
+    p.add_argument("--courses", type=int, default=100000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=100)
+    p.add_argument("--top-k", type=int, default=5)
+    p.set_defaults(func=bench_filters)
+
+    p = sub.add_parser("compression", help="compressed index recall/latency/memory vs. exact search")
+    p.add_argument("--courses", type=int, default=100000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=5)
+    p.add_argument("--pca-dim", type=int, nargs="+", default=[0, 128, 64], help="0 = int8 without PCA")
+    p.add_argument("--rescore-factor", type=int, nargs="+", default=[0, 10])
+    p.set_defaults(func=bench_compression)
+
+    p = sub.add_parser("importtime", help="import-time budget check (no eager heavy dependencies)")
+    p.add_argument("--runs", type=int, default=3, help="best of R fresh interpreters")
+    p.add_argument("--scale", type=float, default=1.0, help="multiply budgets (slow CI machines)")
+    p.add_argument("--verbose", action="store_true", help="show the slowest modules even when within budget")
+    p.set_defaults(func=bench_importtime)
+
+    p = sub.add_parser("workers", help="preload-then-fork vs. independent workers: memory and throughput")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--seconds", type=float, default=4.0)
+    p.add_argument("--semantic", action="store_true", help="also preload / exercise the SBERT recommender")
+    p.set_defaults(func=bench_workers)
+
+    p = sub.add_parser("encoder", help="optimized encoder speedup and top-k overlap vs. float32")
+    p.add_argument("--model", default="all-MiniLM-L6-v2")
+    p.add_argument("--backend", choices=["torch", "onnx"], default="torch")
+    p.add_argument("--precision", choices=["float32", "int8"], default="int8")
+    p.add_argument("--courses", type=int, default=2000)
+    p.add_argument("--queries", type=int, default=100)
+    p.add_argument("--top-k", type=int, default=5)
+    p.set_defaults(func=bench_encoder)
+
+    p = sub.add_parser("retrieval", help="BM25 index size, lexical / hybrid / dense latency and keyword precision")
+    p.add_argument("--courses", type=int, default=20000)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=5)
+    p.set_defaults(func=bench_retrieval)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
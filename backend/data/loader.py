@@ -52,9 +52,20 @@ def generate_mock_nsqf_courses(count: int = 50) -> List[Dict]:
         
     return courses
 
-def save_mock_data(courses: List[Dict], filepath: str):
+def save_mock_data(courses: List[Dict], filepath: str, ndjson: bool = None):
+    """
+    Write courses as a pretty-printed JSON array, or as NDJSON (one compact
+    course per line, streamable) when ndjson=True or the path ends in
+    .ndjson / .jsonl.
+    """
+    if ndjson is None:
+        ndjson = filepath.endswith((".ndjson", ".jsonl"))
     with open(filepath, 'w') as f:
-        json.dump(courses, f, indent=2)
+        if ndjson:
+            for course in courses:
+                f.write(json.dumps(course) + "\n")
+        else:
+            json.dump(courses, f, indent=2)
 
 if __name__ == "__main__":
     # Test generation
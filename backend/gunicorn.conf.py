@@ -0,0 +1,40 @@
+# backend/gunicorn.conf.py
+"""
+Multi-worker serving: load ml_engine state once, then fork.
+
+    cd backend
+    gunicorn -c gunicorn.conf.py
+
+The app module is imported in the master (preload_app), the master loads the
+clustering model / pathway cache (and, with ML_PRELOAD_SEMANTIC=1, SBERT and
+the memory-mapped catalog bundle) and freezes the GC, and only then are the
+workers forked. Workers share those pages copy-on-write instead of each
+loading its own copy; each one gets its share of the CPUs for torch / BLAS
+threads. `python benchmark.py workers` measures RSS / PSS and throughput.
+
+Settings (environment):
+  BIND              address to listen on (default 0.0.0.0:8000)
+  WEB_CONCURRENCY   number of workers (default: CPU count, at most 8)
+  ML_EXECUTOR and friends (app/api/executor.py) still apply per worker;
+  keep ML_MAX_WORKERS small, the CPUs are already split between workers.
+"""
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", str(min(8, os.cpu_count() or 1))))
+worker_class = "uvicorn.workers.UvicornWorker"
+wsgi_app = "app.main:app"
+preload_app = True
+
+
+def when_ready(server):
+    # Master, after the app is imported and before any worker is forked
+    from ml_engine.preload import preload
+    summary = preload()
+    server.log.info("ml_engine preloaded in master: %s", summary)
+
+
+def post_fork(server, worker):
+    from ml_engine.preload import partition_threads
+    threads = partition_threads(server.cfg.workers, worker_index=worker.age % server.cfg.workers)
+    server.log.info("worker %s: %d intra-op threads", worker.pid, threads)
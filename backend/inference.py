@@ -1,43 +1,258 @@
 # backend/inference.py
+"""
+ML inference entry point.
+
+Two modes:
+  python inference.py --serve [--host H] [--port P]
+      Long-lived inference daemon. Loads the SBERT model, the course index and
+      the profiler once, then serves many requests concurrently over a local
+      TCP socket using newline-delimited JSON (one request / response per line).
+      Besides recommendation requests it answers {"op": "ping"},
+      {"op": "stats"} (model load times / memory from the model registry,
+      encoder batch occupancy and queue wait, embedding cache hit rates),
+      {"op": "reload"} (rebuild the catalog / profiler snapshot in the
+      background and swap it in, see ml_engine/snapshot.py),
+      {"op": "snapshot"} (active snapshot version) and incremental catalog
+      changes {"op": "upsert", "courses": [...]} / {"op": "delete", "ids": [...]}
+      (see ml_engine/catalog_delta.py).
+      reload / upsert / delete change what is served, so like the /admin
+      routes they must carry "token": ADMIN_TOKEN and are refused while no
+      ADMIN_TOKEN is configured.
+
+  python inference.py '<json>'   (or JSON on stdin)
+      Thin client. Forwards the request to a running daemon and prints the
+      response (adding ADMIN_TOKEN from the environment to admin ops that
+      have no "token"). If no daemon is listening it falls back to a one-shot
+      in-process run (the old behaviour), unless INFERENCE_FALLBACK=0.
+
+The client path deliberately avoids importing numpy / torch / sklearn so it
+starts in milliseconds.
+"""
 import sys
+import hmac
 import json
 import os
-import numpy as np
+import socket
+import socketserver
+import threading
 
 # Add the parent directory to sys.path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.ml_engine.recommender import PathwayRecommender
-from backend.ml_engine.profiler import LearnerProfiler
-from backend.ml_engine.features import build_feature_vector, enrich_features_with_embedding
-
 # Constants for paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 MODEL_DIR = os.path.join(BASE_DIR, 'ml_engine', 'models')
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-def load_resources():
-    # Load Courses
-    courses_path = os.path.join(DATA_DIR, 'courses.json')
-    with open(courses_path, 'r') as f:
-        courses = json.load(f)
-        
+# Daemon settings (overridable from the environment)
+INFERENCE_HOST = os.environ.get("INFERENCE_HOST", "127.0.0.1")
+INFERENCE_PORT = int(os.environ.get("INFERENCE_PORT", "8765"))
+INFERENCE_MAX_CONCURRENCY = int(os.environ.get("INFERENCE_MAX_CONCURRENCY", "8"))
+INFERENCE_CLIENT_TIMEOUT = float(os.environ.get("INFERENCE_CLIENT_TIMEOUT", "60"))
+INFERENCE_FALLBACK = os.environ.get("INFERENCE_FALLBACK", "1") != "0"
+# Shared secret for the ops that change the served catalog (same as the /admin routes)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+ADMIN_OPS = ("reload", "upsert", "delete")
+# Course catalog (JSON array or NDJSON); setup_full.py builds its embeddings
+COURSE_CATALOG = os.environ.get("COURSE_CATALOG", os.path.join(DATA_DIR, "courses.json"))
+# "exact", "ivf" or "compressed" (see ml_engine/course_index.py)
+COURSE_INDEX_BACKEND = os.environ.get("COURSE_INDEX_BACKEND", "exact")
+
+
+def load_resources(batching: bool = False):
+    """
+    Returns (recommender, snapshot manager). The manager's active snapshot
+    holds the catalog indexes and the profiler; the daemon rebuilds it in the
+    background on {"op": "reload"}.
+    """
+    # Heavy imports live here so the thin client never pays for them
+    from backend.ml_engine.recommender import PathwayRecommender
+    from backend.ml_engine.embedding_cache import EMBEDDING_CACHE_PATH, EmbeddingCache
+    from backend.ml_engine.snapshot import SnapshotManager
+
     # Load Recommender
-    rec = PathwayRecommender(model_name='all-MiniLM-L6-v2')
-    rec.fit_courses(courses)
-    
-    # Load Profiler
-    profiler = LearnerProfiler(n_clusters=5)
+    # The daemon turns on encoder micro-batching so concurrent requests share model calls
+    # (encoder backend / precision come from ENCODER_BACKEND / ENCODER_PRECISION)
+    model_name = 'all-MiniLM-L6-v2'
+    rec = PathwayRecommender(model_name=model_name, batching=batching,
+                             index_backend=COURSE_INDEX_BACKEND)
+    if rec.encoder_available:
+        # Repeated user texts skip the model; the SQLite tier persists across
+        # restarts. Mock mode has random vectors and no cache at all
+        rec.embedding_cache = EmbeddingCache(
+            rec.encoder_id, path=EMBEDDING_CACHE_PATH or os.path.join(MODEL_DIR, 'embedding_cache.sqlite'))
+
+    # Catalog + profiler snapshot. Fast path: the binary bundle compiled by
+    # setup_full.py is memory-mapped (columns and embeddings), so nothing is
+    # parsed or encoded and all processes share the pages. Otherwise courses
+    # are streamed into the compact columnar store and only new/changed ones
+    # are encoded (the rest come from the embeddings setup_full.py wrote).
+    snapshots = SnapshotManager(rec, catalog_path=COURSE_CATALOG, model_dir=MODEL_DIR)
+    snapshots.reload(wait=True)
+    return rec, snapshots
+
+
+def run_inference(data, rec, snapshot):
+    """
+    Run one recommendation request against already-loaded resources
+    (snapshot: the ModelSnapshot to serve it from, held for the whole request).
+    Returns the JSON-serializable response dict.
+    """
+    from backend.ml_engine.pipeline import RecommendationPipeline
+
+    user_asp = data.get('aspiration', '')
+    user_skills = data.get('skills', [])
+
+    # Profile and query texts are encoded in a single batched encoder call
+    print("[DEBUG] Running recommendation pipeline...", file=sys.stderr)
+    # The catalog is the recommender's active one: it includes incremental updates
+    out = RecommendationPipeline(rec, snapshot.profiler).run(
+        user_asp, user_skills, top_k=5, filters=data.get('filters')
+    )
+
+    return {
+        "status": "success",
+        "profile": {
+            "persona_id": out["persona_id"],
+            "persona_label": out["persona_label"],
+            "inferred_role": out["features"].get("role", "General Learner")
+        },
+        "recommendations": out["recommendations"],
+        "retrieval": out["retrieval"]
+    }
+
+
+def _error_response(e: Exception):
+    import traceback
+    traceback.print_exc(file=sys.stderr)
+    return {"status": "error", "message": str(e)}
+
+
+def _admin_denied(data, admin_token: str):
+    """Error response for an admin op without the right token, None if it may run."""
+    # Fail closed: no configured token means nobody may call these
+    if not admin_token:
+        return {"status": "error", "message": f"op {data.get('op')!r} is disabled (ADMIN_TOKEN is not set)"}
+    token = data.get("token")
+    if not isinstance(token, str) or not hmac.compare_digest(token.encode("utf-8"), admin_token.encode("utf-8")):
+        return {"status": "error", "message": "Invalid admin token"}
+    return None
+
+
+# -------------------------
+# Daemon
+# -------------------------
+class _InferenceHandler(socketserver.StreamRequestHandler):
+    """
+    One connection may send any number of newline-terminated JSON requests;
+    each gets exactly one newline-terminated JSON response, in order.
+    """
+
+    def handle(self):
+        server = self.server
+        for raw in self.rfile:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                data = json.loads(raw)
+                denied = _admin_denied(data, server.admin_token) if data.get("op") in ADMIN_OPS else None
+                if denied is not None:
+                    response = denied
+                elif data.get("op") == "ping":
+                    response = {"status": "ok"}
+                elif data.get("op") == "stats":
+                    from backend.ml_engine.model_registry import registry_stats
+                    response = {"status": "ok", "models": registry_stats()}
+                    if server.rec.batcher is not None:
+                        response["encoder_batching"] = server.rec.batcher.stats()
+                    if server.rec.embedding_cache is not None:
+                        response["embedding_cache"] = server.rec.embedding_cache.stats()
+                    response["snapshot"] = server.snapshots.status()
+                elif data.get("op") == "reload":
+                    # Rebuilt in the background; requests keep using the active snapshot
+                    response = {"status": "ok", "snapshot": server.snapshots.reload(wait=bool(data.get("wait")))}
+                elif data.get("op") == "snapshot":
+                    response = {"status": "ok", "snapshot": server.snapshots.status()}
+                elif data.get("op") == "upsert":
+                    response = {"status": "ok", **server.rec.upsert_courses(data.get("courses") or [])}
+                elif data.get("op") == "delete":
+                    response = {"status": "ok", **server.rec.delete_courses(data.get("ids") or [])}
+                else:
+                    # Bound the number of requests doing ML work at once so a
+                    # burst cannot oversubscribe the CPU / torch threads.
+                    with server.slots:
+                        response = run_inference(data, server.rec, server.snapshots.current())
+            except Exception as e:
+                response = _error_response(e)
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class InferenceServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, rec, snapshots, max_concurrency: int = INFERENCE_MAX_CONCURRENCY,
+                 admin_token: str = ADMIN_TOKEN):
+        super().__init__(address, _InferenceHandler)
+        self.rec = rec
+        self.snapshots = snapshots
+        self.admin_token = admin_token
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrency))
+
+
+def serve(host: str = INFERENCE_HOST, port: int = INFERENCE_PORT):
+    print("[DEBUG] Loading resources...", file=sys.stderr)
+    rec, snapshots = load_resources(batching=True)
+    with InferenceServer((host, port), rec, snapshots) as server:
+        print(f"[INFO] Inference daemon listening on {host}:{port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+# -------------------------
+# Thin client
+# -------------------------
+def request_daemon(data, host: str = INFERENCE_HOST, port: int = INFERENCE_PORT,
+                   timeout: float = INFERENCE_CLIENT_TIMEOUT):
+    """
+    Send one request to the daemon. Returns the response dict, or None if no
+    daemon is listening.
+    """
     try:
-        profiler.load(MODEL_DIR)
-    except:
-        # Fallback if not trained (should not happen if setup ran)
-        pass
-        
-    return rec, profiler
+        sock = socket.create_connection((host, port), timeout=timeout)
+    except OSError:
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        stream.write((json.dumps(data) + "\n").encode("utf-8"))
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("Inference daemon closed the connection without a response")
+    return json.loads(line)
+
+
+def _parse_serve_args(argv):
+    host, port = INFERENCE_HOST, INFERENCE_PORT
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg == "--host" and args:
+            host = args.pop(0)
+        elif arg == "--port" and args:
+            port = int(args.pop(0))
+    return host, port
+
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve(*_parse_serve_args(sys.argv[2:]))
+        return
+
     try:
         # Read input from first argument (JSON string)
         if len(sys.argv) > 1:
@@ -45,59 +260,27 @@ def main():
         else:
             # Fallback for testing: read from stdin
             input_json = sys.stdin.read()
-            
+
         data = json.loads(input_json)
-        
-        user_asp = data.get('aspiration', '')
-        user_skills = data.get('skills', [])
-        
-        # Load models
-        print("[DEBUG] Loading resources...", file=sys.stderr)
-        rec, profiler = load_resources()
-        
-        # 1. Feature Engineering
-        print("[DEBUG] Building features...", file=sys.stderr)
-        features = build_feature_vector({}, user_skills, user_asp)
-        
-        print("[DEBUG] Enriching features with embedding...", file=sys.stderr)
-        features = enrich_features_with_embedding(features, user_asp)
-        
-        # 2. Profiling
-        print("[DEBUG] Creating user vector...", file=sys.stderr)
-        user_vec = np.array(features['semantic_embedding']).astype(np.float64)
-        if user_vec.ndim == 1:
-             user_vec = user_vec.reshape(1, -1)
-        
-        print(f"[DEBUG] User vector shape: {user_vec.shape}, dtype: {user_vec.dtype}", file=sys.stderr)
-        
-        print("[DEBUG] Predicting persona...", file=sys.stderr)
-        persona_id = profiler.predict_persona(user_vec)
-
-        persona_label = profiler.get_cluster_insights(persona_id)
-        
-        # 3. Recommendations
-        print("[DEBUG] Getting recommendations...", file=sys.stderr)
-        # Combine aspiration + skills for better semantic search
-        query = f"{user_asp} {', '.join(user_skills)}"
-        recs = rec.recommend(query, top_k=5)
-        
-        result = {
-            "status": "success",
-            "profile": {
-                "persona_id": persona_id,
-                "persona_label": persona_label,
-                "inferred_role": features.get("role", "General Learner")
-            },
-            "recommendations": recs
-        }
-        
+        if isinstance(data, dict) and data.get("op") in ADMIN_OPS and "token" not in data and ADMIN_TOKEN:
+            data["token"] = ADMIN_TOKEN
+
+        result = request_daemon(data)
+        if result is None:
+            if not INFERENCE_FALLBACK:
+                raise ConnectionError(
+                    f"No inference daemon on {INFERENCE_HOST}:{INFERENCE_PORT} "
+                    "(start one with: python inference.py --serve)"
+                )
+            # No daemon running: do a one-shot in-process run
+            print("[DEBUG] No daemon found, loading resources in-process...", file=sys.stderr)
+            rec, snapshots = load_resources()
+            result = run_inference(data, rec, snapshots.current())
+
         print(json.dumps(result))
-        
+
     except Exception as e:
-        import traceback
-        traceback.print_exc(file=sys.stderr)
-        error_res = {"status": "error", "message": str(e)}
-        print(json.dumps(error_res))
+        print(json.dumps(_error_response(e)))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,172 @@
+"""
+Dynamic micro-batching in front of the sentence encoder.
+
+Concurrent callers (threads or asyncio tasks) submit small encode requests;
+a single background thread gathers whatever arrives within `max_wait_ms` of
+the oldest waiting request (or until `max_batch_size` texts are collected),
+runs ONE encode call for the whole batch, and hands every caller back its
+own rows. Transformer inference on CPU is much cheaper per text in batches
+than one text at a time.
+
+At most `max_pending` requests may wait; beyond that submit() raises
+EncoderOverloaded right away instead of growing the queue.
+
+Settings (environment):
+  ENCODER_BATCHING         "1" turns batching on by default in PathwayRecommender
+  ENCODER_MAX_BATCH_SIZE   texts per encode call (default 32)
+  ENCODER_MAX_WAIT_MS      how long the oldest request may wait for company (default 5)
+  ENCODER_MAX_PENDING      requests allowed to wait (default 1024)
+"""
+
+import asyncio
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+ENCODER_BATCHING = os.environ.get("ENCODER_BATCHING", "0") == "1"
+ENCODER_MAX_BATCH_SIZE = int(os.environ.get("ENCODER_MAX_BATCH_SIZE", "32"))
+ENCODER_MAX_WAIT_MS = float(os.environ.get("ENCODER_MAX_WAIT_MS", "5"))
+ENCODER_MAX_PENDING = int(os.environ.get("ENCODER_MAX_PENDING", "1024"))
+
+
+class EncoderOverloaded(RuntimeError):
+    pass
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchingEncoder:
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = ENCODER_MAX_BATCH_SIZE,
+        max_wait_ms: float = ENCODER_MAX_WAIT_MS,
+        max_pending: int = ENCODER_MAX_PENDING,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_pending = max(1, max_pending)
+
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._closed = False
+
+        # metrics
+        self._requests = 0
+        self._texts = 0
+        self._batches = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # -------------------------
+    # Client side
+    # -------------------------
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for encoding; the Future resolves to a (len(texts), dim) array."""
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result(np.empty((0, 0), dtype=np.float32))
+            return request.future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchingEncoder is closed")
+            if len(self._pending) >= self.max_pending:
+                raise EncoderOverloaded(f"{len(self._pending)} encode requests already waiting")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="encoder-batcher", daemon=True)
+                self._worker.start()
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    async def encode_async(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    # -------------------------
+    # Worker side
+    # -------------------------
+    def _next_batch(self) -> List[_Request]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            deadline = self._pending[0].enqueued + self.max_wait
+            while True:
+                queued = sum(len(r.texts) for r in self._pending)
+                remaining = deadline - time.perf_counter()
+                if queued >= self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            while self._pending:
+                nxt = len(self._pending[0].texts)
+                # Always take at least one request, even if it alone exceeds the cap
+                if batch and size + nxt > self.max_batch_size:
+                    break
+                batch.append(self._pending.popleft())
+                size += nxt
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # closed and drained
+
+            started = time.perf_counter()
+            texts = [t for r in batch for t in r.texts]
+            try:
+                vectors = self.encode_fn(texts)
+            except BaseException as e:
+                for r in batch:
+                    r.future.set_exception(e)
+                continue
+
+            offset = 0
+            for r in batch:
+                n = len(r.texts)
+                r.future.set_result(vectors[offset:offset + n])
+                offset += n
+
+            waits = [started - r.enqueued for r in batch]
+            self._requests += len(batch)
+            self._texts += len(texts)
+            self._batches += 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        batches = max(1, self._batches)
+        return {
+            "requests": self._requests,
+            "batches": self._batches,
+            "pending": len(self._pending),
+            "avg_batch_size": self._texts / batches,
+            "batch_occupancy": self._texts / (batches * self.max_batch_size),
+            "avg_queue_wait_ms": 1000 * self._wait_total / max(1, self._requests),
+            "max_queue_wait_ms": 1000 * self._wait_max,
+        }
@@ -0,0 +1,210 @@
+"""
+Compiled binary catalog bundle.
+
+setup_full.py compiles the course catalog once into a directory of .npy
+files that every process memory-maps instead of re-parsing JSON:
+
+    catalog_bundle/
+      CURRENT             name of the live generation directory
+      g-<...>/
+        manifest.json     format version, generation, model name, counts,
+                          content hash, source file signatures
+        text_*.npy ...    CourseStore columns (see CourseStore.save)
+        embeddings.npy    float32 (n, dim) course vectors, row i = course i
+        lexical*          BM25 inverted index (see LexicalIndex.save)
+
+Because the arrays are opened with mmap_mode="r", N workers share one copy
+of the pages in the OS page cache and startup does no parsing. A bundle is
+only used when its manifest matches the requested model and the source file
+it was built from is unchanged; otherwise callers fall back to the JSON path.
+
+The curated role -> courses DB (courses.json) is not part of the bundle: it
+is a small nested document pathway_engine walks as dicts, so it keeps being
+read with json.load (once per snapshot, see pathway_engine.PathwayModels).
+
+Each build writes a new generation directory and publishes it with one
+atomic replace of CURRENT (see generations.py), so readers always find a
+complete bundle, never a half-written one or none at all. open_bundle reads
+everything from one generation and checks that its manifest names it.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from . import generations
+from .course_store import CourseStore
+from .lexical_index import LexicalIndex
+
+BUNDLE_FORMAT_VERSION = 4
+CATALOG_BUNDLE_DIR = os.environ.get(
+    "CATALOG_BUNDLE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "catalog_bundle"),
+)
+
+
+def file_signature(path: Optional[str]) -> Optional[Dict]:
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _content_hash(directory: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for name in sorted(os.listdir(directory)):
+        if name == "manifest.json":
+            continue
+        h.update(name.encode("utf-8"))
+        with open(os.path.join(directory, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+class CatalogBundle:
+    def __init__(self, directory: str, manifest: Dict, courses: CourseStore,
+                 vectors: Optional[np.ndarray], lexical: Optional[LexicalIndex] = None):
+        self.directory = directory
+        self.manifest = manifest
+        self.courses = courses
+        self.vectors = vectors
+        self.lexical = lexical
+
+    @property
+    def model_name(self) -> Optional[str]:
+        return self.manifest.get("model_name")
+
+
+def build_bundle(
+    directory: str,
+    courses: CourseStore,
+    vectors: Optional[np.ndarray],
+    model_name: Optional[str],
+    source_path: Optional[str] = None,
+    lexical: Optional[LexicalIndex] = None,
+) -> Dict:
+    """
+    Compile courses (+ their embeddings and BM25 index) into
+    `directory`. lexical: an already-built index for `courses` (built here
+    otherwise). Returns the manifest.
+    """
+    if vectors is not None and len(vectors) != len(courses):
+        raise ValueError(f"{len(courses)} courses but {len(vectors)} vectors")
+
+    generation, tmp = generations.new_generation(directory)
+    try:
+        manifest = _write_bundle(tmp, generation, courses, vectors, model_name, source_path, lexical)
+        generations.publish(directory, generation)
+    except BaseException:
+        generations.discard(directory, generation)
+        raise
+    return manifest
+
+
+def _write_bundle(tmp: str, generation: str, courses: CourseStore, vectors: Optional[np.ndarray],
+                  model_name: Optional[str], source_path: Optional[str],
+                  lexical: Optional[LexicalIndex]) -> Dict:
+    courses.save(tmp)
+    (lexical or LexicalIndex.build(courses)).save(tmp)
+    if vectors is not None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        out = np.lib.format.open_memmap(os.path.join(tmp, "embeddings.npy"), mode="w+",
+                                        dtype=np.float32, shape=vectors.shape)
+        for start in range(0, len(vectors), 65536):
+            out[start:start + 65536] = vectors[start:start + 65536]
+        out.flush()
+        del out
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "generation": generation,
+        "model_name": model_name if vectors is not None else None,
+        "count": len(courses),
+        "dim": int(vectors.shape[1]) if vectors is not None and vectors.ndim == 2 else 0,
+        "content_hash": _content_hash(tmp),
+        "source": file_signature(source_path),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _live_bundle(directory: str) -> Optional[Tuple[str, Dict]]:
+    """(generation directory, manifest) of the live bundle, None if there is none."""
+    live = generations.resolve(directory)
+    if live is None:
+        return None
+    generation, bundle_dir = live
+    try:
+        with open(os.path.join(bundle_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION or manifest.get("generation") != generation:
+        return None
+    return bundle_dir, manifest
+
+
+def read_manifest(directory: str = CATALOG_BUNDLE_DIR) -> Optional[Dict]:
+    live = _live_bundle(directory)
+    return live[1] if live is not None else None
+
+
+def _is_fresh(recorded: Optional[Dict], path: Optional[str]) -> bool:
+    """True if `path` is the file the bundle was built from and is unchanged."""
+    if path is None:
+        return True
+    current = file_signature(path)
+    return recorded is not None and current is not None and \
+        (recorded["path"], recorded["size"], recorded["mtime_ns"]) == \
+        (current["path"], current["size"], current["mtime_ns"])
+
+
+def open_bundle(
+    directory: str = CATALOG_BUNDLE_DIR,
+    model_name: Optional[str] = None,
+    source_path: Optional[str] = None,
+    verify: bool = False,
+    attempts: int = 3,
+) -> Optional[CatalogBundle]:
+    """
+    Memory-map the bundle in `directory`. Returns None (caller falls back to
+    the JSON catalog) if there is no bundle, it was built with a different
+    model than `model_name`, `source_path` changed since it was built, or
+    (verify=True) its content hash does not match.
+
+    Everything is read from the one generation CURRENT names; if a rebuild
+    prunes it mid-read the open is retried on the new one.
+    """
+    for _ in range(attempts):
+        live = _live_bundle(directory)
+        if live is None:
+            return None
+        bundle_dir, manifest = live
+        if model_name is not None and manifest.get("model_name") != model_name:
+            return None
+        if not _is_fresh(manifest.get("source"), source_path):
+            return None
+        try:
+            if verify and _content_hash(bundle_dir) != manifest.get("content_hash"):
+                return None
+            courses = CourseStore.load(bundle_dir)
+            vectors_path = os.path.join(bundle_dir, "embeddings.npy")
+            vectors = np.load(vectors_path, mmap_mode="r") if os.path.exists(vectors_path) else None
+            lexical = LexicalIndex.load(bundle_dir)
+        except (OSError, ValueError, KeyError):
+            if os.path.isdir(bundle_dir):
+                return None
+            continue
+        return CatalogBundle(bundle_dir, manifest, courses, vectors, lexical)
+    return None
+
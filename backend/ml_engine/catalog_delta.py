@@ -0,0 +1,235 @@
+"""
+Incremental course changes on top of an immutable catalog snapshot.
+
+Rebuilding the CourseStore, re-encoding every course and rebuilding the
+search index for each published or retired course does not scale, so a
+CatalogSnapshot (snapshot.py) is really
+
+    base:  the CourseStore / vectors / index it was built with (unchanged)
+    delta: a list of chunks, one per change, each with the courses it added
+           or replaced and their own small exact, filter and BM25 indexes,
+           the ids it deleted or replaced and the base rows it tombstoned
+
+A change never modifies anything in place: it builds one new chunk from the
+changed courses only and a new snapshot sharing the base and the older
+chunks, which PathwayRecommender installs with one reference assignment. A
+search runs on one snapshot, so it sees a change completely or not at all.
+
+An id resolves to the newest chunk that holds or deleted it, else to the
+base. Courses superseded by a later chunk are kept out of search by small
+per-chunk tombstone arrays (base rows likewise), so no bitmap over the base
+is ever copied. To keep the number of chunks (searched one by one)
+logarithmic, a new chunk is merged with the one before it while that one
+is not larger, like a binary counter: a course is rebuilt O(log changes)
+times before compaction, so one change costs amortized O(log changes) for
+the courses it touches, independent of the base size.
+
+Tombstoned base rows are skipped in search (removed from filtered
+candidates, or masked out of the scores before the top-k selection).
+When the delta plus tombstones outgrow max(CATALOG_COMPACT_MIN_CHANGES,
+CATALOG_COMPACT_RATIO * base size), the recommender compacts in the
+background: live base rows and the delta are merged into a new base and the
+full index is rebuilt once.
+
+Settings (environment):
+  CATALOG_COMPACT_MIN_CHANGES  changes always tolerated before compacting (default 256)
+  CATALOG_COMPACT_RATIO        changes tolerated as a fraction of the base (default 0.1)
+"""
+
+import os
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .course_filters import CourseFilterIndex
+from .course_index import ExactIndex
+from .course_store import CourseStore
+from .lexical_index import LexicalIndex
+
+CATALOG_COMPACT_MIN_CHANGES = int(os.environ.get("CATALOG_COMPACT_MIN_CHANGES", "256"))
+CATALOG_COMPACT_RATIO = float(os.environ.get("CATALOG_COMPACT_RATIO", "0.1"))
+
+
+def id_key(course_id) -> str:
+    """Course ids are compared as strings ("C-1000", or 42 -> "42")."""
+    return course_id if isinstance(course_id, str) else str(course_id)
+
+
+def base_course_id(courses: CourseStore, row: int):
+    course_id = courses.text("id", row)
+    if course_id is None:
+        # Non-string ids live in the store's side table
+        course_id = courses.extras.get(row, {}).get("id")
+    return course_id
+
+
+class IdLookup:
+    """course id -> row of a CourseStore, as a sorted byte-string array (no dict per course)."""
+
+    def __init__(self, courses: CourseStore):
+        ids, rows = [], []
+        for row in range(len(courses)):
+            course_id = base_course_id(courses, row)
+            # Courses without an id cannot be addressed: they are left out
+            # entirely (a placeholder key would collide with "", as numpy
+            # byte strings drop trailing NULs)
+            if course_id is not None:
+                ids.append(id_key(course_id).encode("utf-8"))
+                rows.append(row)
+        keys = np.array(ids, dtype=bytes) if ids else np.empty(0, dtype="S1")
+        order = np.argsort(keys, kind="stable")
+        self.order = np.asarray(rows, dtype=np.int64)[order]
+        self.keys = keys[order]
+
+    def row(self, course_id) -> int:
+        """Row of `course_id`, -1 if absent."""
+        if not len(self.keys):
+            return -1
+        key = id_key(course_id).encode("utf-8")
+        pos = int(np.searchsorted(self.keys, key))
+        if pos < len(self.keys) and self.keys[pos] == key:
+            return int(self.order[pos])
+        return -1
+
+
+class DeltaChunk:
+    """
+    One change: the courses it added or replaced, with their own indexes, the
+    ids it deleted or replaced (`killed`, in the base and older chunks) and
+    the base rows it tombstoned. Never modified once built.
+    """
+
+    __slots__ = ("records", "vectors", "rows", "killed", "dead_base", "courses", "index",
+                 "filter_index", "lexical")
+
+    def __init__(self, records: List[Dict], vectors: np.ndarray, killed: FrozenSet[str],
+                 dead_base: np.ndarray, lexical_reference: Optional[LexicalIndex] = None):
+        self.records = records
+        self.vectors = vectors
+        self.rows = {id_key(r["id"]): i for i, r in enumerate(records)}
+        self.killed = killed
+        self.dead_base = dead_base  # int64 base rows, unique across the chunks of a delta
+        self.courses = CourseStore.from_records(records)
+        self.index = ExactIndex(vectors) if records else None
+        self.filter_index = CourseFilterIndex(self.courses)
+        # BM25 statistics come from the base index so scores are comparable
+        self.lexical = LexicalIndex.build(self.courses, reference=lexical_reference) if records else None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def weight(self) -> int:
+        """Work this chunk stands for, deciding when it is merged."""
+        return len(self.records) + len(self.killed)
+
+
+def _no_rows() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+# Delta.locate() result for an id that a change deleted
+DELETED = (-1, -1)
+
+
+class CatalogDelta:
+    """The chunks of changes since the base was built, oldest first."""
+
+    __slots__ = ("chunks", "chunk_dead", "_dead")
+
+    def __init__(self, chunks: Tuple[DeltaChunk, ...] = (), chunk_dead: Tuple[np.ndarray, ...] = ()):
+        self.chunks = chunks
+        self.chunk_dead = chunk_dead  # per chunk: its rows superseded by newer chunks
+        self._dead = None
+
+    @property
+    def dead(self) -> Optional[np.ndarray]:
+        """Tombstoned base rows (int64, unsorted), None while there are none."""
+        if self._dead is None and self.n_dead:
+            self._dead = np.concatenate([chunk.dead_base for chunk in self.chunks])
+        return self._dead
+
+    @property
+    def n_dead(self) -> int:
+        return sum(len(chunk.dead_base) for chunk in self.chunks)
+
+    @property
+    def n_records(self) -> int:
+        """Live courses in the delta."""
+        return sum(len(chunk) - len(dead) for chunk, dead in zip(self.chunks, self.chunk_dead))
+
+    @property
+    def changes(self) -> int:
+        return self.n_records + self.n_dead
+
+    def needs_compaction(self, base_size: int) -> bool:
+        return self.changes > max(CATALOG_COMPACT_MIN_CHANGES, CATALOG_COMPACT_RATIO * base_size)
+
+    def locate(self, key: str) -> Optional[Tuple[int, int]]:
+        """
+        (chunk, row) of the live delta course with id `key`, DELETED if a
+        change removed it, None if no change touched it (look in the base).
+        """
+        for i in range(len(self.chunks) - 1, -1, -1):
+            chunk = self.chunks[i]
+            row = chunk.rows.get(key)
+            if row is not None:
+                return i, row
+            if key in chunk.killed:
+                return DELETED
+        return None
+
+    def live(self) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        """(records, vectors) of the live courses of each chunk, oldest first."""
+        for chunk, dead in zip(self.chunks, self.chunk_dead):
+            if not len(dead):
+                yield chunk.records, chunk.vectors
+            else:
+                keep = np.setdiff1d(np.arange(len(chunk)), dead)
+                yield [chunk.records[i] for i in keep], chunk.vectors[keep]
+
+    def apply(self, upserts: List[Dict], vectors: np.ndarray, killed: Set[str], dead_rows: List[int],
+              lexical_reference: Optional[LexicalIndex] = None) -> "CatalogDelta":
+        """
+        New delta with `upserts` (row i -> vectors[i]) added or replacing the
+        course with the same id, and the courses with ids in `killed` removed.
+        `dead_rows` are the live base rows to tombstone; keys must already be
+        resolved against the base by the caller.
+        """
+        chunks, chunk_dead = list(self.chunks), list(self.chunk_dead)
+        superseded: Dict[int, List[int]] = {}
+        for key in killed:
+            location = self.locate(key)
+            if location is not None and location != DELETED:
+                superseded.setdefault(location[0], []).append(location[1])
+        for i, rows in superseded.items():
+            chunk_dead[i] = np.concatenate((chunk_dead[i], np.asarray(rows, dtype=np.int64)))
+
+        dim = vectors.shape[1] if vectors.ndim == 2 and len(upserts) else 0
+        chunks.append(DeltaChunk(
+            list(upserts), np.ascontiguousarray(vectors if len(upserts) else np.empty((0, dim)), dtype=np.float32),
+            frozenset(killed), np.unique(np.asarray(dead_rows, dtype=np.int64)), lexical_reference,
+        ))
+        chunk_dead.append(_no_rows())
+
+        # Binary-counter merging keeps O(log changes) chunks
+        while len(chunks) >= 2 and chunks[-2].weight <= chunks[-1].weight:
+            newer, newer_dead = chunks.pop(), chunk_dead.pop()
+            older, older_dead = chunks.pop(), chunk_dead.pop()
+            chunks.append(_merge(older, older_dead, newer, newer_dead, lexical_reference))
+            chunk_dead.append(_no_rows())
+        return CatalogDelta(tuple(chunks), tuple(chunk_dead))
+
+
+def _merge(older: DeltaChunk, older_dead: np.ndarray, newer: DeltaChunk, newer_dead: np.ndarray,
+           lexical_reference: Optional[LexicalIndex]) -> DeltaChunk:
+    """One chunk with the live courses of two adjacent ones (superseded ones are dropped)."""
+    merged = CatalogDelta((older, newer), (older_dead, newer_dead))
+    records, parts = [], []
+    for chunk_records, chunk_vectors in merged.live():
+        records.extend(chunk_records)
+        parts.append(chunk_vectors)
+    dim = max(part.shape[1] for part in parts)
+    vectors = np.concatenate([part for part in parts if len(part)]) if records else np.empty((0, dim))
+    return DeltaChunk(records, np.ascontiguousarray(vectors, dtype=np.float32), older.killed | newer.killed,
+                      np.concatenate((older.dead_base, newer.dead_base)), lexical_reference)
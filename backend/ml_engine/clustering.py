@@ -17,12 +17,16 @@ Then run: python -m src.clustering
 """
 
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-import joblib
 import os
-from typing import Dict
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+# pandas / scikit-learn / joblib are imported where they are used, so the
+# request path only pays for them when the model is first loaded
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Paths - use absolute so module works from any CWD
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -30,6 +34,19 @@ MODEL_DIR = os.path.join(BASE_DIR, "models")
 MODEL_PATH = os.path.join(MODEL_DIR, "kmeans_model.joblib")
 SCALER_PATH = os.path.join(MODEL_DIR, "scaler.joblib")
 
+# Feature order used for training and prediction
+FEATURE_COLUMNS = [
+    "avg_score",
+    "experience_level",
+    "skill_count",
+    "market_demand",
+    "skill_coverage_ratio",
+    "missing_skills_count",
+]
+
+# How often (seconds) the in-memory models re-check the files on disk
+MODEL_CHECK_INTERVAL = float(os.environ.get("CLUSTER_MODEL_CHECK_INTERVAL", "5"))
+
 
 # --------------------------------------------
 # STEP 1: Generate Dummy Training Dataset (6 features)
@@ -69,17 +86,8 @@ def generate_dummy_dataset(n=600):
 
     data = np.vstack([beginners, intermediates, advanced])
 
-    df = pd.DataFrame(
-        data,
-        columns=[
-            "avg_score",
-            "experience_level",
-            "skill_count",
-            "market_demand",
-            "skill_coverage_ratio",
-            "missing_skills_count",
-        ],
-    )
+    import pandas as pd
+    df = pd.DataFrame(data, columns=FEATURE_COLUMNS)
 
     # ensure values are in 0..1
     df = df.clip(0.0, 1.0)
@@ -91,6 +99,10 @@ def generate_dummy_dataset(n=600):
 # STEP 2: Train KMeans + save model
 # --------------------------------------------
 def train_model(n_samples: int = 600, n_clusters: int = 3):
+    import joblib
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+
     print("🔧 Generating dummy dataset (6-feature)...")
     df = generate_dummy_dataset(n=n_samples)
 
@@ -109,13 +121,103 @@ def train_model(n_samples: int = 600, n_clusters: int = 3):
     os.makedirs(MODEL_DIR, exist_ok=True)
 
     print(f"💾 Saving model to {MODEL_PATH} and scaler to {SCALER_PATH} ...")
-    joblib.dump(kmeans, MODEL_PATH)
-    joblib.dump(scaler, SCALER_PATH)
+    # Dump next to the targets and rename into place: a ClusterModelHolder in
+    # another process reloads on mtime and must never unpickle a partial file
+    tmp_paths = []
+    for obj, path in ((kmeans, MODEL_PATH), (scaler, SCALER_PATH)):
+        tmp = f"{path}.tmp-{os.getpid()}"
+        joblib.dump(obj, tmp)
+        tmp_paths.append((tmp, path))
+    for tmp, path in tmp_paths:
+        os.replace(tmp, path)
 
     print("✅ Training complete!")
+    # Make an in-process holder pick the new files up on its next call
+    _model_holder.invalidate()
     return kmeans, scaler
 
 
+# --------------------------------------------
+# In-memory model holder (request path)
+# --------------------------------------------
+class ModelNotTrainedError(FileNotFoundError):
+    pass
+
+
+class ClusterModelHolder:
+    """
+    Keeps the KMeans model and scaler in memory for the request path.
+
+    The files are unpickled once and re-loaded only when their mtime/size
+    changes; the stat check itself runs at most every check_interval seconds.
+    It never trains: if the files are missing a ModelNotTrainedError is
+    raised (train explicitly with `python -m ml_engine.clustering` or
+    setup_full.py).
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, scaler_path: str = SCALER_PATH,
+                 check_interval: float = MODEL_CHECK_INTERVAL):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.check_interval = check_interval
+        self.version = 0  # bumped on every (re)load; lets caches detect model changes
+        self._models: Optional[Tuple[Any, Any]] = None  # (KMeans, StandardScaler)
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        try:
+            return tuple(
+                (st.st_mtime_ns, st.st_size)
+                for st in (os.stat(self.model_path), os.stat(self.scaler_path))
+            )
+        except FileNotFoundError:
+            return None
+
+    def get(self) -> Tuple[Any, Any]:
+        """(kmeans, scaler), loading / reloading them from disk as needed."""
+        models = self._models
+        if models is not None and time.monotonic() < self._next_check:
+            return models
+
+        with self._lock:
+            signature = self._stat_signature()
+            if signature is None:
+                if self._models is None:
+                    raise ModelNotTrainedError(
+                        f"Clustering model not found at {self.model_path} / {self.scaler_path}. "
+                        "Train it first with `python -m ml_engine.clustering` or setup_full.py."
+                    )
+                # Files vanished mid-deploy: keep serving the loaded models
+            elif self._models is None or signature != self._signature:
+                import joblib
+                # The two files are replaced one after the other: reload until
+                # both are from the same write
+                for _ in range(3):
+                    models = (joblib.load(self.model_path), joblib.load(self.scaler_path))
+                    reloaded = self._stat_signature()
+                    if reloaded == signature or reloaded is None:
+                        break
+                    signature = reloaded
+                self._models = models
+                self._signature = signature
+                self.version += 1
+            self._next_check = time.monotonic() + self.check_interval
+            return self._models
+
+    def invalidate(self):
+        """Force a stat check (and reload if changed) on the next get()."""
+        self._next_check = 0.0
+
+
+_model_holder = ClusterModelHolder()
+
+
+def get_model_holder() -> ClusterModelHolder:
+    return _model_holder
+
+
 # --------------------------------------------
 # STEP 3: Predict cluster for a new user (6-feature dict)
 # --------------------------------------------
@@ -132,31 +234,46 @@ def predict_cluster(feature_dict: Dict) -> int:
     Returns cluster id (int).
     """
 
-    # If models are not present, train them automatically
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH):
-        print("⚠ Model or scaler not found — training now (this may take a few seconds)...")
-        train_model()
-
-    kmeans = joblib.load(MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-
-    # Build feature vector in the exact order used during training
-    features = np.array(
-        [
-            [
-                float(feature_dict.get("avg_score", 0.0)),
-                float(feature_dict.get("experience_level", 0.0)),
-                float(feature_dict.get("skill_count", 0.0)),
-                float(feature_dict.get("market_demand", 0.0)),
-                float(feature_dict.get("skill_coverage_ratio", 0.0)),
-                float(feature_dict.get("missing_skills_count", 0.0)),
-            ]
-        ]
-    )
+    return int(predict_cluster_batch([feature_dict])[0])
+
+
+def is_dataframe(obj) -> bool:
+    """isinstance(obj, pd.DataFrame) without importing pandas (if it isn't loaded, obj can't be one)."""
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(obj, pd.DataFrame)
+
+
+def feature_matrix(features: Union[List[Dict], "pd.DataFrame"]) -> np.ndarray:
+    """
+    Stack feature dicts (or a DataFrame with FEATURE_COLUMNS) into an
+    (n, 6) float64 matrix in training order. Missing values become 0.0.
+    """
+    if is_dataframe(features):
+        return features.reindex(columns=FEATURE_COLUMNS).fillna(0.0).to_numpy(dtype=np.float64)
+    return np.array(
+        [[float(f.get(col, 0.0)) for col in FEATURE_COLUMNS] for f in features],
+        dtype=np.float64,
+    ).reshape(-1, len(FEATURE_COLUMNS))
+
+
+def predict_cluster_batch(features: Union[List[Dict], "pd.DataFrame", np.ndarray],
+                          models: Optional[Tuple[Any, Any]] = None) -> np.ndarray:
+    """
+    Vectorized predict_cluster: one scaler.transform and one kmeans.predict
+    for the whole batch. Accepts a list of feature dicts, a DataFrame with
+    FEATURE_COLUMNS, or an (n, 6) array already in training order.
+    models: (kmeans, scaler) to use instead of the holder's current ones
+        (e.g. those of a pathway snapshot)
+
+    Returns an int array of cluster ids, one per row.
+    """
+    X = features if isinstance(features, np.ndarray) else feature_matrix(features)
+    if len(X) == 0:
+        return np.empty(0, dtype=int)
 
-    features_scaled = scaler.transform(features)
-    cluster = kmeans.predict(features_scaled)[0]
-    return int(cluster)
+    # Cached in memory; raises ModelNotTrainedError instead of training inline
+    kmeans, scaler = models if models is not None else _model_holder.get()
+    return kmeans.predict(scaler.transform(X)).astype(int)
 
 
 # --------------------------------------------
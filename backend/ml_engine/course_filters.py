@@ -0,0 +1,113 @@
+"""
+Structured pre-filters for course retrieval.
+
+Built once per catalog in PathwayRecommender.fit_courses, directly from the
+CourseStore columns. Each filterable field gets its own index over course
+row ids:
+
+- categorical fields (sector, provider): value -> sorted row-id array
+- numeric fields (nsqf_level, duration_hours): rows sorted by value, so a
+  range is two binary searches
+
+candidates(filters) intersects the per-field row sets (smallest first) and
+returns the rows the course index should score. Only those vectors are
+touched, so a selective filter is cheaper than an unfiltered search.
+
+Filter spec (all keys optional, combined with AND):
+    {"sector": "IT-ITeS" | ["IT-ITeS", "Electronics"],
+     "provider": "..." | [...],
+     "nsqf_level": 5 | {"min": 4, "max": 6},
+     "duration_hours": {"max": 200}}
+"""
+
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from .course_store import CourseStore
+
+CATEGORICAL_FIELDS = ("sector", "provider")
+NUMERIC_FIELDS = ("nsqf_level", "duration_hours")
+
+
+class CourseFilterIndex:
+    def __init__(self, courses: Union[CourseStore, List[Dict]]):
+        if not isinstance(courses, CourseStore):
+            courses = CourseStore.from_records(courses)
+        self.size = len(courses)
+
+        # categorical: group rows by their dictionary code (stable sort keeps
+        # each posting list in ascending row order)
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+        for field in CATEGORICAL_FIELDS:
+            codes = courses.category_codes[field]
+            order = np.argsort(codes, kind="stable")
+            counts = np.bincount(codes[codes >= 0], minlength=len(courses.categories[field]))
+            start = int(np.count_nonzero(codes < 0))  # missing values sort first
+            postings = {}
+            for value, count in zip(courses.categories[field], counts):
+                postings[value] = order[start:start + count]
+                start += count
+            self.postings[field] = postings
+
+        # numeric: (rows sorted by value, the sorted values); missing values sort last as NaN
+        self.sorted_rows: Dict[str, np.ndarray] = {}
+        self.sorted_values: Dict[str, np.ndarray] = {}
+        for field in NUMERIC_FIELDS:
+            values = courses.numeric[field]
+            order = np.argsort(values, kind="stable")
+            self.sorted_rows[field] = order
+            self.sorted_values[field] = values[order]
+
+    def _categorical_rows(self, field: str, wanted) -> np.ndarray:
+        values = [wanted] if isinstance(wanted, str) else list(wanted)
+        lists = [self.postings[field].get(str(v)) for v in values]
+        lists = [rows for rows in lists if rows is not None]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+    def _numeric_rows(self, field: str, wanted) -> np.ndarray:
+        if isinstance(wanted, dict):
+            lo, hi = wanted.get("min"), wanted.get("max")
+        else:
+            lo = hi = wanted
+        values = self.sorted_values[field]
+        start = 0 if lo is None else np.searchsorted(values, float(lo), side="left")
+        # NaNs sort to the end, so bound an open range by the non-missing part
+        end = np.searchsorted(values, np.inf, side="right") if hi is None \
+            else np.searchsorted(values, float(hi), side="right")
+        return np.sort(self.sorted_rows[field][start:end])
+
+    def candidates(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Sorted row ids matching every filter, or None when there is nothing
+        to filter on (search the whole catalog).
+        """
+        if not filters:
+            return None
+
+        row_sets = []
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            if field in CATEGORICAL_FIELDS:
+                row_sets.append(self._categorical_rows(field, wanted))
+            elif field in NUMERIC_FIELDS:
+                row_sets.append(self._numeric_rows(field, wanted))
+            else:
+                raise ValueError(
+                    f"Unknown filter field {field!r}; expected one of {CATEGORICAL_FIELDS + NUMERIC_FIELDS}"
+                )
+
+        if not row_sets:
+            return None
+        row_sets.sort(key=len)
+        rows = row_sets[0]
+        for other in row_sets[1:]:
+            if len(rows) == 0:
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
@@ -0,0 +1,355 @@
+"""
+Course vector indexes for PathwayRecommender.
+
+All backends share one small interface:
+
+    index = build_index(course_vectors, backend="exact" | "ivf" | "compressed", **params)
+    indices, scores = index.search(query_vector, top_k)
+
+- ExactIndex: brute-force cosine similarity over every course (ground truth),
+  on pre-normalized float32 vectors with O(n) top-k selection.
+- IVFIndex: inverted-file approximate search. Courses are bucketed under
+  spherical k-means centroids at build time; a query only scores the courses
+  in its `nprobe` closest buckets. Pure numpy, no extra dependencies.
+- CompressedIndex: int8 scalar-quantized (optionally PCA-reduced) copy of
+  the vectors in RAM for a first pass, then exact rescoring of a shortlist
+  against the full-precision vectors, which may stay memory-mapped on disk.
+
+measure_recall() compares any backend against ExactIndex (recall@k and
+per-query latency); `python benchmark.py index` runs it on a synthetic catalog.
+"""
+
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def _as_unit_rows(x: np.ndarray, tol: float = 1e-4) -> np.ndarray:
+    """
+    float32 unit-length rows. Input that already is (e.g. SBERT output with a
+    Normalize layer, or a memory-mapped embedding store) is returned as-is,
+    so a shared read-only mapping is not copied into private memory.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1)
+    if len(norms) and np.all(np.abs(norms - 1.0) <= tol):
+        return x
+    return _normalize_rows(x)
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first.
+    O(n) argpartition selection, then a sort of just the k winners.
+    """
+    n = len(scores)
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < n:
+        candidates = np.argpartition(scores, n - top_k)[n - top_k:]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+def _top_k_live(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """_top_k, leaving out rows masked to -inf (excluded rows)."""
+    best = _top_k(scores, top_k)
+    return best[np.isfinite(scores[best])]
+
+
+class CourseIndex:
+    """Base class: build once from an (n, dim) matrix, then search many times."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.size = int(vectors.shape[0])
+
+    def search(self, query: np.ndarray, top_k: int = 5, candidates: Optional[np.ndarray] = None,
+               exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (course row indices, cosine scores), best first.
+        candidates: optional row ids (e.g. from CourseFilterIndex); only these
+            rows are scored.
+        exclude: optional row ids (e.g. tombstoned courses) that are never
+            returned; they are masked before the top-k selection. Only used
+            without candidates (drop them from the candidates instead).
+        """
+        raise NotImplementedError
+
+
+def _empty_result() -> Tuple[np.ndarray, np.ndarray]:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+
+class ExactIndex(CourseIndex):
+    """
+    Course vectors are unit-normalized float32 once at build time, so scoring
+    a query is a single matrix-vector product and cosine similarity falls out
+    as a dot product; the top k are picked with an O(n) partial selection.
+    """
+
+    def __init__(self, vectors: np.ndarray):
+        super().__init__(vectors)
+        self.vectors = _as_unit_rows(vectors)
+
+    def search(self, query: np.ndarray, top_k: int = 5, candidates: Optional[np.ndarray] = None,
+               exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        q = _normalize_rows(np.asarray(query).reshape(1, -1))[0]
+        if candidates is not None:
+            if len(candidates) == 0:
+                return _empty_result()
+            # Gather only the filtered rows: cost scales with the candidate count
+            sims = self.vectors[candidates] @ q
+            best = _top_k(sims, top_k)
+            return candidates[best], sims[best]
+        sims = self.vectors @ q
+        if exclude is not None and len(exclude):
+            sims[exclude] = -np.inf
+            top_indices = _top_k_live(sims, top_k)
+        else:
+            top_indices = _top_k(sims, top_k)
+        return top_indices, sims[top_indices]
+
+
+class IVFIndex(CourseIndex):
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 10,
+        train_size: int = 256,
+        seed: int = 42,
+    ):
+        """
+        n_lists: number of buckets (default ~sqrt(n))
+        nprobe: buckets scanned per query (higher = better recall, slower)
+        n_iter: k-means iterations used to place the centroids
+        train_size: sample up to train_size * n_lists vectors to train centroids
+        """
+        super().__init__(vectors)
+        unit = _as_unit_rows(vectors)
+        n = unit.shape[0]
+        self.n_lists = max(1, min(n, n_lists or int(round(np.sqrt(n)))))
+        self.nprobe = max(1, nprobe)
+
+        rng = np.random.default_rng(seed)
+        sample = unit
+        if n > train_size * self.n_lists:
+            sample = unit[rng.choice(n, train_size * self.n_lists, replace=False)]
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)]
+        for _ in range(n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = np.bincount(assign, minlength=self.n_lists) == 0
+            sums[empty] = centroids[empty]  # keep empty buckets where they were
+            centroids = _normalize_rows(sums)
+        self.centroids = centroids
+
+        # Assign every vector (chunked to bound the temporary score matrix)
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 65536):
+            assign[start:start + 65536] = np.argmax(unit[start:start + 65536] @ centroids.T, axis=1)
+
+        # CSR-style inverted lists: vectors stored grouped by bucket
+        order = np.argsort(assign, kind="stable")
+        self.ids = order
+        self.positions = np.empty(n, dtype=np.int64)  # course row -> position in self.vectors
+        self.positions[order] = np.arange(n)
+        self.vectors = unit[order]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=self.n_lists))))
+
+    def search(self, query: np.ndarray, top_k: int = 5, candidates: Optional[np.ndarray] = None,
+               exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        q = _normalize_rows(np.asarray(query).reshape(1, -1))[0]
+        nprobe = min(self.nprobe, self.n_lists)
+
+        if candidates is not None:
+            if len(candidates) == 0:
+                return _empty_result()
+            # A filter selective enough to beat probing is scored exactly
+            if len(candidates) <= self.size * nprobe / self.n_lists:
+                sims = self.vectors[self.positions[candidates]] @ q
+                best = _top_k(sims, top_k)
+                return candidates[best], sims[best]
+
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        rows = np.concatenate([np.arange(self.offsets[b], self.offsets[b + 1]) for b in probe])
+        if candidates is not None:
+            allowed = np.zeros(self.size, dtype=bool)
+            allowed[candidates] = True
+            rows = rows[allowed[self.ids[rows]]]
+        elif exclude is not None and len(exclude):
+            # rows are positions in self.vectors
+            rows = rows[~np.isin(rows, self.positions[exclude])]
+        if len(rows) == 0:
+            return _empty_result()
+        sims = self.vectors[rows] @ q
+        best = _top_k(sims, top_k)
+        return self.ids[rows[best]], sims[best]
+
+
+class CompressedIndex(CourseIndex):
+    """
+    Two-stage search for catalogs too large to keep as float32 in every worker.
+
+    Stage 1 scores int8 codes: each dimension is scaled by its max |value| to
+    [-127, 127] (after an optional PCA projection to `pca_dim` dimensions),
+    so a 384-d course costs 384 bytes (or pca_dim bytes) instead of 1.5 KB.
+    Stage 2 takes the best `top_k * rescore_factor` rows and rescores them
+    exactly against `vectors`, read row by row; when `vectors` is the
+    memory-mapped embedding store only those pages are ever touched.
+    """
+
+    CHUNK_ROWS = 16384  # build-time batches
+    SCORE_CHUNK_ROWS = 512  # int8 -> float32 blocks small enough to stay in CPU cache
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        pca_dim: Optional[int] = None,
+        rescore_factor: int = 10,
+        pca_sample: int = 20000,
+        seed: int = 42,
+    ):
+        """
+        vectors: full-precision course vectors; kept by reference (not copied)
+            for rescoring, so pass the memory-mapped store to keep RSS low
+        pca_dim: reduce to this many dimensions before quantizing (None = no PCA)
+        rescore_factor: shortlist size as a multiple of top_k (0 = no rescoring)
+        pca_sample: rows sampled to fit the PCA projection
+        """
+        super().__init__(vectors)
+        self.full = vectors
+        self.rescore_factor = max(0, rescore_factor)
+        n, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+
+        self.mean = None
+        self.components = None
+        if pca_dim is not None and 0 < pca_dim < dim and n > 1:
+            rng = np.random.default_rng(seed)
+            rows = np.sort(rng.choice(n, min(n, pca_sample), replace=False))
+            sample = _normalize_rows(vectors[rows])
+            self.mean = sample.mean(axis=0)
+            _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+            self.components = np.ascontiguousarray(vt[:pca_dim].T, dtype=np.float32)  # (dim, pca_dim)
+
+        # First pass over the vectors: projected chunk maxima give the scales
+        out_dim = dim if self.components is None else self.components.shape[1]
+        max_abs = np.zeros(out_dim, dtype=np.float32)
+        for start in range(0, n, self.CHUNK_ROWS):
+            max_abs = np.maximum(max_abs, np.abs(self._project(vectors[start:start + self.CHUNK_ROWS])).max(axis=0))
+        max_abs[max_abs == 0] = 1.0
+        self.scale = (max_abs / 127.0).astype(np.float32)
+
+        # Second pass: quantize
+        self.codes = np.empty((n, out_dim), dtype=np.int8)
+        for start in range(0, n, self.CHUNK_ROWS):
+            projected = self._project(vectors[start:start + self.CHUNK_ROWS])
+            self.codes[start:start + self.CHUNK_ROWS] = np.clip(np.rint(projected / self.scale), -127, 127)
+
+    def _project(self, rows: np.ndarray) -> np.ndarray:
+        rows = _normalize_rows(rows)
+        if self.components is None:
+            return rows
+        return (rows - self.mean) @ self.components
+
+    def _approx_scores(self, q_unit: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        # With PCA the constant mean term is the same for every course, so it
+        # is dropped: only the ranking matters in stage 1.
+        qs = (q_unit if self.components is None else q_unit @ self.components) * self.scale
+        if rows is not None:
+            return self.codes[rows].astype(np.float32) @ qs
+        out = np.empty(self.size, dtype=np.float32)
+        buf = np.empty((self.SCORE_CHUNK_ROWS, self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, self.size, self.SCORE_CHUNK_ROWS):
+            block = self.codes[start:start + self.SCORE_CHUNK_ROWS]
+            converted = buf[:len(block)]
+            converted[...] = block
+            np.dot(converted, qs, out=out[start:start + len(block)])
+        return out
+
+    def search(self, query: np.ndarray, top_k: int = 5, candidates: Optional[np.ndarray] = None,
+               exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        q = _normalize_rows(np.asarray(query).reshape(1, -1))[0]
+        if candidates is not None and len(candidates) == 0:
+            return _empty_result()
+
+        approx = self._approx_scores(q, candidates)
+        k = top_k * self.rescore_factor if self.rescore_factor else top_k
+        if candidates is None and exclude is not None and len(exclude):
+            approx[exclude] = -np.inf
+            shortlist = _top_k_live(approx, k)
+        else:
+            shortlist = _top_k(approx, k)
+        rows = shortlist if candidates is None else candidates[shortlist]
+        if not self.rescore_factor:
+            return rows, approx[shortlist]
+
+        # Exact cosine on the shortlist; sorted rows read the mapping in file order
+        order = np.argsort(rows)
+        sims = np.empty(len(rows), dtype=np.float32)
+        sims[order] = _normalize_rows(self.full[rows[order]]) @ q
+        best = _top_k(sims, top_k)
+        return rows[best], sims[best]
+
+    def nbytes(self) -> int:
+        """Bytes held in RAM by the index (the full vectors are excluded)."""
+        total = self.codes.nbytes + self.scale.nbytes
+        if self.components is not None:
+            total += self.components.nbytes + self.mean.nbytes
+        return total
+
+
+INDEX_BACKENDS = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+    "compressed": CompressedIndex,
+}
+
+
+def build_index(vectors: np.ndarray, backend: str = "exact", **params) -> CourseIndex:
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend {backend!r}; expected one of {sorted(INDEX_BACKENDS)}")
+    return INDEX_BACKENDS[backend](vectors, **params)
+
+
+def measure_recall(index: CourseIndex, reference: CourseIndex, queries: np.ndarray, top_k: int = 5) -> Dict:
+    """
+    Compare `index` against `reference` (normally an ExactIndex) on `queries`.
+
+    Returns recall@top_k (fraction of the reference top_k found by index)
+    and mean per-query latency in milliseconds for both.
+    """
+    hits = total = 0
+    index_time = reference_time = 0.0
+    for q in queries:
+        start = time.perf_counter()
+        truth, _ = reference.search(q, top_k)
+        reference_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found, _ = index.search(q, top_k)
+        index_time += time.perf_counter() - start
+
+        hits += len(set(truth.tolist()) & set(found.tolist()))
+        total += len(truth)
+
+    n = max(1, len(queries))
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        f"recall@{top_k}": hits / max(1, total),
+        "latency_ms": 1000 * index_time / n,
+        "reference_latency_ms": 1000 * reference_time / n,
+        "speedup": reference_time / index_time if index_time else float("inf"),
+    }
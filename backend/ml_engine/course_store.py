@@ -0,0 +1,254 @@
+"""
+Compact columnar storage for the course catalog.
+
+A list of per-course dicts costs several hundred bytes of Python object
+overhead per course in every worker. CourseStore keeps the same data as
+a handful of numpy arrays:
+
+- text fields (id, title, description, skills): one UTF-8 byte buffer +
+  offsets. A course's skills string ("Python, SQL, Excel") is almost
+  always unique, so a dictionary would be as large as the column itself
+- low-cardinality fields (sector, provider): dictionary-encoded, int32
+  codes into a small list of distinct values
+- numeric fields (nsqf_level, duration_hours): float64 arrays (NaN = missing)
+
+Course dicts are only materialized on demand (store[i]), e.g. for the
+top-k results of a search. Any other field found in the input is kept
+per course in a sparse side table so nothing is lost.
+
+save(directory) writes every column as its own .npy file; load(directory)
+memory-maps them back, so worker processes opening the same files share
+the physical pages and nothing is parsed at startup.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+TEXT_FIELDS = ("id", "title", "description", "skills")
+CATEGORY_FIELDS = ("sector", "provider")
+NUMERIC_FIELDS = ("nsqf_level", "duration_hours")
+# Order used when materializing a course dict (matches data/loader.py)
+FIELD_ORDER = ("id", "title", "sector", "nsqf_level", "description", "skills", "duration_hours", "provider")
+
+
+class CourseStore:
+    def __init__(
+        self,
+        text_buffers: Dict[str, np.ndarray],
+        text_offsets: Dict[str, np.ndarray],
+        category_codes: Dict[str, np.ndarray],
+        categories: Dict[str, List[str]],
+        numeric: Dict[str, np.ndarray],
+        extras: Optional[Dict[int, Dict]] = None,
+        text_missing: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        self.text_buffers = text_buffers
+        self.text_offsets = text_offsets
+        # field -> bool array, only for fields where some course lacks a value
+        self.text_missing = text_missing or {}
+        self.category_codes = category_codes
+        self.categories = categories
+        self.numeric = numeric
+        self.extras = extras or {}
+        self._size = len(text_offsets[TEXT_FIELDS[0]]) - 1
+
+    # -------------------------
+    # Construction
+    # -------------------------
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "CourseStore":
+        builder = CourseStoreBuilder()
+        for r in records:
+            builder.append(r)
+        return builder.build()
+
+    @classmethod
+    def from_json(cls, path: str) -> "CourseStore":
+        """
+        Stream a JSON array (or NDJSON file) of course dicts straight into
+        columnar form; only one course dict exists at a time.
+        """
+        from .ingest import iter_course_records
+        return cls.from_records(iter_course_records(path))
+
+    # -------------------------
+    # Access
+    # -------------------------
+    def __len__(self) -> int:
+        return self._size
+
+    def text(self, field: str, i: int) -> Optional[str]:
+        missing = self.text_missing.get(field)
+        if missing is not None and missing[i]:
+            return None
+        offsets = self.text_offsets[field]
+        start, end = int(offsets[i]), int(offsets[i + 1])
+        return self.text_buffers[field][start:end].tobytes().decode("utf-8")
+
+    def category(self, field: str, i: int) -> Optional[str]:
+        code = int(self.category_codes[field][i])
+        return None if code < 0 else self.categories[field][code]
+
+    def number(self, field: str, i: int):
+        v = float(self.numeric[field][i])
+        if np.isnan(v):
+            return None
+        return int(v) if v.is_integer() else v
+
+    def __getitem__(self, i: int) -> Dict:
+        """Materialize one course as a fresh dict (safe for callers to mutate)."""
+        i = int(i)
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        out = {}
+        for field in FIELD_ORDER:
+            if field in TEXT_FIELDS:
+                value = self.text(field, i)
+            elif field in CATEGORY_FIELDS:
+                value = self.category(field, i)
+            else:
+                value = self.number(field, i)
+            if value is not None:
+                out[field] = value
+        if i in self.extras:
+            out.update(self.extras[i])
+        return out
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def records(self, rows: Iterable[int]) -> List[Dict]:
+        return [self[i] for i in rows]
+
+    # -------------------------
+    # Binary form
+    # -------------------------
+    def save(self, directory: str):
+        """Write the columns as .npy files plus a small JSON side file."""
+        os.makedirs(directory, exist_ok=True)
+        for f in TEXT_FIELDS:
+            np.save(os.path.join(directory, f"text_{f}.npy"), self.text_buffers[f])
+            np.save(os.path.join(directory, f"offsets_{f}.npy"), self.text_offsets[f])
+            if f in self.text_missing:
+                np.save(os.path.join(directory, f"missing_{f}.npy"), self.text_missing[f])
+        for f in CATEGORY_FIELDS:
+            np.save(os.path.join(directory, f"codes_{f}.npy"), self.category_codes[f])
+        for f in NUMERIC_FIELDS:
+            np.save(os.path.join(directory, f"numeric_{f}.npy"), self.numeric[f])
+        side = {
+            "categories": self.categories,
+            "text_missing": sorted(self.text_missing),
+            "extras": {str(i): e for i, e in self.extras.items()},
+        }
+        with open(os.path.join(directory, "columns.json"), "w", encoding="utf-8") as fh:
+            json.dump(side, fh, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CourseStore":
+        """Open a store written by save(); arrays are memory-mapped read-only by default."""
+        mode = "r" if mmap else None
+
+        def arr(name):
+            return np.load(os.path.join(directory, name), mmap_mode=mode)
+
+        with open(os.path.join(directory, "columns.json"), "r", encoding="utf-8") as fh:
+            side = json.load(fh)
+        return cls(
+            text_buffers={f: arr(f"text_{f}.npy") for f in TEXT_FIELDS},
+            text_offsets={f: arr(f"offsets_{f}.npy") for f in TEXT_FIELDS},
+            category_codes={f: arr(f"codes_{f}.npy") for f in CATEGORY_FIELDS},
+            categories=side["categories"],
+            numeric={f: arr(f"numeric_{f}.npy") for f in NUMERIC_FIELDS},
+            extras={int(i): e for i, e in side["extras"].items()},
+            text_missing={f: arr(f"missing_{f}.npy") for f in side["text_missing"]},
+        )
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the column arrays."""
+        total = sum(a.nbytes for a in self.text_buffers.values())
+        total += sum(a.nbytes for a in self.text_offsets.values())
+        total += sum(a.nbytes for a in self.category_codes.values())
+        total += sum(a.nbytes for a in self.numeric.values())
+        total += sum(a.nbytes for a in self.text_missing.values())
+        total += sum(len(v.encode("utf-8")) for vals in self.categories.values() for v in vals)
+        return total
+
+
+class CourseStoreBuilder:
+    """Accumulates courses one at a time, then freezes them into a CourseStore."""
+
+    def __init__(self):
+        self._text = {f: bytearray() for f in TEXT_FIELDS}
+        self._offsets = {f: [0] for f in TEXT_FIELDS}
+        self._missing_text = {f: [] for f in TEXT_FIELDS}
+        self._codes = {f: [] for f in CATEGORY_FIELDS}
+        self._code_of = {f: {} for f in CATEGORY_FIELDS}
+        self._numeric = {f: [] for f in NUMERIC_FIELDS}
+        self._extras: Dict[int, Dict] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, course: Dict):
+        row = self._size
+        # Fields outside the schema, or values of an unexpected type, are kept
+        # verbatim in the side table instead of being coerced
+        extra = {k: v for k, v in course.items() if k not in FIELD_ORDER}
+
+        for f in TEXT_FIELDS:
+            value = course.get(f)
+            if not isinstance(value, str):
+                self._missing_text[f].append(row)
+                if value is not None:
+                    extra[f] = value
+            else:
+                self._text[f] += value.encode("utf-8")
+            self._offsets[f].append(len(self._text[f]))
+
+        for f in CATEGORY_FIELDS:
+            value = course.get(f)
+            if not isinstance(value, str):
+                self._codes[f].append(-1)
+                if value is not None:
+                    extra[f] = value
+                continue
+            code = self._code_of[f].get(value)
+            if code is None:
+                code = self._code_of[f][value] = len(self._code_of[f])
+            self._codes[f].append(code)
+
+        for f in NUMERIC_FIELDS:
+            value = course.get(f)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._numeric[f].append(float(value))
+            else:
+                self._numeric[f].append(np.nan)
+                if value is not None:
+                    extra[f] = value
+
+        if extra:
+            self._extras[row] = extra
+        self._size += 1
+
+    def build(self) -> CourseStore:
+        text_missing = {}
+        for f in TEXT_FIELDS:
+            if self._missing_text[f]:
+                text_missing[f] = np.zeros(self._size, dtype=bool)
+                text_missing[f][self._missing_text[f]] = True
+        return CourseStore(
+            text_buffers={f: np.frombuffer(bytes(self._text[f]), dtype=np.uint8) for f in TEXT_FIELDS},
+            text_offsets={f: np.array(self._offsets[f], dtype=np.int64) for f in TEXT_FIELDS},
+            category_codes={f: np.array(self._codes[f], dtype=np.int32) for f in CATEGORY_FIELDS},
+            categories={f: list(self._code_of[f]) for f in CATEGORY_FIELDS},
+            numeric={f: np.array(self._numeric[f], dtype=np.float64) for f in NUMERIC_FIELDS},
+            extras=self._extras,
+            text_missing=text_missing,
+        )
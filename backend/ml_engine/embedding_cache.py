@@ -0,0 +1,266 @@
+"""
+Cache of user-text embeddings.
+
+Learners type the same few aspirations over and over ("Data Analyst",
+"data analyst ", ...). EmbeddingCache sits in front of the encoder and maps
+a normalized text to its embedding so repeated texts skip the transformer:
+
+- an in-process LRU bounded by entry count and bytes
+- optionally backed by a SQLite file that survives restarts and can be
+  shared by several worker processes (WAL mode, one row per text). Each
+  thread has its own connection and the disk I/O runs outside the memory
+  tier's lock; a SQLite error ("database is locked", disk full, ...) is
+  logged and the lookup / write is skipped, never failing the request
+
+encode_async() is the asyncio variant: memory hits are answered inline, the
+disk tier runs on the default executor and misses go to an async encoder.
+
+Normalization (normalize_text) lowercases, collapses whitespace and, for
+profile texts of the form "Aspiration: ...; Skills: a, b" (or ". Skills:"),
+sorts and de-duplicates the skills. The embedding stored for a key is the
+one computed for the first text that produced it.
+
+Settings (environment):
+  EMBEDDING_CACHE_SIZE       max entries held in memory (default 10000, 0 = off)
+  EMBEDDING_CACHE_MAX_BYTES  max bytes of vectors held in memory (default 64 MB)
+  EMBEDDING_CACHE_PATH       SQLite file for the on-disk tier (default: none)
+"""
+
+import asyncio
+import collections
+import os
+import re
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .embedding_store import content_key
+
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH") or None
+
+_WHITESPACE = re.compile(r"\s+")
+_PROFILE_TEXT = re.compile(r"^aspiration:\s*(.*?)\s*[.;]\s*skills:\s*(.*?)\s*\.?$")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical cache key text.
+    "Aspiration: Data  Analyst. Skills: SQL, python."
+      -> "aspiration: data analyst; skills: python, sql"
+    """
+    text = _WHITESPACE.sub(" ", text).strip().lower()
+    m = _PROFILE_TEXT.match(text)
+    if m:
+        aspiration, skills = m.groups()
+        skills = sorted({s.strip() for s in skills.split(",") if s.strip()})
+        text = f"aspiration: {aspiration}; skills: {', '.join(skills)}"
+    return text
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+        path: Optional[str] = EMBEDDING_CACHE_PATH,
+    ):
+        self.model_name = model_name
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.path = path
+
+        self._lru = collections.OrderedDict()  # key -> float32 vector
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._local = threading.local()  # per-thread SQLite connection
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                db = self._connect()
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                db.commit()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Warning: embedding cache disk tier {path} disabled: {e}")
+                self.path = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_errors = 0
+
+    def key(self, text: str) -> bytes:
+        return content_key(normalize_text(text), self.model_name)
+
+    # -------------------------
+    # Memory tier
+    # -------------------------
+    def _remember(self, key: bytes, vector: np.ndarray):
+        if not self.max_entries or key in self._lru:
+            return
+        self._lru[key] = vector
+        self._bytes += vector.nbytes
+        while self._lru and (len(self._lru) > self.max_entries or self._bytes > self.max_bytes):
+            _, old = self._lru.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def _from_memory(self, texts: List[str]) -> Tuple[List[bytes], List[Optional[np.ndarray]], int]:
+        keys = [self.key(t) for t in texts]
+        vectors = [None] * len(texts)
+        with self._lock:
+            for i, k in enumerate(keys):
+                v = self._lru.get(k)
+                if v is not None:
+                    self._lru.move_to_end(k)
+                    vectors[i] = v
+        return keys, vectors, sum(v is not None for v in vectors)
+
+    # -------------------------
+    # Disk tier (no lock held: each thread uses its own connection)
+    # -------------------------
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Short busy timeout: a contended cache is skipped, not waited on
+            db = sqlite3.connect(self.path, timeout=1)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _disk_error(self, action: str, error: sqlite3.Error):
+        self.disk_errors += 1
+        if self.disk_errors == 1 or self.disk_errors % 100 == 0:
+            print(f"Warning: embedding cache could not {action} {self.path} "
+                  f"({error}; {self.disk_errors} disk errors so far)")
+
+    def _load_from_disk(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        if self.path is None or not keys:
+            return {}
+        found = {}
+        try:
+            db = self._connect()
+            for start in range(0, len(keys), 500):  # stay under SQLite's variable limit
+                chunk = keys[start:start + 500]
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[bytes(key)] = np.frombuffer(blob, dtype=np.float32)
+        except sqlite3.Error as e:
+            self._disk_error("read", e)
+        return found
+
+    def _save_to_disk(self, items):
+        if self.path is None or not items:
+            return
+        try:
+            db = self._connect()
+            with db:
+                db.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(k, v.tobytes()) for k, v in items],
+                )
+        except sqlite3.Error as e:
+            self._disk_error("write", e)
+
+    def _from_disk(self, keys: List[bytes], vectors: List[Optional[np.ndarray]]) -> Dict[bytes, np.ndarray]:
+        """Fill `vectors` from the disk tier (in place); returns what was found."""
+        missing_keys = list({keys[i] for i, v in enumerate(vectors) if v is None})
+        from_disk = self._load_from_disk(missing_keys)
+        if from_disk:
+            with self._lock:
+                for k, v in from_disk.items():
+                    self._remember(k, v)
+            for i, k in enumerate(keys):
+                if vectors[i] is None and k in from_disk:
+                    vectors[i] = from_disk[k]
+        return from_disk
+
+    def _to_encode(self, texts: List[str], keys: List[bytes], vectors: List[Optional[np.ndarray]]) -> Dict[bytes, str]:
+        # First text seen for each still-missing key is the one encoded
+        to_encode = {}
+        for i, k in enumerate(keys):
+            if vectors[i] is None:
+                to_encode.setdefault(k, texts[i])
+        return to_encode
+
+    def _add_encoded(self, to_encode: Dict[bytes, str], fresh: np.ndarray,
+                     keys: List[bytes], vectors: List[Optional[np.ndarray]]) -> Dict[bytes, np.ndarray]:
+        fresh = np.asarray(fresh, dtype=np.float32)
+        encoded = {k: np.array(fresh[j]) for j, k in enumerate(to_encode)}
+        with self._lock:
+            for k, v in encoded.items():
+                self._remember(k, v)
+        for i, k in enumerate(keys):
+            if vectors[i] is None:
+                vectors[i] = encoded[k]
+        return encoded
+
+    def _finish(self, keys: List[bytes], vectors: List[np.ndarray], memory_hits: int,
+                from_disk: Dict[bytes, np.ndarray]) -> np.ndarray:
+        disk_hits = sum(1 for k in keys if k in from_disk)
+        with self._lock:
+            self.hits += memory_hits
+            self.disk_hits += disk_hits
+            self.misses += len(keys) - memory_hits - disk_hits
+
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings for texts as a float32 (len(texts), dim) matrix; only texts
+        whose normalized form is in neither tier are passed to encode_fn.
+        """
+        keys, vectors, memory_hits = self._from_memory(texts)
+        from_disk = self._from_disk(keys, vectors) if memory_hits < len(texts) else {}
+        to_encode = self._to_encode(texts, keys, vectors)
+        if to_encode:
+            encoded = self._add_encoded(to_encode, encode_fn(list(to_encode.values())), keys, vectors)
+            self._save_to_disk(list(encoded.items()))
+        return self._finish(keys, vectors, memory_hits, from_disk)
+
+    async def encode_async(self, texts: List[str],
+                           encode_fn: Callable[[List[str]], Awaitable[np.ndarray]]) -> np.ndarray:
+        """encode() for the event loop: encode_fn is awaited, SQLite runs on the default executor."""
+        keys, vectors, memory_hits = self._from_memory(texts)
+        loop = asyncio.get_running_loop()
+        from_disk = {}
+        if memory_hits < len(texts) and self.path is not None:
+            from_disk = await loop.run_in_executor(None, self._from_disk, keys, vectors)
+        to_encode = self._to_encode(texts, keys, vectors)
+        if to_encode:
+            encoded = self._add_encoded(to_encode, await encode_fn(list(to_encode.values())), keys, vectors)
+            if self.path is not None:
+                await loop.run_in_executor(None, self._save_to_disk, list(encoded.items()))
+        return self._finish(keys, vectors, memory_hits, from_disk)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "path": self.path,
+            "disk_errors": self.disk_errors,
+        }
@@ -0,0 +1,264 @@
+"""
+Persisted, versioned course-embedding index.
+
+Embeddings are stored in one directory per model: a float32 .npy matrix
+next to a .npy array of content keys (one per row) and a small JSON
+manifest. A key is a digest of the model name and the course text, so a row
+is reused only if both the text and the model are unchanged.
+
+Each save writes a new generation directory in full and publishes it with
+one atomic replace of a pointer file (see generations.py, shared with
+catalog_bundle.py), so a reader in another process always finds a complete
+index, never a half-written one or none at all; load() also checks the
+arrays against the manifest (generation, count, dimension, digest of the keys).
+
+Loading memory-maps the matrix; when the catalog is unchanged the mapped
+array is handed to the recommender as-is (zero-copy) and nothing is encoded.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import generations
+
+STORE_FORMAT_VERSION = 3
+KEY_DTYPE = "S16"  # 128-bit blake2b digest
+
+
+def course_text(course: Dict) -> str:
+    """
+    Rich text representation of a course used for embedding.
+    e.g. "Title: Python 101. Description: Learn basic coding. Skills: Python"
+    """
+    return (
+        f"Title: {course.get('title', '')}. "
+        f"Description: {course.get('description', '')}. "
+        f"Skills: {course.get('skills', '')}"
+    )
+
+
+def content_key(text: str, model_name: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.digest()
+
+
+def _digest(keys: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(keys).tobytes(), digest_size=16).hexdigest()
+
+
+def content_keys(texts: List[str], model_name: str) -> np.ndarray:
+    return np.array([content_key(t, model_name) for t in texts], dtype=KEY_DTYPE)
+
+
+class CourseEmbeddingStore:
+    def __init__(self, directory: str, model_name: str):
+        """
+        directory: where the index files live (e.g. ml_engine/models)
+        model_name: SBERT model the vectors were produced with
+        """
+        self.directory = directory
+        self.model_name = model_name
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        # Holds the CURRENT pointer and one directory per generation
+        self.path = os.path.join(directory, f"course_embeddings-{slug}")
+
+    @property
+    def vectors_path(self) -> Optional[str]:
+        """vectors.npy of the live generation, None if nothing was saved."""
+        live = generations.resolve(self.path)
+        return os.path.join(live[1], "vectors.npy") if live is not None else None
+
+    def _read_manifest(self, directory: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format_version") != STORE_FORMAT_VERSION:
+            return None
+        if manifest.get("model_name") != self.model_name:
+            return None
+        return manifest
+
+    def load(self, attempts: int = 3) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Return (keys, vectors) with vectors memory-mapped read-only,
+        or None if there is no valid index for this model on disk.
+
+        Everything is read from the one generation CURRENT names. If that
+        generation is pruned mid-read (two saves in quick succession) the
+        load is retried on the new one.
+        """
+        for _ in range(attempts):
+            live = generations.resolve(self.path)
+            if live is None:
+                return None
+            generation, directory = live
+            manifest = self._read_manifest(directory)
+            if manifest is None:
+                if os.path.isdir(directory):
+                    return None
+                continue
+            if manifest.get("generation") != generation:
+                return None
+            try:
+                keys = np.load(os.path.join(directory, "keys.npy"))
+                vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+            except (OSError, ValueError):
+                continue
+            if vectors.dtype != np.float32 or vectors.ndim != 2 or len(keys) != vectors.shape[0]:
+                return None
+            if manifest.get("count") != len(keys) or manifest.get("dim") != vectors.shape[1] \
+                    or manifest.get("keys_digest") != _digest(keys):
+                return None
+            return keys, vectors
+        return None
+
+    def _manifest(self, keys: np.ndarray, dim: int, generation: str) -> Dict:
+        return {
+            "format_version": STORE_FORMAT_VERSION,
+            "model_name": self.model_name,
+            "count": int(len(keys)),
+            "dim": int(dim),
+            "keys_digest": _digest(keys),
+            "generation": generation,
+        }
+
+    def save(self, keys: np.ndarray, vectors: np.ndarray):
+        """Atomically replace the on-disk index (all three files at once)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        keys = np.asarray(keys, dtype=KEY_DTYPE)
+
+        generation, directory = generations.new_generation(self.path)
+        try:
+            np.save(os.path.join(directory, "vectors.npy"), vectors)
+            np.save(os.path.join(directory, "keys.npy"), keys)
+            manifest = self._manifest(keys, vectors.shape[1] if vectors.ndim == 2 else 0, generation)
+            with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            generations.publish(self.path, generation)
+        except BaseException:
+            generations.discard(self.path, generation)
+            raise
+
+    def get_vectors(
+        self,
+        texts: List[str],
+        encode_fn: Callable[[List[str]], np.ndarray],
+        persist: bool = True,
+    ) -> np.ndarray:
+        """
+        Return a float32 (len(texts), dim) matrix for texts.
+
+        Rows already in the store are reused; only new or changed texts are
+        passed to encode_fn. If the store already matches texts exactly the
+        memory-mapped array is returned without copying.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        keys = content_keys(texts, self.model_name)
+        cached = self.load()
+
+        if cached is not None:
+            cached_keys, cached_vectors = cached
+            if len(cached_keys) == len(keys) and np.array_equal(cached_keys, keys):
+                return cached_vectors
+
+            row_of: Dict[bytes, int] = {k: i for i, k in enumerate(cached_keys.tolist())}
+            rows = np.array([row_of.get(k, -1) for k in keys.tolist()], dtype=np.int64)
+        else:
+            cached_vectors = None
+            rows = np.full(len(keys), -1, dtype=np.int64)
+
+        missing = np.flatnonzero(rows < 0)
+        print(f"Course embedding index: {len(keys) - len(missing)} cached, {len(missing)} to encode")
+
+        new_vectors = None
+        if len(missing):
+            new_vectors = np.asarray(encode_fn([texts[i] for i in missing]), dtype=np.float32)
+
+        dim = new_vectors.shape[1] if new_vectors is not None else cached_vectors.shape[1]
+        vectors = np.empty((len(keys), dim), dtype=np.float32)
+        hit = rows >= 0
+        if hit.any():
+            vectors[hit] = cached_vectors[rows[hit]]
+        if new_vectors is not None:
+            vectors[missing] = new_vectors
+
+        if persist:
+            self.save(keys, vectors)
+        return vectors
+
+    def writer(self) -> "EmbeddingStoreWriter":
+        """Incremental writer for catalogs too large to hold twice in memory."""
+        return EmbeddingStoreWriter(self)
+
+
+class EmbeddingStoreWriter:
+    """
+    Appends (keys, vectors) batches to a scratch file, then commit() turns
+    them into the store's .npy files (published as one generation) and
+    returns the memory-mapped result. Peak memory is one batch plus the keys.
+    """
+
+    COPY_ROWS = 65536
+
+    def __init__(self, store: CourseEmbeddingStore):
+        self.store = store
+        self._generation, self._tmp = generations.new_generation(store.path)
+        self._raw_path = os.path.join(self._tmp, "vectors.raw")
+        self._raw = open(self._raw_path, "wb")
+        self._keys: List[np.ndarray] = []
+        self.count = 0
+        self.dim = None
+
+    def append(self, keys: np.ndarray, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(vectors) == 0:
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension changed from {self.dim} to {vectors.shape[1]}")
+        self._raw.write(vectors.tobytes())
+        self._keys.append(np.asarray(keys, dtype=KEY_DTYPE))
+        self.count += len(vectors)
+
+    def commit(self) -> np.ndarray:
+        store = self.store
+        self._raw.close()
+        try:
+            dim = self.dim or 0
+            keys = np.concatenate(self._keys) if self._keys else np.empty(0, dtype=KEY_DTYPE)
+            out = np.lib.format.open_memmap(os.path.join(self._tmp, "vectors.npy"), mode="w+",
+                                            dtype=np.float32, shape=(self.count, dim))
+            if self.count and dim:
+                raw = np.memmap(self._raw_path, dtype=np.float32, mode="r", shape=(self.count, dim))
+                for start in range(0, self.count, self.COPY_ROWS):
+                    out[start:start + self.COPY_ROWS] = raw[start:start + self.COPY_ROWS]
+                del raw
+            out.flush()
+            del out
+            os.remove(self._raw_path)
+
+            np.save(os.path.join(self._tmp, "keys.npy"), keys)
+            with open(os.path.join(self._tmp, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(store._manifest(keys, dim, self._generation), f, indent=2)
+            generations.publish(store.path, self._generation)
+        except BaseException:
+            generations.discard(store.path, self._generation)
+            raise
+        return np.load(os.path.join(self._tmp, "vectors.npy"), mmap_mode="r")
+
+    def abort(self):
+        self._raw.close()
+        generations.discard(self.store.path, self._generation)
@@ -17,6 +17,8 @@ Notes:
 from typing import Dict, List, Tuple
 import re
 
+import numpy as np
+
 # -------------------------
 # Config / Small knowledge base
 # -------------------------
@@ -79,21 +81,120 @@ def _tokenize_text(text: str) -> List[str]:
     return tokens
 
 
-def extract_skills_from_text(text: str, vocab: List[str] = SKILL_VOCAB) -> List[str]:
+# characters that belong to a token (same set _tokenize_text keeps: c++, c#, ui/ux, ...)
+_TOKEN_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789+#-/")
+
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over a skill vocabulary, compiled once.
+
+    find() scans the lowercased text a single time; the cost depends on the
+    text length and the number of matches, not on the vocabulary size, so
+    it scales to taxonomy-sized vocabularies (tens of thousands of skills).
+
+    word_boundary=False reproduces the original substring semantics exactly
+    (e.g. "c" matches inside "machine"). word_boundary=True only accepts a
+    match whose neighbours are not token characters, so "c" no longer
+    matches "machine" or "c++", while "node" still matches "node.js".
+    """
+
+    def __init__(self, vocab: List[str]):
+        self.skills: List[str] = []
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        seen = set()
+        for skill in vocab:
+            skill_lc = skill.lower()
+            if not skill_lc or skill_lc in seen:
+                continue
+            seen.add(skill_lc)
+            node = 0
+            for ch in skill_lc:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                node = nxt
+            outputs[node].append(len(self.skills))
+            self.skills.append(skill_lc)
+
+        # Breadth-first failure links; each node's outputs include those of
+        # its failure chain, so a search step never has to walk it.
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+        self._lengths = [len(s) for s in self.skills]
+
+    def find(self, text: str, word_boundary: bool = False) -> set:
+        """Return the set of (lowercased) vocabulary skills found in text."""
+        found = set()
+        if not text:
+            return found
+        text_lc = text.lower()
+        goto, fail, outputs, lengths, skills = self._goto, self._fail, self._outputs, self._lengths, self.skills
+        n = len(text_lc)
+        node = 0
+        for i, ch in enumerate(text_lc):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in outputs[node]:
+                if word_boundary:
+                    start = i - lengths[idx] + 1
+                    if start > 0 and text_lc[start - 1] in _TOKEN_CHARS:
+                        continue
+                    if i + 1 < n and text_lc[i + 1] in _TOKEN_CHARS:
+                        continue
+                found.add(skills[idx])
+        return found
+
+
+# compiled matchers, keyed by the contents of the vocabulary they were built from
+_skill_matchers: Dict[Tuple[str, ...], SkillMatcher] = {}
+MAX_SKILL_MATCHERS = 8
+
+
+def get_skill_matcher(vocab: List[str] = SKILL_VOCAB) -> SkillMatcher:
+    """
+    Compiled matcher for vocab, built on first use. Looked up by the skills
+    themselves, so a list edited in place (skills appended or replaced at
+    runtime) gets a matcher for what it holds now.
+    """
+    key = tuple(vocab)
+    matcher = _skill_matchers.get(key)
+    if matcher is None:
+        matcher = SkillMatcher(key)
+        if len(_skill_matchers) >= MAX_SKILL_MATCHERS:
+            _skill_matchers.clear()
+        _skill_matchers[key] = matcher
+    return matcher
+
+
+def extract_skills_from_text(text: str, vocab: List[str] = SKILL_VOCAB, word_boundary: bool = False) -> List[str]:
     """
-    Simple skill extractor: checks if any vocab item appears as substring in text tokens.
+    Skill extractor: finds every vocab item that appears in the text using a
+    precompiled SkillMatcher (single pass over the text).
+    word_boundary=True requires matches to sit on token boundaries.
     Returns list of matched canonical skills (lowercased).
     """
     if not text:
         return []
-    text_lc = text.lower()
-    # exact token match or substring match for multi-word skills
-    found = set()
-    for skill in vocab:
-        skill_lc = skill.lower()
-        if skill_lc in text_lc:
-            found.add(skill_lc)
-    return sorted(list(found))
+    return sorted(get_skill_matcher(vocab).find(text, word_boundary=word_boundary))
 
 
 def normalize_aspiration(aspiration: str) -> str:
@@ -127,6 +228,117 @@ def normalize_aspiration(aspiration: str) -> str:
     return ""
 
 
+# -------------------------
+# Role requirement bitsets
+# -------------------------
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Per-element popcount of a uint64 array."""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(words)
+    as_bytes = words.view(np.uint8).reshape(words.shape + (8,))
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1)
+
+
+class RoleSkillIndex:
+    """
+    ROLE_REQUIRED_SKILLS compiled into integer skill ids and bitsets.
+
+    Every distinct required skill gets a bit. A user skill is compiled (once,
+    then cached) into the bitset of required skills it covers, using the same
+    bidirectional substring rule build_feature_vector always used
+    (`req in s or s in req`). After that, coverage for a role is just
+    popcount(user_mask & role_mask).
+
+    score_all_roles() does the same for every role at once on uint64 words,
+    which is what "best-fit role" suggestions need.
+    """
+
+    MAX_CACHED_SKILLS = 50000
+
+    def __init__(self, role_skills: Dict[str, List[str]] = ROLE_REQUIRED_SKILLS):
+        required = sorted({r.lower() for skills in role_skills.values() for r in skills})
+        self.required_skills = required
+        self.skill_bit = {skill: i for i, skill in enumerate(required)}
+
+        self.roles = list(role_skills)
+        self.role_masks: Dict[str, int] = {}
+        for role, skills in role_skills.items():
+            mask = 0
+            for r in skills:
+                mask |= 1 << self.skill_bit[r.lower()]
+            self.role_masks[role] = mask
+
+        # (n_roles, n_words) uint64 matrix for the vectorized path
+        self.n_words = max(1, (len(required) + 63) // 64)
+        self.role_words = np.array([self._to_words(self.role_masks[r]) for r in self.roles], dtype=np.uint64)
+        self.role_sizes = _popcount(self.role_words).sum(axis=1) if self.roles else np.zeros(0, dtype=np.int64)
+
+        self._cover_cache: Dict[str, int] = {}
+
+    def _to_words(self, mask: int) -> List[int]:
+        return [(mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for w in range(self.n_words)]
+
+    def skill_mask(self, skill: str) -> int:
+        """Bitset of required skills that `skill` covers."""
+        mask = self._cover_cache.get(skill)
+        if mask is None:
+            mask = 0
+            for req, bit in self.skill_bit.items():
+                if req in skill or skill in req:
+                    mask |= 1 << bit
+            if len(self._cover_cache) >= self.MAX_CACHED_SKILLS:
+                self._cover_cache.clear()
+            self._cover_cache[skill] = mask
+        return mask
+
+    def user_mask(self, skills) -> int:
+        mask = 0
+        for s in skills:
+            mask |= self.skill_mask(s)
+        return mask
+
+    def coverage(self, role: str, user_mask: int) -> Tuple[int, int]:
+        """(matched, required) counts for one role."""
+        role_mask = self.role_masks.get(role, 0)
+        return bin(user_mask & role_mask).count("1"), bin(role_mask).count("1")
+
+    def score_all_roles(self, skills) -> Dict[str, Dict]:
+        """
+        Coverage of every role for one user in a single vectorized step.
+        Returns role -> {"coverage": 0..1, "matched": int, "missing": int}.
+        """
+        user_words = np.array(self._to_words(self.user_mask(skills)), dtype=np.uint64)
+        matched = _popcount(self.role_words & user_words).sum(axis=1)
+        out = {}
+        for role, m, size in zip(self.roles, matched.tolist(), self.role_sizes.tolist()):
+            out[role] = {
+                "coverage": m / max(1, size),
+                "matched": int(m),
+                "missing": int(size - m),
+            }
+        return out
+
+    def best_fit_roles(self, skills, top_n: int = 3) -> List[Tuple[str, float]]:
+        """Roles ranked by skill coverage (ties broken by market demand)."""
+        scores = self.score_all_roles(skills)
+        ranked = sorted(
+            scores.items(),
+            key=lambda kv: (kv[1]["coverage"], CAREER_DEMAND_MAP.get(kv[0], 0.0)),
+            reverse=True,
+        )
+        return [(role, s["coverage"]) for role, s in ranked[:top_n]]
+
+
+_role_skill_index = None
+
+
+def get_role_skill_index() -> RoleSkillIndex:
+    global _role_skill_index
+    if _role_skill_index is None:
+        _role_skill_index = RoleSkillIndex()
+    return _role_skill_index
+
+
 # -------------------------
 # Public function
 # -------------------------
@@ -196,22 +408,14 @@ def build_feature_vector(
     role = normalize_aspiration(career_aspiration)
     market_demand = CAREER_DEMAND_MAP.get(role, 0.6)
 
-    # required skills for that role
-    required = ROLE_REQUIRED_SKILLS.get(role, [])
-    required_norm = [r.lower() for r in required]
-
-    if required_norm:
-        # compute coverage ratio: how many required skills exist in extracted_skills
-        matched = 0
-        for req in required_norm:
-            # check substring presence in extracted_skills or in input skills
-            for s in extracted_skills:
-                if req in s or s in req:
-                    matched += 1
-                    break
-        skill_coverage_ratio = matched / max(1, len(required_norm))
-        missing_skills_count = len(required_norm) - matched
-        missing_skills_count_norm = normalize(missing_skills_count, 0.0, len(required_norm))
+    # required skills for that role: coverage is a popcount over precompiled bitsets
+    role_index = get_role_skill_index()
+    matched, required_count = role_index.coverage(role, role_index.user_mask(extracted_skills))
+
+    if required_count:
+        skill_coverage_ratio = matched / max(1, required_count)
+        missing_skills_count = required_count - matched
+        missing_skills_count_norm = normalize(missing_skills_count, 0.0, required_count)
     else:
         skill_coverage_ratio = 0.0
         missing_skills_count_norm = 0.0
@@ -232,17 +436,29 @@ def build_feature_vector(
 # -------------------------
 # Advanced: Unsupervised Semantic Enrichment
 # -------------------------
-from .recommender import PathwayRecommender
-
-# Global instance (lazy loaded)
+# Global instance (lazy loaded, like the recommender import itself, so the
+# rule-based path never imports the embedding stack). The underlying SBERT model comes from the
+# shared model registry, so this does not load a second copy of the model
+# when inference.py has already built its own PathwayRecommender.
 _recommender = None
 
-def get_recommender():
+def get_recommender(create: bool = True):
+    """The shared recommender; with create=False, None if nobody has needed it yet."""
     global _recommender
-    if _recommender is None:
+    if _recommender is None and create:
+        from .recommender import PathwayRecommender
         _recommender = PathwayRecommender()
     return _recommender
 
+def build_profile_text(career_aspiration: str, skills: List[str]) -> str:
+    """
+    Rich text representation of the user used for the profile embedding.
+    "Aspiration: Data Scientist. Skills: Python, SQL."
+    """
+    skills_str = ", ".join(skills)
+    return f"Aspiration: {career_aspiration}. Skills: {skills_str}."
+
+
 def enrich_features_with_embedding(feature_dict: Dict, career_aspiration: str) -> Dict:
     """
     Computes a dense vector embedding for the user profile using Sentence Transformers.
@@ -250,9 +466,7 @@ def enrich_features_with_embedding(feature_dict: Dict, career_aspiration: str) -
     rec = get_recommender()
     
     # Construct a rich text representation of the user
-    # "Aspiration: Data Scientist. Skills: Python, SQL. Bio: Looking for ml roles."
-    skills_str = ", ".join(feature_dict.get("extracted_skills", []))
-    rich_text = f"Aspiration: {career_aspiration}. Skills: {skills_str}."
+    rich_text = build_profile_text(career_aspiration, feature_dict.get("extracted_skills", []))
     
     vector = rec.encode([rich_text])[0] # 1D array
     
@@ -0,0 +1,90 @@
+"""
+Directories published as immutable generations behind a pointer file.
+
+Used by the course embedding store (embedding_store.py) and the catalog
+bundle (catalog_bundle.py):
+
+    <path>/CURRENT          name of the live generation
+    <path>/g-<...>/         one complete copy of the files, never modified
+
+A writer fills a new generation directory, then publish() replaces CURRENT
+with a file naming it. That os.replace is the only step readers can observe
+and it is atomic (on Windows too), so a reader always finds either the old
+or the new generation, never none and never a mix of both. The previous
+generation is kept for readers that resolved CURRENT just before the swap;
+older ones are removed.
+
+Readers resolve() the live directory once, read everything from it and
+check that the manifest they read names the same generation; a reader that
+lost a race with two quick publishes simply retries.
+"""
+
+import os
+import shutil
+import time
+from typing import Optional, Tuple
+
+POINTER = "CURRENT"
+PREFIX = "g-"
+
+
+def current_generation(path: str) -> Optional[str]:
+    """Name of the live generation under `path`, None if nothing was published."""
+    try:
+        with open(os.path.join(path, POINTER), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return name if name.startswith(PREFIX) and os.sep not in name else None
+
+
+def resolve(path: str) -> Optional[Tuple[str, str]]:
+    """(generation, directory) of the live generation, or None."""
+    generation = current_generation(path)
+    if generation is None:
+        return None
+    return generation, os.path.join(path, generation)
+
+
+def new_generation(path: str) -> Tuple[str, str]:
+    """Create an empty generation directory to write into: (generation, directory)."""
+    os.makedirs(path, exist_ok=True)
+    # Names sort by creation time, so pruning never touches a newer one still being written
+    generation = f"{PREFIX}{time.time_ns():016x}-{os.urandom(4).hex()}"
+    directory = os.path.join(path, generation)
+    os.makedirs(directory)
+    return generation, directory
+
+
+def publish(path: str, generation: str):
+    """Make `generation` the live one with a single atomic replace of CURRENT."""
+    if not os.path.isdir(os.path.join(path, generation)):
+        raise FileNotFoundError(f"Generation {generation!r} does not exist under {path}")
+    previous = current_generation(path)
+    tmp = os.path.join(path, f"{POINTER}.tmp-{os.getpid()}-{os.urandom(4).hex()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, POINTER))
+    _prune(path, keep=min(generation, previous or generation))
+
+
+def discard(path: str, generation: str):
+    """Remove a generation that was never published (a failed write)."""
+    shutil.rmtree(os.path.join(path, generation), ignore_errors=True)
+
+
+def _prune(path: str, keep: str):
+    """Remove generations older than `keep`, and files of the old single-directory layout."""
+    for name in os.listdir(path):
+        full = os.path.join(path, name)
+        if name.startswith(PREFIX):
+            if name < keep:
+                shutil.rmtree(full, ignore_errors=True)
+        elif name != POINTER and not name.startswith(f"{POINTER}.tmp-") and os.path.isfile(full):
+            # Readers holding maps of these files keep them until they reopen
+            try:
+                os.remove(full)
+            except OSError:
+                pass
@@ -0,0 +1,238 @@
+"""
+Streaming catalog ingestion.
+
+Real catalogs (Coursera / edX / Kaggle dumps) are too large to json.load
+into Python objects before doing anything. ingest_catalog() instead runs
+
+    reader -> validation -> batched embedding -> append to store / index
+
+one batch at a time:
+
+- iter_course_records() streams NDJSON (one course per line) or a JSON
+  array (decoded element by element from a fixed-size read buffer)
+- validate_course() rejects records without a title/description, with
+  non-numeric NSQF level / duration, or with an id that is not a string /
+  integer or that repeats one seen before (42 and "42" count as the same)
+- valid records go straight into a CourseStoreBuilder (compact columns, no
+  dicts kept) and are encoded `batch_size` at a time; vectors already in the
+  CourseEmbeddingStore are reused and the rest are streamed to disk
+- at the end the memory-mapped vectors are installed in the recommender
+
+Peak memory is one batch of records plus the columnar catalog (and the
+float32 vectors once, as a memory map when a store is used).
+"""
+
+import json
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from .catalog_delta import id_key
+from .course_store import CourseStore, CourseStoreBuilder
+from .embedding_store import CourseEmbeddingStore, content_keys, course_text
+
+READ_CHUNK_BYTES = 1 << 20
+NUMERIC_FIELDS = ("nsqf_level", "duration_hours")
+
+
+# -------------------------
+# Reading
+# -------------------------
+def _iter_json_array(f, chunk_bytes: int = READ_CHUNK_BYTES) -> Iterator:
+    """Yield the elements of a top-level JSON array without loading it all."""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_bytes).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array of courses")
+    pos, eof = 1, False
+    while True:
+        # Skip separators between elements
+        while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+            complete = end < len(buf) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # Element (possibly) continues past the buffer: drop what was
+            # consumed, read more and retry
+            more = f.read(chunk_bytes)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        pos = end
+
+
+def iter_course_records(path: str) -> Iterator:
+    """
+    Stream course records from `path`: NDJSON / JSON Lines, or a JSON array
+    (detected from the first non-blank character).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_json_array(f)
+            return
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e.msg})") from e
+
+
+# -------------------------
+# Validation
+# -------------------------
+def validate_course(record, seen_ids: Optional[set] = None) -> Optional[str]:
+    """Return None if the record can be ingested, else the reason it cannot."""
+    if not isinstance(record, dict):
+        return f"expected an object, got {type(record).__name__}"
+    for field in ("title", "description"):
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return f"missing or empty {field!r}"
+    for field in NUMERIC_FIELDS:
+        value = record.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return f"{field!r} must be a number, got {value!r}"
+    course_id = record.get("id")
+    if course_id is not None and (isinstance(course_id, bool) or not isinstance(course_id, (str, int))):
+        return f"'id' must be a string or an integer, got {course_id!r}"
+    if seen_ids is not None and course_id is not None:
+        # Ids are compared as strings downstream: 42 and "42" are the same course
+        key = id_key(course_id)
+        if key in seen_ids:
+            return f"duplicate id {course_id!r}"
+        seen_ids.add(key)
+    return None
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+class _CachedVectors:
+    """Lookup of vectors already in the embedding store, by content key (no dict of keys)."""
+
+    def __init__(self, store: Optional[CourseEmbeddingStore]):
+        self.keys = self.vectors = None
+        loaded = store.load() if store is not None else None
+        if loaded is not None and len(loaded[0]):
+            keys, self.vectors = loaded
+            self.order = np.argsort(keys)
+            self.keys = keys[self.order]
+
+    def rows(self, keys: np.ndarray) -> np.ndarray:
+        """Row in the store for each key, -1 where not cached."""
+        if self.keys is None:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, self.order[pos], -1)
+
+
+def ingest_catalog(
+    path: str,
+    recommender=None,
+    embedding_store: Optional[CourseEmbeddingStore] = None,
+    batch_size: int = 256,
+    progress_every: int = 10000,
+    max_errors_shown: int = 5,
+    log: Callable[[str], None] = print,
+) -> Dict:
+    """
+    Stream the catalog at `path` into `recommender` (a PathwayRecommender).
+
+    embedding_store: persist vectors here and reuse the ones already in it;
+        without a store vectors are kept in memory.
+    recommender=None only validates and builds the CourseStore.
+
+    Returns stats: courses, invalid, encoded, reused, seconds and the
+    resulting 'catalog' (CourseStore).
+    """
+    start = time.perf_counter()
+    builder = CourseStoreBuilder()
+    seen_ids = set()
+    stats = {"read": 0, "courses": 0, "invalid": 0, "encoded": 0, "reused": 0}
+
+    if recommender is None or not recommender.vectorizer:
+        # Mock-mode vectors are random: never persist or reuse them
+        embedding_store = None
+    encode = recommender._encode_direct if recommender is not None else None
+    model_name = embedding_store.model_name if embedding_store is not None else ""
+    cached = _CachedVectors(embedding_store)
+    writer = embedding_store.writer() if embedding_store is not None else None
+    in_memory = []
+    batch = []
+
+    def flush():
+        if not batch or recommender is None:
+            batch.clear()
+            return
+        texts = [course_text(c) for c in batch]
+        keys = content_keys(texts, model_name)
+        rows = cached.rows(keys)
+        missing = np.flatnonzero(rows < 0)
+        fresh = np.asarray(encode([texts[i] for i in missing]), dtype=np.float32) if len(missing) else None
+        dim = fresh.shape[1] if fresh is not None else cached.vectors.shape[1]
+        batch_vectors = np.empty((len(texts), dim), dtype=np.float32)
+        hit = rows >= 0
+        if hit.any():
+            batch_vectors[hit] = cached.vectors[rows[hit]]
+        if fresh is not None:
+            batch_vectors[missing] = fresh
+        stats["encoded"] += len(missing)
+        stats["reused"] += int(hit.sum())
+        if writer is not None:
+            writer.append(keys, batch_vectors)
+        else:
+            in_memory.append(batch_vectors)
+        batch.clear()
+
+    try:
+        for record in iter_course_records(path):
+            stats["read"] += 1
+            error = validate_course(record, seen_ids)
+            if error is not None:
+                stats["invalid"] += 1
+                if stats["invalid"] <= max_errors_shown:
+                    log(f"Skipping record {stats['read']}: {error}")
+                continue
+            builder.append(record)
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+            if progress_every and stats["read"] % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                log(f"Ingested {len(builder)} courses ({stats['read'] / elapsed:.0f} records/s, "
+                    f"{stats['invalid']} invalid, {stats['encoded']} encoded, {stats['reused']} reused)")
+        flush()
+        vectors = writer.commit() if writer is not None else None
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    courses: CourseStore = builder.build()
+    if recommender is not None:
+        if vectors is None:
+            vectors = np.concatenate(in_memory) if in_memory else np.empty((0, 0), dtype=np.float32)
+        recommender.set_catalog(courses, vectors)
+
+    stats["courses"] = len(courses)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    log(f"Ingestion complete: {stats['courses']} courses, {stats['invalid']} invalid, "
+        f"{stats['encoded']} encoded, {stats['reused']} reused in {stats['seconds']}s")
+    stats["catalog"] = courses
+    return stats
@@ -0,0 +1,183 @@
+"""
+BM25 inverted index over the course catalog.
+
+Dense retrieval misses exact skill / keyword hits ("Phlebotomy", "PCB
+Assembly") and needs a transformer pass per query. This index is built once
+per catalog, next to the filter index (and precompiled into the catalog
+bundle by setup_full.py):
+
+- title, skills and description are tokenized (lowercase alphanumerics,
+  keeping c++ / c# style tokens) and weighted per field (BM25F-style term
+  frequency: a title hit counts more than a description hit)
+- the BM25 contribution of every (term, course) pair is computed at build
+  time, so a posting is just (uint32 course row, float16 impact), about 6
+  bytes, grouped per term in CSR layout (offsets into one array)
+- scoring a query sums the postings of its terms into one float32 array
+
+CatalogSnapshot uses it for the "lexical" and "hybrid" retrieval modes (see
+snapshot.py):
+
+- "dense": cosine similarity of SBERT embeddings only (the original behaviour)
+- "hybrid": the top HYBRID_CANDIDATES x top_k of both the dense and the BM25
+  ranking are re-scored as HYBRID_ALPHA * cosine + (1 - HYBRID_ALPHA) *
+  BM25 / (best BM25 score of the query)
+- "lexical": BM25 only, no transformer call. PathwayRecommender falls back to
+  it when the encoder is unavailable or overloaded. match_score is the BM25
+  score over the highest score the query's terms can reach (their best
+  postings summed), so it stays in [0, 1] like a cosine; the raw score is
+  returned as bm25_score
+
+Settings (environment):
+  RETRIEVAL_MODE     "dense", "hybrid" or "lexical" (default "dense"; hybrid is opt-in)
+  HYBRID_ALPHA       weight of the dense score in hybrid mode (default 0.6)
+  HYBRID_CANDIDATES  candidates taken from each ranking, as a multiple of top_k (default 10)
+"""
+
+import json
+import os
+import re
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .course_store import CourseStore
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or that the this to with".split()
+)
+# Field -> term-frequency weight
+FIELD_WEIGHTS = {"title": 3.0, "skills": 2.0, "description": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+RETRIEVAL_MODES = ("dense", "hybrid", "lexical")
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "dense")
+HYBRID_ALPHA = float(os.environ.get("HYBRID_ALPHA", "0.6"))
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "10"))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def top_matches(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Rows of the `top_k` highest positive scores, best first."""
+    matched = np.flatnonzero(scores > 0)
+    if len(matched) > top_k:
+        matched = matched[np.argpartition(scores[matched], len(matched) - top_k)[len(matched) - top_k:]]
+    return matched[np.argsort(scores[matched])[::-1]]
+
+
+class LexicalIndex:
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, rows: np.ndarray,
+                 impacts: np.ndarray, df: np.ndarray, n_docs: int, avgdl: float):
+        self.vocab = vocab
+        self.offsets = offsets  # int64 (n_terms + 1,)
+        self.rows = rows  # uint32 course rows, ascending within each term
+        self.impacts = impacts  # float16 precomputed BM25 contribution
+        self.df = df  # uint32 document frequency per term
+        self.n_docs = n_docs
+        self.avgdl = avgdl
+
+    @classmethod
+    def build(cls, courses: CourseStore, reference: Optional["LexicalIndex"] = None) -> "LexicalIndex":
+        """
+        reference: take corpus statistics (document count, average length,
+            document frequencies) from another index, so scores of a small
+            index (the incremental delta) are comparable with the base one.
+        """
+        vocab: Dict[str, int] = {}
+        term_ids, doc_rows, tfs = array("I"), array("I"), array("f")
+        doc_len = np.zeros(len(courses), dtype=np.float32)
+        for row in range(len(courses)):
+            weighted: Dict[int, float] = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(courses.text(field, row)):
+                    term = vocab.setdefault(token, len(vocab))
+                    weighted[term] = weighted.get(term, 0.0) + weight
+                    doc_len[row] += weight
+            for term, tf in weighted.items():
+                term_ids.append(term)
+                doc_rows.append(row)
+                tfs.append(tf)
+
+        term_ids = np.frombuffer(term_ids, dtype=np.uint32)
+        doc_rows = np.frombuffer(doc_rows, dtype=np.uint32)
+        tfs = np.frombuffer(tfs, dtype=np.float32)
+        order = np.lexsort((doc_rows, term_ids))
+        term_ids, doc_rows, tfs = term_ids[order], doc_rows[order], tfs[order]
+        counts = np.bincount(term_ids, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        df = counts.astype(np.uint32)
+
+        n_docs, avgdl = len(courses), float(doc_len.mean()) if len(courses) else 1.0
+        if reference is not None:
+            # These courses come on top of the reference corpus, so a term's
+            # document frequency can never exceed n_docs
+            n_docs, avgdl = reference.n_docs + len(courses), reference.avgdl
+            for token, term in vocab.items():
+                ref_term = reference.vocab.get(token)
+                if ref_term is not None:
+                    df[term] = max(df[term], reference.df[ref_term])
+        # In floats: n_docs - df on the uint32 counts would wrap around. A
+        # negative idf would make matching courses score below 0 (and drop out)
+        df_f = df.astype(np.float64)
+        idf = np.maximum(np.log1p((n_docs - df_f + 0.5) / (df_f + 0.5)), 0.0).astype(np.float32)
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len[doc_rows] / max(avgdl, 1e-6))
+        impacts = (idf[term_ids] * tfs * (BM25_K1 + 1.0) / (tfs + norm)).astype(np.float16)
+        return cls(vocab, offsets, doc_rows, impacts, df, n_docs, avgdl)
+
+    def score(self, query_text: str, n_rows: int) -> Optional[np.ndarray]:
+        """BM25 score of every row (0 where no term matches); None if no query term is indexed."""
+        terms = [self.vocab[t] for t in dict.fromkeys(tokenize(query_text)) if t in self.vocab]
+        if not terms:
+            return None
+        scores = np.zeros(n_rows, dtype=np.float32)
+        for term in terms:
+            start, end = self.offsets[term], self.offsets[term + 1]
+            # Rows are unique within a posting list, so fancy-index += is safe
+            scores[self.rows[start:end]] += self.impacts[start:end]
+        return scores
+
+    def term_bounds(self, query_text: str) -> Dict[str, float]:
+        """Highest impact of each indexed query term: the most it can add to any row's score."""
+        bounds = {}
+        for token in dict.fromkeys(tokenize(query_text)):
+            term = self.vocab.get(token)
+            if term is not None and self.offsets[term + 1] > self.offsets[term]:
+                bounds[token] = float(self.impacts[self.offsets[term]:self.offsets[term + 1]].max())
+        return bounds
+
+    def nbytes(self) -> int:
+        return int(self.offsets.nbytes + self.rows.nbytes + self.impacts.nbytes + self.df.nbytes)
+
+    # -------------------------
+    # Binary form (catalog bundle)
+    # -------------------------
+    def save(self, directory: str):
+        for name in ("offsets", "rows", "impacts", "df"):
+            np.save(os.path.join(directory, f"lexical_{name}.npy"), getattr(self, name))
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(os.path.join(directory, "lexical.json"), "w", encoding="utf-8") as f:
+            json.dump({"terms": terms, "n_docs": self.n_docs, "avgdl": self.avgdl}, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> Optional["LexicalIndex"]:
+        """The index saved in `directory`, or None if there is none."""
+        meta_path = os.path.join(directory, "lexical.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"lexical_{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in ("offsets", "rows", "impacts", "df")
+        }
+        vocab = {term: i for i, term in enumerate(meta["terms"])}
+        return cls(vocab, arrays["offsets"], arrays["rows"], arrays["impacts"], arrays["df"],
+                   meta["n_docs"], meta["avgdl"])
@@ -0,0 +1,160 @@
+"""
+Process-wide registry of sentence-embedding models.
+
+Every consumer in ml_engine (PathwayRecommender, feature enrichment, ...)
+asks the registry for its encoder instead of constructing a
+SentenceTransformer itself, so each (model name, device, backend,
+precision) combination is loaded exactly once per process.
+
+CPU inference options (defaults come from the environment):
+  ENCODER_BACKEND    "torch" (default) or "onnx" (ONNX Runtime through
+                     sentence-transformers' onnx backend; needs onnxruntime)
+  ENCODER_PRECISION  "float32" (default) or "int8":
+                     torch  -> dynamic int8 quantization of the Linear layers
+                     onnx   -> the pre-quantized graph named by ENCODER_ONNX_INT8_FILE
+  ENCODER_ONNX_INT8_FILE  default "onnx/model_quint8_avx2.onnx"
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_sentence_transformer_cls = None
+_sentence_transformers_missing = False
+
+
+def _sentence_transformer():
+    """
+    The SentenceTransformer class, or None if the package is not installed.
+    Imported on first use: it pulls in torch, which costs seconds at startup.
+    """
+    global _sentence_transformer_cls, _sentence_transformers_missing
+    if _sentence_transformer_cls is None and not _sentence_transformers_missing:
+        try:
+            from sentence_transformers import SentenceTransformer
+            _sentence_transformer_cls = SentenceTransformer
+        except ImportError:
+            _sentence_transformers_missing = True
+    return _sentence_transformer_cls
+
+SUPPORTED_PRECISIONS = ("float32", "int8")
+SUPPORTED_BACKENDS = ("torch", "onnx")
+
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+ENCODER_PRECISION = os.environ.get("ENCODER_PRECISION", "float32")
+ENCODER_ONNX_INT8_FILE = os.environ.get("ENCODER_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+_registry_lock = threading.Lock()
+_key_locks: Dict[Tuple[str, str, str, str], threading.Lock] = {}
+_encoders: Dict[Tuple[str, str, str, str], Any] = {}
+_stats: Dict[Tuple[str, str, str, str], Dict] = {}
+
+
+def encoder_id(model_name: str, backend: Optional[str] = None, precision: Optional[str] = None) -> str:
+    """
+    Name identifying the vectors an encoder produces; used to key persisted
+    embeddings so vectors from a quantized model never mix with float ones.
+    """
+    backend = backend or ENCODER_BACKEND
+    precision = precision or ENCODER_PRECISION
+    if backend == "torch" and precision == "float32":
+        return model_name
+    return f"{model_name}@{backend}-{precision}"
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a peak value in KB on Linux; good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+def _param_bytes(model) -> int:
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.parameters()))
+    except Exception:
+        return 0
+
+
+def _load(model_name: str, device: Optional[str], precision: str, backend: str):
+    SentenceTransformer = _sentence_transformer()
+    if backend == "onnx":
+        model_kwargs = {"file_name": ENCODER_ONNX_INT8_FILE} if precision == "int8" else None
+        return SentenceTransformer(model_name, device=device, backend="onnx", model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device=device)
+    if precision == "int8":
+        import torch
+        # Weights of every Linear layer stored as int8, activations quantized on the fly
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_encoder(model_name: str = "all-MiniLM-L6-v2", device: Optional[str] = None,
+                precision: Optional[str] = None, backend: Optional[str] = None):
+    """
+    Return the shared encoder for (model_name, device, backend, precision),
+    loading it on first use. Returns None when sentence-transformers is not
+    installed.
+    """
+    precision = precision or ENCODER_PRECISION
+    backend = backend or ENCODER_BACKEND
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"Unsupported precision {precision!r}; expected one of {SUPPORTED_PRECISIONS}")
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported backend {backend!r}; expected one of {SUPPORTED_BACKENDS}")
+    if precision == "int8" and device not in (None, "cpu"):
+        raise ValueError("int8 inference is CPU-only")
+    if _sentence_transformer() is None:
+        return None
+
+    key = (model_name, device or "auto", precision, backend)
+    encoder = _encoders.get(key)
+    if encoder is not None:
+        return encoder
+
+    # One lock per key: concurrent first callers wait for a single load,
+    # while loads of unrelated models are not serialized behind each other.
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        encoder = _encoders.get(key)
+        if encoder is not None:
+            return encoder
+
+        print(f"Loading SBERT model: {model_name} (device={key[1]}, backend={backend}, precision={precision})...")
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        encoder = _load(model_name, device, precision, backend)
+        load_seconds = time.perf_counter() - start
+        rss_delta = max(0, _rss_bytes() - rss_before)
+
+        _stats[key] = {
+            "model_name": model_name,
+            "device": str(getattr(encoder, "device", key[1])),
+            "precision": precision,
+            "backend": backend,
+            "load_seconds": round(load_seconds, 3),
+            "param_bytes": _param_bytes(encoder),
+            "rss_delta_bytes": rss_delta,
+        }
+        print(
+            f"Loaded {model_name} in {load_seconds:.2f}s "
+            f"(params {_stats[key]['param_bytes'] / 2**20:.1f} MiB, RSS +{rss_delta / 2**20:.1f} MiB)"
+        )
+        _encoders[key] = encoder
+        return encoder
+
+
+def registry_stats() -> List[Dict]:
+    """Load time and memory figures for every encoder loaded so far."""
+    return [dict(s) for s in _stats.values()]
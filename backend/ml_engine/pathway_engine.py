@@ -7,18 +7,32 @@ This file combines:
 3. pathway generation (career roadmap)
 """
 
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, Union
 from .features import build_feature_vector
-from .clustering import predict_cluster
+from .clustering import FEATURE_COLUMNS, is_dataframe, predict_cluster_batch, get_model_holder
 
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+import collections
 import json
 import os
+import threading
+import time
 
 # path relative to ml_engine package location
 CURDIR = os.path.dirname(__file__)
 # courses.json lives in the parent ml_engine folder (one level up from src)
 COURSES_JSON = os.path.abspath(os.path.join(CURDIR, "..", "courses.json"))
 
+# Response cache settings (environment)
+PATHWAY_CACHE_SIZE = int(os.environ.get("PATHWAY_CACHE_SIZE", "50000"))  # 0 disables the cache
+PATHWAY_CACHE_TTL = float(os.environ.get("PATHWAY_CACHE_TTL", "3600"))  # seconds
+PATHWAY_CACHE_QUANTUM = float(os.environ.get("PATHWAY_CACHE_QUANTUM", "0"))  # key rounding step, 0 = exact key
+PATHWAY_CACHE_CHECK_INTERVAL = float(os.environ.get("PATHWAY_CACHE_CHECK_INTERVAL", "5"))  # model / courses.json stat
+
 def load_courses_db():
     try:
         with open(COURSES_JSON, "r", encoding="utf-8") as f:
@@ -26,17 +40,17 @@ def load_courses_db():
     except Exception:
         return {}
 
-# call once at import
-COURSES_DB = load_courses_db()
 
-
-def pick_courses_for_role(role_key: str, cluster_label: str, top_n: int = 3):
+def pick_courses_for_role(role_key: str, cluster_label: str, top_n: int = 3, courses_db: Optional[Dict] = None):
     """
     role_key: e.g., "data_analyst", "machine_learning", "software_developer"
     cluster_label: "Beginner"/"Intermediate"/"Advanced"
+    courses_db: curated DB to pick from (default: the one being served)
     """
+    if courses_db is None:
+        courses_db = current_pathway_models().courses_db
     out = []
-    role_obj = COURSES_DB.get(role_key, {})
+    role_obj = courses_db.get(role_key, {})
     # cluster-specific prioritized list
     cluster_list = role_obj.get("cluster_courses", {}).get(cluster_label, [])
     for c in cluster_list[:top_n]:
@@ -109,6 +123,260 @@ CLUSTER_ROADMAP = {
 }
 
 
+# Map canonical role -> key used in courses.json
+ROLE_KEY_MAP = {
+    "data analyst": "data_analyst",
+    "data scientist": "machine_learning",
+    "machine learning engineer": "machine_learning",
+    "software developer": "software_developer",
+    "web developer": "software_developer"
+}
+DEFAULT_ROLE_KEY = "data_analyst"
+
+
+def _build_pathway(cluster_id: int, career_aspiration: str, recommended_courses: List[Dict]) -> Dict:
+    roadmap = CLUSTER_ROADMAP.get(cluster_id, CLUSTER_ROADMAP[0])
+    return {
+        "cluster_id": int(cluster_id),
+        "cluster_label": roadmap["label"],
+        "career_aspiration": career_aspiration,
+        "recommended_skills": roadmap["skills"],
+        "recommended_courses": recommended_courses,
+        "recommended_certifications": roadmap["certifications"],
+    }
+
+
+def _copy_picks(picks: List[Dict]) -> List[Dict]:
+    # Each result gets its own list and dicts so callers can mutate results safely
+    return [dict(course) for course in picks]
+
+
+def _role_key(features: Dict) -> str:
+    return ROLE_KEY_MAP.get(features.get("role", "").strip().lower(), DEFAULT_ROLE_KEY)
+
+
+# --------------------------------------------
+# Response cache
+# --------------------------------------------
+class PathwayCache:
+    """
+    Caches the two expensive steps of the rule-based path:
+
+    - (role, 6-feature vector) -> cluster id, in an LRU with TTL. The
+      cluster is always predicted from the learner's real features. With the
+      default quantum=0 the key is the exact vector, so responses are the
+      same with the cache on or off; quantum > 0 rounds the key to that step
+      for more hits, at the price of learners within one step of a cluster
+      boundary sharing the first one's cluster.
+    - (role_key, cluster id) -> curated course picks (copied for every
+      response, so a caller mutating its result never changes another's).
+
+    A cache belongs to one PathwayModels (one KMeans model + scaler and one
+    curated DB), so it never needs invalidating: a reload brings a new cache.
+    """
+
+    def __init__(self, kmeans, scaler, courses_db: Dict, max_entries: int = PATHWAY_CACHE_SIZE,
+                 ttl: float = PATHWAY_CACHE_TTL, quantum: float = PATHWAY_CACHE_QUANTUM):
+        self.kmeans = kmeans
+        self.scaler = scaler
+        self.courses_db = courses_db
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.quantum = quantum
+        self._clusters = collections.OrderedDict()  # key -> (cluster_id, expires_at)
+        self._picks: Dict[Tuple[str, int], List[Dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def quantize(self, features: Dict) -> Tuple[float, ...]:
+        """Cache key of a feature vector (only a key: clusters come from the real features)."""
+        q = self.quantum
+        if q <= 0:
+            return tuple(float(features.get(col, 0.0)) for col in FEATURE_COLUMNS)
+        return tuple(round(float(features.get(col, 0.0)) / q) * q for col in FEATURE_COLUMNS)
+
+    def clusters_for(self, roles: List[str], features: List[Dict]) -> List[int]:
+        """Cluster ids for many learners; only uncached keys go to KMeans (in one batch)."""
+        keys = [(role, self.quantize(f)) for role, f in zip(roles, features)]
+        out: List[Optional[int]] = [None] * len(keys)
+        now = time.monotonic()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._clusters.get(key)
+                if entry is not None and entry[1] > now:
+                    self._clusters.move_to_end(key)
+                    out[i] = entry[0]
+            n_missing = sum(c is None for c in out)
+            self.hits += len(keys) - n_missing
+            self.misses += n_missing
+        # First learner of each uncached key
+        missing = {}
+        for i, c in enumerate(out):
+            if c is None:
+                missing.setdefault(keys[i], features[i])
+        if missing:
+            predicted = predict_cluster_batch(list(missing.values()), models=(self.kmeans, self.scaler))
+            fresh = dict(zip(missing, (int(c) for c in predicted)))
+            expires = now + self.ttl
+            with self._lock:
+                for key, cluster_id in fresh.items():
+                    self._clusters[key] = (cluster_id, expires)
+                while len(self._clusters) > self.max_entries:
+                    self._clusters.popitem(last=False)
+            out = [fresh[keys[i]] if c is None else c for i, c in enumerate(out)]
+        return out
+
+    def picks(self, role_key: str, cluster_id: int) -> List[Dict]:
+        key = (role_key, cluster_id)
+        picks = self._picks.get(key)
+        if picks is None:
+            label = CLUSTER_ROADMAP.get(cluster_id, CLUSTER_ROADMAP[0])["label"]
+            picks = self._picks[key] = pick_courses_for_role(role_key, label, top_n=3, courses_db=self.courses_db)
+        return _copy_picks(picks)
+
+    def warm_up(self) -> int:
+        """Precompute course picks for every known role x cluster; returns how many."""
+        role_keys = sorted(set(ROLE_KEY_MAP.values()) | {DEFAULT_ROLE_KEY})
+        for role_key in role_keys:
+            for cluster_id in range(int(self.kmeans.n_clusters)):
+                self.picks(role_key, cluster_id)
+        return len(self._picks)
+
+    def clear(self):
+        with self._lock:
+            self._clusters.clear()
+            self._picks.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._clusters),
+            "pick_sets": len(self._picks),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _courses_signature():
+    try:
+        st = os.stat(COURSES_JSON)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+# --------------------------------------------
+# Served state
+# --------------------------------------------
+class PathwayModels:
+    """
+    Everything the rule-based path serves from, loaded together and never
+    changed afterwards: the KMeans model + scaler, the curated course DB and
+    the PathwayCache over exactly those two.
+
+    A request reads the active one once (current_pathway_models()). A reload
+    builds a new one and swaps the reference; a snapshot rollback
+    (snapshot.py) swaps an older one back in, model, DB and cache together.
+    """
+
+    __slots__ = ("kmeans", "scaler", "courses_db", "cache", "model_version", "courses_signature", "loaded")
+
+    def __init__(self, kmeans, scaler, courses_db: Dict, model_version: int, courses_signature):
+        self.kmeans = kmeans
+        self.scaler = scaler
+        self.courses_db = courses_db
+        self.cache = PathwayCache(kmeans, scaler, courses_db)
+        self.model_version = model_version  # ClusterModelHolder.version it was loaded at
+        self.courses_signature = courses_signature
+        self.loaded = time.time()
+
+    def describe(self) -> Dict:
+        return {
+            "model_version": self.model_version,
+            "curated_roles": len(self.courses_db),
+            "pick_sets": len(self.cache._picks),
+            "loaded": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded)),
+        }
+
+
+_active_models: Optional[PathwayModels] = None
+# (model version, courses.json signature) of the newest state read from disk;
+# a rolled-back state is kept until the files change again
+_loaded_from = None
+_next_check = 0.0
+_models_lock = threading.Lock()
+
+
+def load_pathway_models(force: bool = False, warm_up: bool = True) -> PathwayModels:
+    """
+    Read the clustering model and curated DB from disk into a new
+    PathwayModels (not installed). force: re-stat the model files now
+    instead of on the holder's throttled check.
+    """
+    global _loaded_from
+    holder = get_model_holder()
+    if force:
+        holder.invalidate()
+    kmeans, scaler = holder.get()
+    signature = _courses_signature()
+    models = PathwayModels(kmeans, scaler, load_courses_db(), holder.version, signature)
+    if warm_up:
+        models.cache.warm_up()
+    _loaded_from = (models.model_version, signature)
+    return models
+
+
+def install_pathway_models(models: PathwayModels):
+    # One reference assignment: in-flight requests finish on the old state
+    global _active_models
+    _active_models = models
+
+
+def loaded_pathway_models() -> Optional[PathwayModels]:
+    """The active state, or None if nothing has been loaded in this process yet."""
+    return _active_models
+
+
+def current_pathway_models() -> PathwayModels:
+    """
+    The state to serve a request from; hold on to it for the whole request.
+    Loads it on first use, and (at most every PATHWAY_CACHE_CHECK_INTERVAL
+    seconds) follows the model files / courses.json when they change on disk.
+    Raises ModelNotTrainedError if the clustering model was never trained.
+    """
+    global _next_check
+    models = _active_models
+    if models is not None and time.monotonic() < _next_check:
+        return models
+    with _models_lock:
+        holder = get_model_holder()
+        if _active_models is not None:
+            holder.get()  # throttled stat check; a changed model bumps holder.version
+        if _active_models is None or (holder.version, _courses_signature()) != _loaded_from:
+            install_pathway_models(load_pathway_models())
+        _next_check = time.monotonic() + PATHWAY_CACHE_CHECK_INTERVAL
+        return _active_models
+
+
+def refresh_pathway_models() -> PathwayModels:
+    """Build (but do not install) a new state from what is on disk now."""
+    return load_pathway_models(force=True)
+
+
+def get_pathway_cache() -> PathwayCache:
+    return current_pathway_models().cache
+
+
+def warm_up_pathway_cache() -> int:
+    return current_pathway_models().cache.warm_up()
+
+
 def generate_learning_pathway(
     user_profile: Dict,
     current_skills: List[str],
@@ -125,37 +393,80 @@ def generate_learning_pathway(
         career_aspiration
     )
 
-    # 2) Assign cluster using KMeans
-    cluster_id = predict_cluster(features)
+    # 2) Determine canonical role from the features and map it to the courses.json key
+    role_key = _role_key(features)
 
-    # 3) Retrieve the roadmap for this cluster (fallback to 0)
-    roadmap = CLUSTER_ROADMAP.get(cluster_id, CLUSTER_ROADMAP[0])
+    # Model, curated DB and cache all come from the same state
+    models = current_pathway_models()
+    cache = models.cache
+    if cache.enabled:
+        # 3+4) Cached cluster assignment and course picks
+        cluster_id = cache.clusters_for([features.get("role", "")], [features])[0]
+        recommended_courses = cache.picks(role_key, cluster_id)
+    else:
+        # 3) Assign cluster using KMeans
+        cluster_id = int(predict_cluster_batch([features], models=(models.kmeans, models.scaler))[0])
+        # 4) Pick curated courses from courses.json (top 3) for this cluster's roadmap
+        roadmap = CLUSTER_ROADMAP.get(cluster_id, CLUSTER_ROADMAP[0])
+        recommended_courses = pick_courses_for_role(role_key, roadmap["label"], top_n=3,
+                                                    courses_db=models.courses_db)
 
-    # 4) Determine canonical role from the features (features includes 'role')
-    role = features.get("role", "").strip().lower()
+    # 5) Final response object
+    return _build_pathway(cluster_id, career_aspiration, recommended_courses)
 
-    # 5) Map role -> key used in courses.json
-    role_key_map = {
-        "data analyst": "data_analyst",
-        "data scientist": "machine_learning",
-        "machine learning engineer": "machine_learning",
-        "software developer": "software_developer",
-        "web developer": "software_developer"
-    }
-    role_key = role_key_map.get(role, "data_analyst")
 
-    # 6) Pick curated courses from courses.json (top 3)
-    recommended_courses = pick_courses_for_role(role_key, roadmap["label"], top_n=3)
+def _iter_profiles(profiles: Union[Iterable[Dict], "pd.DataFrame"]):
+    """Yield (user_profile, current_skills, career_aspiration) from dicts or DataFrame rows."""
+    if is_dataframe(profiles):
+        profiles = profiles.to_dict(orient="records")
+    for p in profiles:
+        yield (
+            p.get("user_profile") or {},
+            p.get("current_skills") or [],
+            p.get("career_aspiration") or "",
+        )
 
-    # 7) Final response object
-    return {
-        "cluster_id": int(cluster_id),
-        "cluster_label": roadmap["label"],
-        "career_aspiration": career_aspiration,
-        "recommended_skills": roadmap["skills"],
-        "recommended_courses": recommended_courses,
-        "recommended_certifications": roadmap["certifications"],
-    }
+
+def generate_learning_pathway_batch(profiles: Union[Iterable[Dict], "pd.DataFrame"]) -> List[Dict]:
+    """
+    Batch version of generate_learning_pathway for re-profiling / cohort imports.
+
+    profiles: list of dicts (or a DataFrame) with keys
+        user_profile, current_skills, career_aspiration
+
+    Feature extraction is per learner, but scaling and KMeans assignment run
+    once over the whole (n, 6) matrix (only for keys not already in the
+    response cache), and course picks are computed once per distinct
+    (role, cluster) pair instead of once per learner.
+    Results are returned in input order.
+    """
+    rows = list(_iter_profiles(profiles))
+    if not rows:
+        return []
+
+    features = [build_feature_vector(up, skills, asp) for up, skills, asp in rows]
+    models = current_pathway_models()
+    cache = models.cache
+    if cache.enabled:
+        cluster_ids = cache.clusters_for([f.get("role", "") for f in features], features)
+        return [
+            _build_pathway(cluster_id, aspiration, cache.picks(_role_key(feats), cluster_id))
+            for (_, _, aspiration), feats, cluster_id in zip(rows, features, cluster_ids)
+        ]
+
+    cluster_ids = predict_cluster_batch(features, models=(models.kmeans, models.scaler))
+
+    picks: Dict[tuple, List[Dict]] = {}
+    results = []
+    for (_, _, aspiration), feats, cluster_id in zip(rows, features, cluster_ids):
+        cluster_id = int(cluster_id)
+        role_key = _role_key(feats)
+        key = (role_key, cluster_id)
+        if key not in picks:
+            label = CLUSTER_ROADMAP.get(cluster_id, CLUSTER_ROADMAP[0])["label"]
+            picks[key] = pick_courses_for_role(role_key, label, top_n=3, courses_db=models.courses_db)
+        results.append(_build_pathway(cluster_id, aspiration, _copy_picks(picks[key])))
+    return results
 
 
 # Manual test
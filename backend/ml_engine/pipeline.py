@@ -0,0 +1,110 @@
+"""
+Request pipeline for the semantic recommendation path.
+
+Runs feature engineering, persona prediction and course retrieval for one
+learner with a single transformer call:
+
+- shared_embedding=False (default): the profile text (persona prediction)
+  and the retrieval query (aspiration + raw skills, course search) are kept
+  separate, as inference.py always did, but encoded in one batched call.
+  Rankings are the same as encoding them one by one.
+- shared_embedding=True (opt-in): the profile text is encoded once and the
+  same vector is used for LearnerProfiler.predict_persona and the course
+  similarity search. Halves the encoder work but searches with a different
+  text (normalized skills, "Aspiration: ...; Skills: ..."), so the top-k
+  courses can change; enable it only after checking the rankings.
+
+Retrieval follows the recommender's mode (dense / hybrid / lexical, see
+lexical_index.py). Without an encoder, or when the batching queue rejects the
+request, no embedding is computed: courses come from the BM25 index alone
+and no persona is predicted, instead of both being derived from random
+vectors.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .batching import EncoderOverloaded
+from .features import build_feature_vector, build_profile_text
+from .profiler import LearnerProfiler
+from .recommender import PathwayRecommender
+from .snapshot import CatalogSnapshot
+
+
+def build_query_text(career_aspiration: str, current_skills: List[str]) -> str:
+    """Retrieval query: aspiration + raw skills."""
+    return f"{career_aspiration} {', '.join(current_skills)}"
+
+
+class RecommendationPipeline:
+    def __init__(self, recommender: PathwayRecommender, profiler: LearnerProfiler, shared_embedding: bool = False):
+        self.recommender = recommender
+        self.profiler = profiler
+        self.shared_embedding = shared_embedding
+
+    def embed(self, features: Dict, career_aspiration: str, current_skills: List[str]):
+        """
+        Return (profile_vector, query_vector) with one encode call.
+        """
+        profile_text = build_profile_text(career_aspiration, features.get("extracted_skills", []))
+        if self.shared_embedding:
+            vectors = self.recommender.encode([profile_text])
+            return vectors[0], vectors[0]
+        query_text = build_query_text(career_aspiration, current_skills)
+        vectors = self.recommender.encode([profile_text, query_text])
+        return vectors[0], vectors[1]
+
+    def run(
+        self,
+        career_aspiration: str,
+        current_skills: List[str],
+        user_profile: Optional[Dict] = None,
+        top_k: int = 5,
+        filters: Optional[Dict] = None,
+        catalog: Optional[CatalogSnapshot] = None,
+        retrieval: Optional[str] = None,
+    ) -> Dict:
+        """
+        filters: optional course pre-filters (sector / nsqf_level / ...),
+            see course_filters.py
+        catalog: catalog snapshot to search (default: the recommender's
+            active one), see snapshot.py
+        retrieval: 'dense' / 'hybrid' / 'lexical' override
+
+        Returns:
+          - features: feature dict (including 'semantic_embedding')
+          - persona_id / persona_label
+          - recommendations: top_k course dicts with 'match_score'
+          - retrieval: the mode actually used ('lexical' when degraded)
+        """
+        current_skills = current_skills or []
+        features = build_feature_vector(user_profile or {}, current_skills, career_aspiration)
+
+        query_text = build_query_text(career_aspiration, current_skills)
+
+        mode = self.recommender.retrieval_mode(retrieval)
+        profile_vec = query_vec = None
+        if mode != "lexical":
+            try:
+                profile_vec, query_vec = self.embed(features, career_aspiration, current_skills)
+            except EncoderOverloaded:
+                # Answer from the keyword index instead of failing the request
+                mode = "lexical"
+
+        persona_id = None
+        features["semantic_embedding"] = None
+        if profile_vec is not None:
+            features["semantic_embedding"] = profile_vec.tolist()
+            persona_id = self.profiler.predict_persona(np.asarray(profile_vec, dtype=np.float64))
+        recommendations = self.recommender.recommend_by_vector(
+            query_vec, top_k=top_k, filters=filters, snapshot=catalog, query_text=query_text, mode=mode
+        )
+
+        return {
+            "features": features,
+            "persona_id": persona_id,
+            "persona_label": self.profiler.get_cluster_insights(persona_id),
+            "recommendations": recommendations,
+            "retrieval": mode,
+        }
@@ -0,0 +1,99 @@
+"""
+Preload-then-fork support for multi-worker serving.
+
+With gunicorn's preload_app (see backend/gunicorn.conf.py) the master
+process calls preload() once, then forks the workers, which inherit the
+loaded state copy-on-write instead of each loading it again:
+
+- the clustering model + scaler and the warmed pathway cache (rule-based path)
+- optionally (semantic=True) the shared PathwayRecommender with the SBERT
+  model, its catalog and course vectors taken from the memory-mapped catalog
+  bundle, so the large arrays are file-backed, read-only pages shared by
+  every worker
+
+preload() finishes with gc.freeze(): objects created so far are moved out of
+the collector's reach, so garbage collection in a worker does not write to
+(and thereby un-share) the pages that hold them.
+
+partition_threads() runs in each worker after the fork and gives every
+worker its own slice of the CPU for torch / BLAS intra-op threads, so N
+workers do not each start one thread per core.
+
+Settings (environment):
+  ML_PRELOAD_SEMANTIC  "1" also preloads the SBERT recommender (default "0")
+  ML_PIN_WORKERS       "1" pins each worker to its slice of CPUs (default "0")
+"""
+
+import gc
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+ML_PRELOAD_SEMANTIC = os.environ.get("ML_PRELOAD_SEMANTIC", "0") == "1"
+ML_PIN_WORKERS = os.environ.get("ML_PIN_WORKERS", "0") == "1"
+
+
+def preload(semantic: bool = ML_PRELOAD_SEMANTIC, freeze: bool = True) -> Dict:
+    """Load shared ml_engine state in the parent process. Returns what was loaded."""
+    start = time.perf_counter()
+    summary = {}
+
+    from .pathway_engine import warm_up_pathway_cache
+    try:
+        summary["pathway_pick_sets"] = warm_up_pathway_cache()
+    except FileNotFoundError as e:
+        # Not trained yet: workers will report it per request, as before
+        print("Warning: clustering model not preloaded:", e)
+
+    if semantic:
+        from .catalog_bundle import open_bundle
+        from .features import get_recommender
+        rec = get_recommender()
+        bundle = open_bundle(model_name=rec.encoder_id)
+        if bundle is not None and bundle.vectors is not None:
+            rec.set_catalog(bundle.courses, bundle.vectors, lexical=bundle.lexical)
+            summary["courses"] = len(bundle.courses)
+        summary["encoder"] = rec.encoder_id if rec.vectorizer else None
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def partition_threads(n_workers: int, worker_index: Optional[int] = None, pin: bool = ML_PIN_WORKERS) -> int:
+    """
+    Limit this worker's intra-op threads to its share of the CPUs; with pin
+    (and a worker_index) also restrict it to those CPUs. Returns the thread count.
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    threads = max(1, len(cpus) // max(1, n_workers))
+
+    # Read by OpenMP / MKL / OpenBLAS when they initialize in this process
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+    if pin and worker_index is not None and hasattr(os, "sched_setaffinity"):
+        first = (worker_index * threads) % len(cpus)
+        os.sched_setaffinity(0, cpus[first:first + threads] or cpus[:threads])
+    return threads
+
+
+def memory_usage(pid: int = None) -> Dict[str, int]:
+    """RSS / PSS / private bytes of a process from /proc (Linux); empty dict elsewhere."""
+    path = f"/proc/{pid or os.getpid()}/smaps_rollup"
+    out = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    out[key.lower()] = int(rest.split()[0]) * 1024
+    except OSError:
+        return {}
+    out["private"] = out.pop("private_clean", 0) + out.pop("private_dirty", 0)
+    return out
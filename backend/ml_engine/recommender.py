@@ -1,87 +1,322 @@
+import asyncio
+import threading
 
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Union
-try:
-    from sentence_transformers import SentenceTransformer
-    from sklearn.neighbors import NearestNeighbors
-except ImportError:
-    SentenceTransformer = None
-    NearestNeighbors = None
+from typing import List, Dict, Optional, Union
+
+from .embedding_store import CourseEmbeddingStore, course_text
+from .model_registry import encoder_id, get_encoder
+from .course_index import CourseIndex
+from .course_filters import CourseFilterIndex
+from .course_store import CourseStore
+from .batching import ENCODER_BATCHING, BatchingEncoder, EncoderOverloaded
+from .embedding_cache import EMBEDDING_CACHE_SIZE, EmbeddingCache
+from .snapshot import CatalogSnapshot, next_version
+from .catalog_delta import id_key
+from .lexical_index import RETRIEVAL_MODE, RETRIEVAL_MODES, LexicalIndex
 
 class PathwayRecommender:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', device: Optional[str] = None,
+                 precision: Optional[str] = None, backend: Optional[str] = None,
+                 index_backend: str = 'exact', index_params: Optional[Dict] = None,
+                 batching: Optional[bool] = None, batching_params: Optional[Dict] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None, retrieval: Optional[str] = None):
         """
         Initialize the recommender system with a pre-trained Sentence Transformer model.
+        The model comes from the process-wide registry, so every recommender (and
+        feature enrichment) asking for the same model shares one instance.
         Falls back to a mock mode if libraries are missing.
+
+        precision / backend: CPU inference options ('int8' quantization, 'onnx'
+            runtime; defaults from ENCODER_PRECISION / ENCODER_BACKEND), see
+            model_registry.py
+        index_backend: 'exact' (brute force), 'ivf' (approximate) or 'compressed'
+            (int8 / PCA first stage, full-precision rescoring), see course_index.py
+        index_params: extra keyword arguments for the index backend (e.g. nprobe)
+        batching: route encode() through a micro-batching queue so concurrent
+            callers share one transformer call (default: ENCODER_BATCHING env),
+            see batching.py
+        batching_params: max_batch_size / max_wait_ms / max_pending overrides
+        embedding_cache: cache for user-text embeddings (default: an in-memory
+            EmbeddingCache sized from the environment), see embedding_cache.py
+        retrieval: 'dense', 'hybrid' (dense + BM25) or 'lexical' (BM25 only)
+            (default: RETRIEVAL_MODE env), see lexical_index.py. Without an
+            encoder, or while the batching queue is overloaded, searches fall
+            back to 'lexical'.
         """
         self.model_name = model_name
+        # Identifies the vectors this encoder produces (differs for quantized backends)
+        self.encoder_id = encoder_id(model_name, backend, precision)
         self.vectorizer = None
-        self.course_vectors = None
-        self.course_data = [] # List of dicts
+        self.index_backend = index_backend
+        self.index_params = index_params or {}
+        self.retrieval = retrieval or RETRIEVAL_MODE
+        if self.retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {self.retrieval!r}; expected one of {RETRIEVAL_MODES}")
+        # Courses, vectors and indexes are swapped together as one immutable
+        # snapshot, so a request never sees a half-replaced catalog
+        self.snapshot: CatalogSnapshot = self.build_snapshot(
+            CourseStore.from_records([]), np.empty((0, 0), dtype=np.float32), version=0)
+        # Serializes upserts / deletes / compaction; readers never take it
+        self._write_lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
         
-        if SentenceTransformer:
-            print(f"Loading SBERT model: {model_name}...")
-            # This might take a moment on first run
-            self.vectorizer = SentenceTransformer(model_name)
-        else:
+        # This might take a moment on first run
+        self.vectorizer = get_encoder(model_name, device=device, precision=precision, backend=backend)
+        if self.vectorizer is None:
             print("Warning: sentence-transformers not found. Operating in mock mode.")
 
+        if batching is None:
+            batching = ENCODER_BATCHING
+        self.batcher: Optional[BatchingEncoder] = \
+            BatchingEncoder(self._encode_direct, **(batching_params or {})) if batching else None
+
+        # Mock vectors are random, so there is nothing worth caching
+        if embedding_cache is None and self.vectorizer and EMBEDDING_CACHE_SIZE > 0:
+            embedding_cache = EmbeddingCache(self.encoder_id)
+        self.embedding_cache: Optional[EmbeddingCache] = embedding_cache if self.vectorizer else None
+
+    @property
+    def course_data(self) -> CourseStore:
+        return self.snapshot.courses # Columnar; store[i] -> course dict
+
+    @property
+    def course_vectors(self) -> np.ndarray:
+        return self.snapshot.vectors
+
+    @property
+    def index(self) -> Optional[CourseIndex]:
+        return self.snapshot.index
+
+    @property
+    def filter_index(self) -> Optional[CourseFilterIndex]:
+        return self.snapshot.filter_index
+
     def encode(self, texts: List[str]) -> np.ndarray:
         """
         Convert a list of text strings into embeddings.
+        Repeated texts are served from the embedding cache; with batching
+        enabled, concurrent cache misses are coalesced into one model call.
         """
+        if self.embedding_cache is not None:
+            return self.embedding_cache.encode(texts, self._encode_uncached)
+        return self._encode_uncached(texts)
+
+    async def encode_async(self, texts: List[str]) -> np.ndarray:
+        """encode() without blocking the event loop: cache hits return inline, misses are awaited."""
+        if self.embedding_cache is not None:
+            return await self.embedding_cache.encode_async(texts, self._encode_uncached_async)
+        return await self._encode_uncached_async(texts)
+
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
+        if self.batcher is not None:
+            return self.batcher.encode(texts)
+        return self._encode_direct(texts)
+
+    async def _encode_uncached_async(self, texts: List[str]) -> np.ndarray:
+        if self.batcher is not None:
+            return await self.batcher.encode_async(texts)
+        return await asyncio.get_running_loop().run_in_executor(None, self._encode_direct, texts)
+
+    def _encode_direct(self, texts: List[str]) -> np.ndarray:
         if self.vectorizer:
             embeddings = self.vectorizer.encode(texts, convert_to_numpy=True)
-            # Ensure contiguous float64 for sklearn compatibility
-            return np.ascontiguousarray(embeddings, dtype=np.float64)
+            # float32 is what the model produces and what the course index stores;
+            # consumers that need float64 (sklearn profiler) convert themselves
+            return np.ascontiguousarray(embeddings, dtype=np.float32)
         # Mock embeddings for testing without dependencies
-        return np.ascontiguousarray(np.random.rand(len(texts), 384), dtype=np.float64)
+        return np.ascontiguousarray(np.random.rand(len(texts), 384), dtype=np.float32)
 
-    def fit_courses(self, courses: List[Dict[str, str]]):
+    def fit_courses(self, courses: Union[CourseStore, List[Dict[str, str]]], embedding_store: Optional[CourseEmbeddingStore] = None):
         """
         Ingest course data and build the search index.
-        courses: List of dicts, must have 'description' and 'title' keys.
+        courses: CourseStore, or a list of dicts (converted to a CourseStore);
+            courses must have 'description' and 'title' keys.
+        embedding_store: optional persisted index; only courses that are new or
+            changed since it was written get encoded, and an unchanged catalog is
+            memory-mapped straight from disk.
         """
-        self.course_data = courses
-        
+        if not isinstance(courses, CourseStore):
+            courses = CourseStore.from_records(courses)
+        self.set_catalog(courses, self.embed_catalog(courses, embedding_store))
+
+    def embed_catalog(self, courses: CourseStore, embedding_store: Optional[CourseEmbeddingStore] = None) -> np.ndarray:
+        """Course vectors for `courses` (row i -> courses[i]), reusing embedding_store rows."""
         # Create a rich text representation for embedding
         # e.g. "Title: Python 101. Description: Learn basic coding."
-        course_texts = [
-            f"Title: {c.get('title', '')}. Description: {c.get('description', '')}. Skills: {c.get('skills', '')}" 
-            for c in courses
-        ]
-        
-        self.course_vectors = self.encode(course_texts)
-        # Ensure contiguous float64 dtype for sklearn compatibility
-        self.course_vectors = np.ascontiguousarray(self.course_vectors, dtype=np.float64)
-        
-        # Initialize NearestNeighbors for fast retrieval
-        if NearestNeighbors:
-            self.nn_model = NearestNeighbors(n_neighbors=5, metric='cosine')
-            self.nn_model.fit(self.course_vectors)
+        course_texts = [course_text(c) for c in courses]
+
+        if embedding_store is not None and self.vectorizer:
+            # float32, possibly a read-only memmap shared with other processes
+            return embedding_store.get_vectors(course_texts, self._encode_direct)
+        # Bulk catalog encoding bypasses the request batcher and the cache
+        return self._encode_direct(course_texts)
+
+    def build_snapshot(self, courses: CourseStore, course_vectors: np.ndarray, version: Optional[int] = None,
+                       info: Optional[Dict] = None, lexical: Optional[LexicalIndex] = None) -> CatalogSnapshot:
+        """
+        Build the search, filter and BM25 indexes over an already-embedded
+        catalog (row i of course_vectors belongs to courses[i]) without
+        installing it. lexical: prebuilt BM25 index, e.g. from the catalog bundle.
+        """
+        if version is None:
+            version = next_version()
+        return CatalogSnapshot.build(courses, course_vectors, self.index_backend, self.index_params,
+                                     version=version, info=info, lexical=lexical)
+
+    def install_snapshot(self, snapshot: CatalogSnapshot):
+        # A single reference assignment: requests that already hold the old
+        # snapshot finish on it, new ones see the new one. The lock only orders
+        # it against incremental updates / compaction
+        with self._write_lock:
+            self.snapshot = snapshot
+
+    def set_catalog(self, courses: CourseStore, course_vectors: np.ndarray, lexical: Optional[LexicalIndex] = None):
+        """
+        Install an already-embedded catalog and build the search, filter and
+        BM25 indexes over it. Used by fit_courses and by the streaming ingestion
+        pipeline (ingest.py); background reloads go through snapshot.py.
+        """
+        self.install_snapshot(self.build_snapshot(courses, course_vectors, lexical=lexical))
+
+    @property
+    def encoder_available(self) -> bool:
+        """False in mock mode, where encode() returns random vectors."""
+        return self.vectorizer is not None
 
-    def recommend(self, user_profile_text: str, top_k: int = 5) -> List[Dict]:
+    def retrieval_mode(self, mode: Optional[str] = None) -> str:
+        """The mode a search will actually use: 'lexical' when there is no encoder."""
+        mode = mode or self.retrieval
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+        return mode if self.encoder_available else "lexical"
+
+    def recommend(self, user_profile_text: str, top_k: int = 5, filters: Optional[Dict] = None,
+                  snapshot: Optional[CatalogSnapshot] = None, mode: Optional[str] = None) -> List[Dict]:
         """
         Recommend courses based on user profile text (semantic search).
+        filters: optional structured pre-filters on sector / provider /
+            nsqf_level / duration_hours, see course_filters.py
+        snapshot: catalog to search (default: the active one)
+        mode: 'dense' / 'hybrid' / 'lexical' override (default: self.retrieval)
         """
-        if not self.course_data:
+        snap = self.snapshot if snapshot is None else snapshot
+        if not len(snap):
             return []
-            
-        user_vector = self.encode([user_profile_text])
-        # Ensure contiguous float64 array
-        user_vector = np.ascontiguousarray(user_vector, dtype=np.float64)
-        
-        # Use manual cosine similarity instead of NearestNeighbors to avoid dtype issues
-        from sklearn.metrics.pairwise import cosine_similarity
-        sims = cosine_similarity(user_vector, self.course_vectors)[0]
-        top_indices = sims.argsort()[::-1][:top_k]
-        scores = sims[top_indices]
-
-        results = []
-        for idx, score in zip(top_indices, scores):
-            item = self.course_data[idx].copy()
-            item['match_score'] = float(score)
-            results.append(item)
-            
-        return results
+
+        mode = self.retrieval_mode(mode)
+        user_vector = None
+        if mode != "lexical":
+            try:
+                user_vector = self.encode([user_profile_text])[0]
+            except EncoderOverloaded:
+                # Degrade to keyword search rather than failing the request
+                mode = "lexical"
+        return self.recommend_by_vector(user_vector, top_k=top_k, filters=filters, snapshot=snap,
+                                        query_text=user_profile_text, mode=mode)
+
+    def recommend_by_vector(self, user_vector: Optional[np.ndarray], top_k: int = 5, filters: Optional[Dict] = None,
+                            snapshot: Optional[CatalogSnapshot] = None, query_text: Optional[str] = None,
+                            mode: Optional[str] = None) -> List[Dict]:
+        """
+        Recommend courses for an already-computed user embedding, so callers that
+        need the vector for other things (e.g. persona prediction) encode only once.
+        query_text: the text for BM25 in 'hybrid' / 'lexical' mode; without it
+            the given vector is searched densely. user_vector=None searches lexically.
+        """
+        # Read the snapshot reference once: a concurrent swap or update cannot mix catalogs
+        snap = self.snapshot if snapshot is None else snapshot
+        if not len(snap):
+            return []
+        mode = self.retrieval_mode(mode)
+        if user_vector is None or (mode == "lexical" and query_text):
+            return snap.search_lexical(query_text or "", top_k=top_k, filters=filters)
+        if mode == "hybrid" and query_text:
+            return snap.search_hybrid(user_vector, query_text, top_k=top_k, filters=filters)
+        return snap.search(user_vector, top_k=top_k, filters=filters)
+
+    # -------------------------
+    # Incremental updates (see catalog_delta.py)
+    # -------------------------
+    def upsert_courses(self, courses: List[Dict]) -> Dict:
+        """
+        Add courses, or replace the ones with the same 'id'. Only courses whose
+        embedding text changed are encoded. Raises ValueError (nothing applied)
+        if any record is invalid.
+        """
+        out = self.change_courses(upserts=courses)
+        return {k: out[k] for k in ("upserted", "encoded", "reused", "version")}
+
+    def delete_courses(self, course_ids: List) -> Dict:
+        """Remove courses by id. Unknown ids are reported, not an error."""
+        out = self.change_courses(deletes=course_ids)
+        return {k: out[k] for k in ("deleted", "missing", "version")}
+
+    def change_courses(self, upserts: Optional[List[Dict]] = None, deletes: Optional[List] = None) -> Dict:
+        """
+        Upsert and delete courses as one new snapshot: searches see either none
+        or all of the changes, and a ValueError (invalid record, or an id both
+        upserted and deleted) applies nothing. No changes, no new version.
+        """
+        from .ingest import validate_course
+
+        upserts, deletes = list(upserts or []), list(deletes or [])
+        seen_ids = set()
+        errors = []
+        for i, course in enumerate(upserts):
+            error = validate_course(course, seen_ids)
+            if error is None and (course.get("id") is None or not id_key(course["id"]).strip()):
+                # Courses are addressed by id: an empty one could never be updated or deleted
+                error = "missing or empty 'id'"
+            if error is not None:
+                errors.append(f"course {i}: {error}")
+        both = sorted({id_key(course_id) for course_id in deletes} & seen_ids)
+        if both:
+            errors.append(f"ids both upserted and deleted: {', '.join(both)}")
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        with self._write_lock:
+            snap = self.snapshot
+            if not upserts and not deletes:
+                return {"upserted": 0, "encoded": 0, "reused": 0, "deleted": 0, "missing": [],
+                        "version": snap.version}
+            texts = [course_text(c) for c in upserts]
+            reused = {}
+            for i, course in enumerate(upserts):
+                old = snap.course(course["id"])
+                if old is not None and course_text(old) == texts[i]:
+                    reused[i] = snap.vector(course["id"])
+            missing = [i for i in range(len(upserts)) if i not in reused]
+            fresh = self._encode_direct([texts[i] for i in missing]) if missing else None
+            dim = fresh.shape[1] if fresh is not None else len(next(iter(reused.values()), ()))
+            vectors = np.empty((len(upserts), dim), dtype=np.float32)
+            for i, vector in reused.items():
+                vectors[i] = vector
+            if fresh is not None:
+                vectors[missing] = fresh
+
+            new, not_found = snap.with_changes(upserts, vectors, deletes, version=next_version())
+            self.install_snapshot(new)
+        self._maybe_compact(new)
+        return {"upserted": len(upserts), "encoded": len(missing), "reused": len(reused),
+                "deleted": len(deletes) - len(not_found), "missing": not_found, "version": new.version}
+
+    def compact(self) -> CatalogSnapshot:
+        """Fold pending changes into the base catalog and rebuild the search index."""
+        with self._write_lock:
+            snap = self.snapshot
+            if snap.delta.changes:
+                # Writers wait for the rebuild; searches keep using the current snapshot
+                self.install_snapshot(snap.compacted(self.index_backend, self.index_params,
+                                                     version=next_version()))
+            return self.snapshot
+
+    def _maybe_compact(self, snap: CatalogSnapshot):
+        if not snap.needs_compaction:
+            return
+        with self._write_lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name="catalog-compaction", daemon=True)
+            self._compactor.start()
@@ -0,0 +1,553 @@
+"""
+Versioned, hot-swappable serving snapshots.
+
+Everything a semantic recommendation reads is grouped into immutable
+snapshots:
+
+- CatalogSnapshot: the CourseStore, its course vectors and the search /
+  filter / BM25 indexes built over them (what PathwayRecommender.recommend reads)
+- ModelSnapshot: a CatalogSnapshot plus the LearnerProfiler personas were
+  loaded into and the rule-based path's PathwayModels (clustering model,
+  curated DB and response cache, see pathway_engine.py), with a version
+  number and where they came from
+
+SnapshotManager builds a new ModelSnapshot in a background thread (open the
+catalog bundle or re-read the JSON catalog, reusing persisted embeddings so
+only new / changed courses are encoded, build the indexes, load a fresh
+profiler / pathway models) while requests keep being served from the active
+one. The swap is double-buffered: the new snapshot becomes active with one
+reference assignment each for the catalog and the pathway models, and the
+previous one is kept as the standby (rollback() swaps all of it back).
+A request reads the active snapshot once and uses it to the end, so
+in-flight requests finish on the version they started with and nothing is
+locked on the request path.
+
+Courses added / updated / deleted by id between reloads (change_courses /
+upsert_courses / delete_courses on the recommender, see catalog_delta.py)
+derive new CatalogSnapshots from the active one the same way. A reload rebuilds from
+the catalog files, so changes that were not also written there are dropped.
+
+Each process has its own manager: with several gunicorn workers a reload
+only affects the worker that received it (send SIGHUP to the master for a
+rolling restart of all of them). start() adopts state preloaded by the
+gunicorn master as the first snapshot instead of rebuilding it per worker.
+
+Settings (environment):
+  COURSE_CATALOG   catalog a reload reads when there is no fresh bundle
+                   (default backend/data/courses.json, as in inference.py)
+"""
+
+import itertools
+import os
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog_bundle import CATALOG_BUNDLE_DIR, file_signature, open_bundle
+from .catalog_delta import DELETED, CatalogDelta, IdLookup, id_key
+from .course_filters import CourseFilterIndex
+from .course_index import CourseIndex, _normalize_rows, build_index
+from .course_store import CourseStore
+from .lexical_index import HYBRID_ALPHA, HYBRID_CANDIDATES, LexicalIndex, top_matches
+
+ML_ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(ML_ENGINE_DIR, "models")
+COURSE_CATALOG = os.environ.get(
+    "COURSE_CATALOG", os.path.join(os.path.dirname(ML_ENGINE_DIR), "data", "courses.json")
+)
+
+# One counter per process for every snapshot version (reloads, incremental
+# updates, compactions), so versions only ever go up (except on rollback)
+_versions = itertools.count(1)
+_versions_lock = threading.Lock()
+
+
+def next_version() -> int:
+    with _versions_lock:
+        return next(_versions)
+
+
+class CatalogSnapshot:
+    """
+    Courses, their vectors and the indexes over them, plus the incremental
+    changes made since they were built (see catalog_delta.py). Never mutated
+    once built: updates derive a new snapshot sharing the base arrays.
+    """
+
+    __slots__ = ("version", "courses", "vectors", "index", "filter_index", "lexical", "info", "delta", "_ids")
+
+    def __init__(self, version: int, courses: CourseStore, vectors: np.ndarray,
+                 index: Optional[CourseIndex], filter_index: CourseFilterIndex,
+                 lexical: Optional[LexicalIndex] = None, info: Optional[Dict] = None,
+                 delta: Optional[CatalogDelta] = None, ids: Optional[List] = None):
+        self.version = version
+        self.courses = courses
+        self.vectors = vectors
+        self.index = index
+        self.filter_index = filter_index
+        self.lexical = lexical
+        self.info = info or {}
+        self.delta = delta if delta is not None else CatalogDelta()
+        # [IdLookup] built on the first update and shared by every snapshot with this base
+        self._ids = ids if ids is not None else [None]
+
+    @classmethod
+    def build(cls, courses: CourseStore, vectors: np.ndarray, index_backend: str = "exact",
+              index_params: Optional[Dict] = None, version: int = 0, info: Optional[Dict] = None,
+              lexical: Optional[LexicalIndex] = None) -> "CatalogSnapshot":
+        """lexical: a prebuilt BM25 index for `courses` (from the catalog bundle); built here otherwise."""
+        if len(courses) != len(vectors):
+            raise ValueError(f"{len(courses)} courses but {len(vectors)} vectors")
+        index = build_index(vectors, index_backend, **(index_params or {})) if len(courses) else None
+        if lexical is None and len(courses):
+            lexical = LexicalIndex.build(courses)
+        return cls(version, courses, vectors, index, CourseFilterIndex(courses), lexical, info)
+
+    def __len__(self) -> int:
+        """Live courses: base rows that are not tombstoned plus the delta."""
+        return len(self.courses) - self.delta.n_dead + self.delta.n_records
+
+    # -------------------------
+    # Lookup by id
+    # -------------------------
+    @property
+    def ids(self) -> IdLookup:
+        if self._ids[0] is None:
+            self._ids[0] = IdLookup(self.courses)
+        return self._ids[0]
+
+    def _live_base_row(self, course_id) -> int:
+        """Base row of `course_id`, -1 if it is not there or a change deleted / replaced it."""
+        if self.delta.locate(id_key(course_id)) is not None:
+            return -1
+        return self.ids.row(course_id)
+
+    def course(self, course_id) -> Optional[Dict]:
+        location = self.delta.locate(id_key(course_id))
+        if location is not None:
+            return self.delta.chunks[location[0]].courses[location[1]] if location != DELETED else None
+        row = self.ids.row(course_id)
+        return self.courses[row] if row >= 0 else None
+
+    def vector(self, course_id) -> Optional[np.ndarray]:
+        location = self.delta.locate(id_key(course_id))
+        if location is not None:
+            return self.delta.chunks[location[0]].vectors[location[1]] if location != DELETED else None
+        row = self.ids.row(course_id)
+        return np.asarray(self.vectors[row]) if row >= 0 else None
+
+    # -------------------------
+    # Search
+    # -------------------------
+    def _segments(self):
+        """
+        (courses, vectors, dense index, filter index, lexical index, tombstoned
+        rows or None) of the base and of each delta chunk.
+        """
+        delta = self.delta
+        segments = [(self.courses, self.vectors, self.index, self.filter_index, self.lexical, delta.dead)]
+        for chunk, dead in zip(delta.chunks, delta.chunk_dead):
+            segments.append((chunk.courses, chunk.vectors, chunk.index, chunk.filter_index, chunk.lexical,
+                             dead if len(dead) else None))
+        return segments
+
+    def _dense_hits(self, query: np.ndarray, top_k: int, filters: Optional[Dict]) -> List[Tuple[float, int, int]]:
+        """(cosine, segment, row) of the best live courses, best first."""
+        hits = []
+        for segment, (_, _, index, filter_index, _, dead) in enumerate(self._segments()):
+            if index is None:
+                continue
+            # Filters narrow the candidate rows before any vector is scored
+            candidates = filter_index.candidates(filters)
+            exclude = None
+            if dead is not None and candidates is not None:
+                candidates = candidates[~np.isin(candidates, dead)]
+            elif dead is not None:
+                # Tombstoned rows are masked before the top-k selection
+                exclude = dead
+            rows, scores = index.search(query, top_k, candidates=candidates, exclude=exclude)
+            hits.extend((float(score), segment, int(row)) for row, score in zip(rows, scores))
+        hits.sort(key=lambda hit: -hit[0])
+        return hits
+
+    def _lexical_scores(self, query_text: str, filters: Optional[Dict]) -> List[Optional[np.ndarray]]:
+        """Per segment: BM25 score of every row (0 if filtered out or deleted), None if nothing matches."""
+        out = []
+        for courses, _, _, filter_index, lexical, dead in self._segments():
+            scores = lexical.score(query_text, len(courses)) if lexical is not None and len(courses) else None
+            if scores is not None:
+                candidates = filter_index.candidates(filters)
+                if candidates is not None:
+                    allowed = np.zeros(len(courses), dtype=bool)
+                    allowed[candidates] = True
+                    scores[~allowed] = 0.0
+                if dead is not None:
+                    scores[dead] = 0.0
+            out.append(scores)
+        return out
+
+    def _materialize(self, hits: List[Tuple[float, int, int]], top_k: int) -> List[Dict]:
+        segments = self._segments()
+        results = []
+        for score, segment, row in hits[:top_k]:
+            # Materialized lazily, only for the top-k hits
+            item = segments[segment][0][row]
+            item['match_score'] = score
+            results.append(item)
+        return results
+
+    def search(self, query: np.ndarray, top_k: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
+        """Top-k live courses (dicts with 'match_score') by embedding similarity."""
+        return self._materialize(self._dense_hits(query, top_k, filters), top_k)
+
+    def _lexical_bound(self, query_text: str) -> float:
+        """Highest BM25 score any course could reach for the query (best posting of each term, summed)."""
+        bounds: Dict[str, float] = {}
+        for *_, lexical, _ in self._segments():
+            if lexical is not None:
+                for token, bound in lexical.term_bounds(query_text).items():
+                    bounds[token] = max(bounds.get(token, 0.0), bound)
+        return sum(bounds.values())
+
+    def search_lexical(self, query_text: str, top_k: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Top-k live courses by BM25 score alone (no embedding needed).
+        match_score is normalized to [0, 1] by the query's highest reachable
+        score; the raw BM25 score is in 'bm25_score'.
+        """
+        hits = []
+        for segment, scores in enumerate(self._lexical_scores(query_text, filters)):
+            if scores is not None:
+                hits.extend((float(scores[row]), segment, int(row)) for row in top_matches(scores, top_k))
+        hits.sort(key=lambda hit: -hit[0])
+        results = self._materialize(hits, top_k)
+        bound = self._lexical_bound(query_text) if results else 0.0
+        for item in results:
+            item['bm25_score'] = item['match_score']
+            item['match_score'] = min(1.0, item['match_score'] / bound) if bound > 0 else 0.0
+        return results
+
+    def search_hybrid(self, query: np.ndarray, query_text: str, top_k: int = 5, filters: Optional[Dict] = None,
+                      alpha: float = HYBRID_ALPHA, n_candidates: int = HYBRID_CANDIDATES) -> List[Dict]:
+        """
+        Fuse both rankings: the best top_k * n_candidates of each are scored as
+        alpha * cosine + (1 - alpha) * BM25 / (best BM25 score).
+        """
+        k = top_k * max(1, n_candidates)
+        lexical = self._lexical_scores(query_text, filters)
+        pools = [set() for _ in lexical]
+        for _, segment, row in self._dense_hits(query, k, filters):
+            pools[segment].add(row)
+        for segment, scores in enumerate(lexical):
+            if scores is not None:
+                pools[segment].update(top_matches(scores, k).tolist())
+
+        q = _normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        scored = []
+        for segment, ((_, vectors, _, _, _, _), rows) in enumerate(zip(self._segments(), pools)):
+            if not rows:
+                continue
+            rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            # Exact cosine for the pooled rows, whatever the index backend
+            dense = _normalize_rows(np.asarray(vectors[rows], dtype=np.float32)) @ q
+            bm25 = lexical[segment][rows] if lexical[segment] is not None else np.zeros(len(rows), dtype=np.float32)
+            scored.append((segment, rows, dense, bm25))
+        best_bm25 = max((float(bm25.max()) for _, _, _, bm25 in scored), default=0.0)
+
+        hits = []
+        for segment, rows, dense, bm25 in scored:
+            fused = alpha * dense + (1.0 - alpha) * (bm25 / best_bm25 if best_bm25 > 0 else bm25)
+            hits.extend((float(score), segment, int(row)) for row, score in zip(rows, fused))
+        hits.sort(key=lambda hit: -hit[0])
+        return self._materialize(hits, top_k)
+
+    # -------------------------
+    # Incremental changes
+    # -------------------------
+    def with_changes(self, upserts: List[Dict], vectors: np.ndarray, deletes: List,
+                     version: int) -> Tuple["CatalogSnapshot", List]:
+        """
+        New snapshot (sharing this one's base) with `upserts` added or replacing
+        the course with the same id, and the courses with ids in `deletes`
+        removed. Returns (snapshot, ids in `deletes` that were not found).
+        """
+        dead_rows, killed, missing = [], set(), []
+        for record in upserts:
+            key = id_key(record["id"])
+            row = self._live_base_row(key)
+            if row >= 0:
+                dead_rows.append(row)
+            killed.add(key)
+        for course_id in deletes:
+            key = id_key(course_id)
+            location = self.delta.locate(key)
+            row = self.ids.row(key) if location is None else -1
+            if row >= 0:
+                dead_rows.append(row)
+            elif location is None or location == DELETED:
+                missing.append(course_id)
+                continue
+            killed.add(key)
+        delta = self.delta.apply(upserts, vectors, killed, dead_rows, self.lexical)
+        snapshot = CatalogSnapshot(version, self.courses, self.vectors, self.index, self.filter_index,
+                                   self.lexical, self.info, delta, self._ids)
+        return snapshot, missing
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.delta.needs_compaction(len(self.courses))
+
+    def compacted(self, index_backend: str = "exact", index_params: Optional[Dict] = None,
+                  version: int = 0) -> "CatalogSnapshot":
+        """Merge live base rows and the delta into a new base and rebuild the index once."""
+        delta = self.delta
+        live = np.arange(len(self.courses))
+        if delta.dead is not None:
+            live = np.setdiff1d(live, delta.dead, assume_unique=True)
+        chunks = list(delta.live())
+        courses = CourseStore.from_records(
+            itertools.chain((self.courses[i] for i in live), *(records for records, _ in chunks))
+        )
+        parts = [np.asarray(self.vectors[live], dtype=np.float32)] if len(live) else []
+        parts.extend(vectors for records, vectors in chunks if len(records))
+        vectors = np.ascontiguousarray(np.concatenate(parts)) if parts else np.empty((0, 0), dtype=np.float32)
+        return CatalogSnapshot.build(courses, vectors, index_backend, index_params, version=version,
+                                     info=dict(self.info, compacted_from=self.version))
+
+
+class ModelSnapshot:
+    __slots__ = ("version", "catalog", "profiler", "pathway", "source", "created", "build_seconds")
+
+    def __init__(self, version: int, catalog: Optional[CatalogSnapshot], profiler, source: Dict,
+                 build_seconds: float = 0.0, pathway=None):
+        self.version = version
+        self.catalog = catalog
+        self.profiler = profiler
+        self.pathway = pathway  # pathway_engine.PathwayModels, or None if not managed
+        self.source = source
+        self.created = time.time()
+        self.build_seconds = build_seconds
+
+    def describe(self) -> Dict:
+        return {
+            "version": self.version,
+            "courses": len(self.catalog) if self.catalog is not None else 0,
+            "pathway": self.pathway.describe() if self.pathway is not None else None,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.created)),
+            "build_seconds": self.build_seconds,
+            "source": self.source,
+        }
+
+
+class SnapshotManager:
+    """
+    Owns the active / standby ModelSnapshot of one process.
+
+    recommender: PathwayRecommender whose catalog is swapped (None for a
+        process that only serves the rule-based path)
+    load_profiler: also load a fresh LearnerProfiler from model_dir
+    refresh_pathway: also load the rule-based path's clustering model and
+        curated DB into the snapshot (pathway_engine.PathwayModels) and serve
+        from it
+    """
+
+    def __init__(self, recommender=None, catalog_path: str = COURSE_CATALOG, model_dir: str = MODEL_DIR,
+                 bundle_dir: str = CATALOG_BUNDLE_DIR, load_profiler: bool = True,
+                 refresh_pathway: bool = False, log: Callable[[str], None] = print):
+        self.recommender = recommender
+        self.catalog_path = catalog_path
+        self.model_dir = model_dir
+        self.bundle_dir = bundle_dir
+        self.load_profiler = load_profiler
+        self.refresh_pathway = refresh_pathway
+        self.log = log
+        self._active: Optional[ModelSnapshot] = None
+        self._standby: Optional[ModelSnapshot] = None
+        self._lock = threading.Lock()  # swap + builder bookkeeping, never held by readers
+        self._builder: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    def current(self) -> Optional[ModelSnapshot]:
+        """The active snapshot; hold on to it for the whole request."""
+        return self._active
+
+    @property
+    def building(self) -> bool:
+        builder = self._builder
+        return builder is not None and builder.is_alive()
+
+    # -------------------------
+    # Building
+    # -------------------------
+    def _load_catalog(self, version: int):
+        rec = self.recommender
+        # Compiled bundle first: memory-mapped, nothing to parse or encode
+        bundle = open_bundle(self.bundle_dir, model_name=rec.encoder_id, source_path=self.catalog_path)
+        if bundle is not None and bundle.vectors is not None:
+            courses, vectors, lexical = bundle.courses, bundle.vectors, bundle.lexical
+            source = {"bundle": bundle.directory, "content_hash": bundle.manifest.get("content_hash")}
+        else:
+            from .embedding_store import CourseEmbeddingStore
+            courses, lexical = CourseStore.from_json(self.catalog_path), None
+            # Only new / changed courses are encoded; the rest come from the store
+            store = CourseEmbeddingStore(self.model_dir, rec.encoder_id)
+            vectors = rec.embed_catalog(courses, embedding_store=store)
+            source = {"catalog": file_signature(self.catalog_path)}
+        return rec.build_snapshot(courses, vectors, version=version, info=source, lexical=lexical), source
+
+    def _load_profiler(self):
+        from .profiler import LearnerProfiler
+        # A fresh instance: the profiler the active snapshot holds is never reloaded in place
+        profiler = LearnerProfiler(n_clusters=5)
+        profiler.load(self.model_dir)
+        return profiler
+
+    def build(self) -> ModelSnapshot:
+        """Build (but do not install) the next snapshot from what is on disk now."""
+        start = time.perf_counter()
+        version = next_version()
+        source = {}
+        catalog = profiler = pathway = None
+        if self.recommender is not None:
+            catalog, source["catalog"] = self._load_catalog(version)
+        if self.load_profiler:
+            profiler = self._load_profiler()
+            source["profiler"] = file_signature(os.path.join(self.model_dir, "kmeans_model.pkl"))
+        if self.refresh_pathway:
+            from .clustering import MODEL_PATH
+            from .pathway_engine import COURSES_JSON, refresh_pathway_models
+            pathway = refresh_pathway_models()
+            source["pathway"] = {"model": file_signature(MODEL_PATH), "curated": file_signature(COURSES_JSON)}
+        return ModelSnapshot(version, catalog, profiler, source, round(time.perf_counter() - start, 3),
+                             pathway=pathway)
+
+    def start(self) -> Dict:
+        """
+        First snapshot of a process. State that is already loaded (preloaded
+        by the gunicorn master before the fork, see preload.py) is adopted as
+        is, so the worker keeps sharing its pages copy-on-write; otherwise the
+        snapshot is built in the background like reload().
+        """
+        pathway = None
+        if self.refresh_pathway:
+            from .pathway_engine import loaded_pathway_models
+            pathway = loaded_pathway_models()
+        catalog = self.recommender.snapshot if self.recommender is not None else None
+        preloaded = (pathway is not None or not self.refresh_pathway) and \
+            (catalog is None or len(catalog) > 0) and not self.load_profiler
+        if self._active is not None or not preloaded:
+            return self.reload()
+        with self._lock:
+            version = next_version()
+            self._active = ModelSnapshot(version, catalog, None, {"preloaded": True}, pathway=pathway)
+        self.log(f"Snapshot v{version} adopted from preloaded state")
+        return self.status()
+
+    # -------------------------
+    # Swapping
+    # -------------------------
+    def swap(self, snapshot: ModelSnapshot) -> Optional[ModelSnapshot]:
+        """Make `snapshot` active; the previous one becomes the standby and is returned."""
+        with self._lock:
+            previous = self._active
+            if snapshot.catalog is not None and self.recommender is not None:
+                self.recommender.install_snapshot(snapshot.catalog)
+            if snapshot.pathway is not None:
+                from .pathway_engine import install_pathway_models
+                install_pathway_models(snapshot.pathway)
+            self._active = snapshot
+            self._standby = previous
+        return previous
+
+    def rollback(self) -> bool:
+        """Swap the standby (previous) snapshot back in. False if there is none."""
+        standby = self._standby
+        if standby is None:
+            return False
+        self.swap(standby)
+        self.log(f"Rolled back to snapshot v{standby.version}")
+        return True
+
+    def _rebuild(self):
+        try:
+            snapshot = self.build()
+            self.swap(snapshot)
+            self.reloads += 1
+            self.last_error = None
+            self.log(f"Snapshot v{snapshot.version} active ({len(snapshot.catalog or ())} courses, "
+                     f"built in {snapshot.build_seconds}s)")
+        except Exception as e:
+            # Keep serving the active snapshot
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.log(f"Warning: snapshot reload failed, keeping the active one: {self.last_error}")
+            traceback.print_exc()
+
+    def reload(self, wait: bool = False) -> Dict:
+        """
+        Build a new snapshot in the background and swap it in when ready.
+        A reload requested while one is already building joins that one.
+        wait=True blocks until it is done and raises if it failed.
+        """
+        with self._lock:
+            builder = self._builder
+            started = builder is None or not builder.is_alive()
+            if started:
+                builder = self._builder = threading.Thread(target=self._rebuild, name="snapshot-rebuild", daemon=True)
+                builder.start()
+        if wait:
+            builder.join()
+            if self.last_error is not None:
+                raise RuntimeError(f"Snapshot reload failed: {self.last_error}")
+        status = self.status()
+        status["started"] = started
+        return status
+
+    def status(self) -> Dict:
+        active, standby = self._active, self._standby
+        status = {
+            "active": active.describe() if active is not None else None,
+            "standby_version": standby.version if standby is not None else None,
+            "building": self.building,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
+        if self.refresh_pathway:
+            # Changed model files / courses.json are also picked up between reloads
+            from .pathway_engine import loaded_pathway_models
+            serving = loaded_pathway_models()
+            status["pathway"] = {
+                "serving": serving.describe() if serving is not None else None,
+                "from_active_snapshot": serving is not None and active is not None and serving is active.pathway,
+            }
+        if self.recommender is not None:
+            # Incremental updates move the served catalog past the snapshot it was loaded with
+            catalog = self.recommender.snapshot
+            status["catalog"] = {"version": catalog.version, "courses": len(catalog),
+                                 "pending_changes": catalog.delta.changes}
+        return status
+
+
+_manager: Optional[SnapshotManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_snapshot_manager() -> SnapshotManager:
+    """
+    Process-wide manager for the API: reloads the rule-based pathway models
+    and, once the shared recommender has been created (ML_PRELOAD_SEMANTIC or
+    feature enrichment), its catalog too.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            from .features import get_recommender
+            _manager = SnapshotManager(recommender=get_recommender(create=False), load_profiler=False,
+                                       refresh_pathway=True)
+        elif _manager.recommender is None:
+            from .features import get_recommender
+            _manager.recommender = get_recommender(create=False)
+        return _manager
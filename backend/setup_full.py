@@ -10,6 +10,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from backend.data.loader import generate_mock_nsqf_courses, save_mock_data
 from backend.ml_engine.profiler import LearnerProfiler
 from backend.ml_engine.recommender import PathwayRecommender
+from backend.ml_engine.embedding_store import CourseEmbeddingStore
+from backend.ml_engine.ingest import ingest_catalog
+from backend.ml_engine.catalog_bundle import CATALOG_BUNDLE_DIR, build_bundle
+from backend.ml_engine.clustering import train_model
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
@@ -18,15 +22,31 @@ MODEL_DIR = os.path.join(BASE_DIR, 'ml_engine', 'models')
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-def run_setup():
-    print("=== 1. Generating Dataset (Simulating Download) ===")
-    # Generate a larger dataset (e.g. 500 courses) to simulate a real download
-    courses = generate_mock_nsqf_courses(count=500)
-    save_path = os.path.join(DATA_DIR, 'courses.json')
-    save_mock_data(courses, save_path)
-    print(f"Dataset saved to {save_path} ({len(courses)} records)")
-    
-    print("\n=== 2. Pre-processing & Training Unsupervised Model ===")
+def run_setup(catalog_path=None):
+    """
+    catalog_path: an existing catalog (JSON array or NDJSON, e.g. a Coursera /
+        edX dump) to ingest instead of generating mock data. Inference must be
+        pointed at the same file with COURSE_CATALOG.
+    """
+    if catalog_path is None:
+        print("=== 1. Generating Dataset (Simulating Download) ===")
+        # Generate a larger dataset (e.g. 500 courses) to simulate a real download
+        courses = generate_mock_nsqf_courses(count=500)
+        catalog_path = os.path.join(DATA_DIR, 'courses.json')
+        save_mock_data(courses, catalog_path)
+        print(f"Dataset saved to {catalog_path} ({len(courses)} records)")
+    else:
+        print(f"=== 1. Using Existing Catalog {catalog_path} ===")
+
+    print("\n=== 2. Building Course Embedding Index ===")
+    # Stream the catalog in batches and persist the embeddings so inference
+    # startup can memory-map them instead of re-encoding every course
+    rec = PathwayRecommender(model_name='all-MiniLM-L6-v2')
+    store = CourseEmbeddingStore(MODEL_DIR, rec.encoder_id)
+    ingest_catalog(catalog_path, rec, embedding_store=store)
+    print(f"Embedding index saved to {store.vectors_path}")
+
+    print("\n=== 3. Pre-processing & Training Unsupervised Model ===")
     # We need to embed some dummy user history to train the clustering model
     # In a real scenario, this would load user_logs.csv
     
@@ -43,9 +63,21 @@ def run_setup():
     
     profiler.save(MODEL_DIR)
     print(f"Model saved to {MODEL_DIR}")
+
+    print("\n=== 4. Training Rule-Based Pathway Clustering Model ===")
+    # The /recommendations API only loads this model; it never trains on the request path
+    train_model()
+
+    print("\n=== 5. Compiling Binary Catalog Bundle ===")
+    # Columnar metadata + embeddings + BM25 index, memory-mapped by every worker at startup
+    # (mock-mode vectors are random, so they are left out of the bundle)
+    vectors = rec.course_vectors if rec.vectorizer else None
+    manifest = build_bundle(CATALOG_BUNDLE_DIR, rec.course_data, vectors, rec.encoder_id,
+                            source_path=catalog_path, lexical=rec.snapshot.lexical)
+    print(f"Bundle written to {CATALOG_BUNDLE_DIR} ({manifest['count']} courses, hash {manifest['content_hash']})")
     
     print("\n=== Setup Complete ===")
     print("Ready to run project.")
 
 if __name__ == "__main__":
-    run_setup()
+    run_setup(sys.argv[1] if len(sys.argv) > 1 else os.environ.get("COURSE_CATALOG"))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the engine the way the app does (`ml_engine.*`, run from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,105 @@
+# backend/tests/test_batching.py
+"""
+BatchingEncoder tests: every caller gets its own rows back in order while
+requests are batched together, a full queue is refused with
+EncoderOverloaded, and an encoder failure reaches every waiting caller.
+"""
+import threading
+
+import numpy as np
+import pytest
+
+from ml_engine.batching import BatchingEncoder, EncoderOverloaded
+
+TIMEOUT = 5
+
+
+def fake_encode(texts):
+    """Row i encodes texts[i] ("t-<caller>-<j>" -> [caller, j]), so rows can be traced back."""
+    return np.array([[float(part) for part in t.split("-")[1:]] for t in texts], dtype=np.float32)
+
+
+def expected_rows(caller, n):
+    return np.array([[caller, j] for j in range(n)], dtype=np.float32)
+
+
+def test_concurrent_callers_get_their_own_rows_in_order():
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        return fake_encode(texts)
+
+    batcher = BatchingEncoder(encode, max_batch_size=16, max_wait_ms=20)
+    results, errors = {}, []
+    start = threading.Barrier(24)
+
+    def caller(i):
+        try:
+            start.wait(TIMEOUT)
+            # Callers send 1..5 texts, so requests straddle batch boundaries
+            n = 1 + i % 5
+            results[i] = batcher.submit([f"t-{i}-{j}" for j in range(n)]).result(TIMEOUT)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(24)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    batcher.close()
+
+    assert errors == []
+    for i in range(24):
+        np.testing.assert_array_equal(results[i], expected_rows(i, 1 + i % 5))
+    stats = batcher.stats()
+    assert stats["requests"] == 24 and sum(calls) == sum(1 + i % 5 for i in range(24))
+    # Requests were actually batched, and no batch exceeded the cap
+    assert len(calls) < 24 and max(calls) <= 16
+
+
+def test_full_queue_raises_encoder_overloaded():
+    entered, release = threading.Event(), threading.Event()
+
+    def encode(texts):
+        entered.set()
+        release.wait(TIMEOUT)
+        return fake_encode(texts)
+
+    batcher = BatchingEncoder(encode, max_batch_size=1, max_wait_ms=0, max_pending=2)
+    try:
+        running = batcher.submit(["t-0-0"])
+        assert entered.wait(TIMEOUT)  # the worker is busy with the first request
+        queued = [batcher.submit([f"t-{i}-0"]) for i in (1, 2)]
+        with pytest.raises(EncoderOverloaded):
+            batcher.submit(["t-3-0"])
+    finally:
+        release.set()
+    for i, future in enumerate([running] + queued):
+        np.testing.assert_array_equal(future.result(TIMEOUT), expected_rows(i, 1))
+    # Room again once the queue drained
+    np.testing.assert_array_equal(batcher.encode(["t-4-0"]), expected_rows(4, 1))
+    batcher.close()
+
+
+def test_encoder_error_reaches_every_waiter():
+    fail = threading.Event()
+    fail.set()
+
+    def encode(texts):
+        if fail.is_set():
+            raise ValueError("model crashed")
+        return fake_encode(texts)
+
+    # A long wait window gathers all requests into one failing batch
+    batcher = BatchingEncoder(encode, max_batch_size=100, max_wait_ms=200)
+    futures = [batcher.submit([f"t-{i}-0", f"t-{i}-1"]) for i in range(6)]
+    for future in futures:
+        with pytest.raises(ValueError, match="model crashed"):
+            future.result(TIMEOUT)
+
+    # The worker survives the failure and keeps serving
+    fail.clear()
+    np.testing.assert_array_equal(batcher.encode(["t-7-0", "t-7-1"]), expected_rows(7, 2))
+    batcher.close()
@@ -0,0 +1,268 @@
+# backend/tests/test_catalog_delta.py
+"""
+Incremental catalog change tests: upserts and deletes by id must tombstone
+exactly the replaced / removed base rows, ids must never resolve to a course
+without one, and compacting must not change what any search returns.
+
+Run from the backend directory: python -m pytest tests
+"""
+import hashlib
+import math
+
+import numpy as np
+import pytest
+
+from ml_engine.catalog_delta import DeltaChunk, IdLookup
+from ml_engine.course_store import CourseStore
+from ml_engine.embedding_store import course_text
+from ml_engine.recommender import PathwayRecommender
+
+DIM = 16
+SECTORS = ["IT-ITeS", "Healthcare", "Automotive"]
+SKILLS = ["Python", "Excel", "Phlebotomy", "Welding", "Tally", "Nursing"]
+
+
+def seeded_courses(n: int, seed: int = 0, prefix: str = "C-"):
+    rng = np.random.default_rng(seed)
+    return [{
+        "id": f"{prefix}{1000 + i}",
+        "title": f"{SKILLS[int(rng.integers(len(SKILLS)))]} Course {i}",
+        "description": f"Hands-on {SKILLS[int(rng.integers(len(SKILLS)))]} practice.",
+        "skills": SKILLS[int(rng.integers(len(SKILLS)))],
+        "sector": SECTORS[i % len(SECTORS)],
+        "nsqf_level": int(rng.integers(3, 8)),
+    } for i in range(n)]
+
+
+def text_vector(text: str) -> np.ndarray:
+    """Deterministic stand-in for an embedding: same text, same vector."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).normal(size=DIM).astype(np.float32)
+
+
+@pytest.fixture
+def recommender(monkeypatch):
+    rec = PathwayRecommender(batching=False, retrieval="dense")
+    monkeypatch.setattr(rec, "_encode_direct",
+                        lambda texts: np.stack([text_vector(t) for t in texts]).astype(np.float32))
+    # Compaction is exercised explicitly
+    monkeypatch.setattr(rec, "_maybe_compact", lambda snap: None)
+    rec.fit_courses(seeded_courses(200))
+    return rec
+
+
+def search_all(snap, query: np.ndarray):
+    """Every kind of search the recommender runs, as comparable results."""
+    def ranked(results):
+        return [(r["id"], round(float(r["match_score"]), 5)) for r in results]
+
+    return {
+        "dense": ranked(snap.search(query, top_k=15)),
+        "filtered": ranked(snap.search(query, top_k=15, filters={"sector": "Healthcare"})),
+        # BM25 statistics are recomputed over the merged catalog, so scores
+        # may shift: the set of matching courses must not
+        "lexical": {r["id"] for r in snap.search_lexical("phlebotomy welding", top_k=1000)},
+    }
+
+
+# -------------------------
+# Id lookup
+# -------------------------
+def test_id_lookup_ignores_courses_without_an_id():
+    store = CourseStore.from_records([
+        {"title": "No id A", "description": "x"},
+        {"id": "C-1", "title": "One", "description": "x"},
+        {"title": "No id B", "description": "x"},
+        {"id": 42, "title": "Numeric", "description": "x"},
+    ])
+    lookup = IdLookup(store)
+    assert lookup.row("C-1") == 1
+    assert lookup.row(42) == 3 and lookup.row("42") == 3
+    assert lookup.row("") == -1
+    assert lookup.row("\0") == -1
+    assert lookup.row("C-2") == -1
+
+
+@pytest.mark.parametrize("bad_id", [None, "", "   "])
+def test_upsert_rejects_missing_or_blank_ids(recommender, bad_id):
+    before = recommender.snapshot
+    course = {"title": "Nameless", "description": "Nothing to address it by"}
+    if bad_id is not None:
+        course["id"] = bad_id
+    with pytest.raises(ValueError, match="'id'"):
+        recommender.upsert_courses([seeded_courses(1, prefix="N-")[0], course])
+    # Nothing was applied
+    assert recommender.snapshot is before
+
+
+def test_upsert_rejects_ids_equal_as_strings(recommender):
+    before = recommender.snapshot
+    one, two = seeded_courses(2, prefix="N-")
+    with pytest.raises(ValueError, match="duplicate id '42'"):
+        recommender.upsert_courses([dict(one, id=42, title="SQL one"), dict(two, id="42", title="SQL two")])
+    assert recommender.snapshot is before
+
+
+@pytest.mark.parametrize("bad_id", [["x"], {"id": 1}, 4.2, True])
+def test_upsert_rejects_ids_that_are_not_str_or_int(recommender, bad_id):
+    before = recommender.snapshot
+    course = dict(seeded_courses(1, prefix="N-")[0], id=bad_id)
+    with pytest.raises(ValueError, match="'id' must be a string or an integer"):
+        recommender.upsert_courses([course])
+    assert recommender.snapshot is before
+
+
+def test_empty_id_never_deletes_a_course_without_id(recommender):
+    recommender.fit_courses([{"title": "No id", "description": "x"}] + seeded_courses(5))
+    out = recommender.delete_courses([""])
+    assert out["deleted"] == 0 and out["missing"] == [""]
+    assert len(recommender.snapshot) == 6
+
+
+# -------------------------
+# Upserts, deletes, tombstones
+# -------------------------
+def test_upsert_replaces_the_base_course(recommender):
+    old = recommender.snapshot.course("C-1005")
+    replacement = dict(old, title="Phlebotomy Masterclass", description="Blood collection")
+    out = recommender.upsert_courses([replacement])
+    snap = recommender.snapshot
+    assert out["encoded"] == 1 and out["reused"] == 0
+    assert snap.course("C-1005")["title"] == "Phlebotomy Masterclass"
+    assert snap.delta.n_dead == 1 and len(snap) == 200
+    # The tombstoned base row never comes back from a search
+    hits = [r["id"] for r in snap.search(snap.vector("C-1005"), top_k=200)]
+    assert hits.count("C-1005") == 1
+    assert snap.search(snap.vector("C-1005"), top_k=1)[0]["title"] == "Phlebotomy Masterclass"
+
+
+def test_upsert_with_unchanged_text_reuses_the_vector(recommender):
+    course = recommender.snapshot.course("C-1010")
+    out = recommender.upsert_courses([dict(course, provider="New Provider")])
+    assert out["encoded"] == 0 and out["reused"] == 1
+    np.testing.assert_array_equal(recommender.snapshot.vector("C-1010"), text_vector(course_text(course)))
+
+
+def test_delete_base_and_delta_courses(recommender):
+    recommender.upsert_courses(seeded_courses(3, seed=4, prefix="N-"))
+    out = recommender.delete_courses(["C-1000", "N-1001", "C-9999"])
+    snap = recommender.snapshot
+    assert out["deleted"] == 2 and out["missing"] == ["C-9999"]
+    assert snap.course("C-1000") is None and snap.course("N-1001") is None
+    assert snap.course("N-1000") is not None
+    assert len(snap) == 200 - 1 + 2
+    ids = {r["id"] for r in snap.search(np.ones(DIM, dtype=np.float32), top_k=300)}
+    assert "C-1000" not in ids and "N-1001" not in ids and len(ids) == len(snap)
+
+    # Deleting again reports it missing; re-adding brings it back
+    assert recommender.delete_courses(["C-1000"])["missing"] == ["C-1000"]
+    recommender.upsert_courses([seeded_courses(1)[0]])
+    assert recommender.snapshot.course("C-1000") is not None
+
+
+def test_no_changes_make_no_new_version(recommender):
+    before = recommender.snapshot
+    assert recommender.delete_courses([]) == {"deleted": 0, "missing": [], "version": before.version}
+    assert recommender.upsert_courses([])["version"] == before.version
+    assert recommender.snapshot is before
+
+
+def test_upserts_and_deletes_apply_as_one_snapshot(recommender):
+    version = recommender.snapshot.version
+    out = recommender.change_courses(upserts=seeded_courses(2, seed=4, prefix="N-"), deletes=["C-1000", "C-9999"])
+    snap = recommender.snapshot
+    assert out["upserted"] == 2 and out["deleted"] == 1 and out["missing"] == ["C-9999"]
+    assert snap.version == out["version"] and snap.version != version
+    assert snap.course("N-1001") is not None and snap.course("C-1000") is None
+
+    # An invalid upsert applies neither half
+    with pytest.raises(ValueError):
+        recommender.change_courses(upserts=[{"id": "N-9", "title": ""}], deletes=["C-1001"])
+    with pytest.raises(ValueError, match="both upserted and deleted"):
+        recommender.change_courses(upserts=seeded_courses(1, prefix="N-"), deletes=["N-1000"])
+    assert recommender.snapshot is snap
+
+
+
+def test_admin_route_answers_422_for_bad_ids(recommender, monkeypatch):
+    from types import SimpleNamespace
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api.routes import admin
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(admin, "get_snapshot_manager", lambda: SimpleNamespace(recommender=recommender))
+    app = FastAPI()
+    app.include_router(admin.router)
+    client = TestClient(app)
+    before = recommender.snapshot
+    one, two = seeded_courses(2, prefix="N-")
+
+    for upsert in ([dict(one, id=["x"])], [dict(one, id=42), dict(two, id="42")]):
+        response = client.post("/admin/courses", json={"upsert": upsert, "delete": ["C-1000"]},
+                               headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 422
+    assert recommender.snapshot is before
+
+
+# -------------------------
+# Cost of a change
+# -------------------------
+def test_one_change_rebuilds_only_log_many_courses(recommender, monkeypatch):
+    rebuilt = []
+    build_chunk = DeltaChunk.__init__
+
+    def counting_init(self, records, *args, **kwargs):
+        rebuilt.append(len(records))
+        build_chunk(self, records, *args, **kwargs)
+
+    monkeypatch.setattr(DeltaChunk, "__init__", counting_init)
+    n_changes = 300
+    for i in range(n_changes):
+        if i % 5 == 4:
+            recommender.delete_courses([f"N-{1000 + i - 2}" if i % 10 == 4 else f"C-{1000 + i // 2}"])
+        else:
+            course = seeded_courses(1, seed=i, prefix="N-")[0]
+            recommender.upsert_courses([dict(course, id=f"N-{1000 + i}", title=f"{course['title']} v{i}")])
+
+    snap = recommender.snapshot
+    # The base is never copied, chunks stay logarithmic and each course is
+    # rebuilt O(log changes) times overall (amortized per change)
+    bound = math.log2(n_changes) + 2
+    assert len(snap.delta.chunks) <= bound
+    assert sum(rebuilt) <= n_changes * bound
+    assert max(rebuilt) <= n_changes
+    assert snap.delta.n_dead == len(snap.delta.dead) == 30
+
+    # ... and the result is the same catalog a compaction builds
+    after = recommender.compact()
+    assert len(after) == len(snap) == 200 - 30 + 240 - 30
+    for q in np.random.default_rng(5).normal(size=(5, DIM)).astype(np.float32):
+        assert search_all(after, q) == search_all(snap, q)
+    for i in range(n_changes):
+        for course_id in (f"N-{1000 + i}", f"C-{1000 + i}"):
+            assert (snap.course(course_id) is None) == (after.course(course_id) is None)
+
+# -------------------------
+# Compaction
+# -------------------------
+def test_compaction_keeps_every_search_result(recommender):
+    recommender.upsert_courses(seeded_courses(20, seed=7, prefix="N-"))
+    replaced = [dict(recommender.snapshot.course(f"C-{1000 + i}"), title=f"Welding Phlebotomy {i}")
+                for i in range(0, 60, 3)]
+    recommender.upsert_courses(replaced)
+    recommender.delete_courses([f"C-{1100 + i}" for i in range(10)] + ["N-1003"])
+    before = recommender.snapshot
+    assert before.delta.changes > 0
+
+    after = recommender.compact()
+    assert after is not before and after.delta.changes == 0
+    assert len(after) == len(before)
+    for q in np.random.default_rng(3).normal(size=(5, DIM)).astype(np.float32):
+        assert search_all(after, q) == search_all(before, q)
+    for course_id in ("C-1003", "N-1000", "C-1150"):
+        assert after.course(course_id) == before.course(course_id)
+        np.testing.assert_array_equal(after.vector(course_id), before.vector(course_id))
+    assert after.course("C-1100") is None and after.course("N-1003") is None
@@ -0,0 +1,194 @@
+# backend/tests/test_course_index.py
+"""
+Course index regression tests: ExactIndex must rank exactly like the original
+sklearn cosine_similarity + full argsort path, IVFIndex must keep its recall
+floor, and CourseFilterIndex must select the same rows as a plain scan.
+
+Run from the backend directory: python -m pytest tests
+"""
+import numpy as np
+import pytest
+
+from ml_engine.course_filters import CourseFilterIndex
+from ml_engine.course_index import CompressedIndex, ExactIndex, IVFIndex, measure_recall
+
+TOP_K = 10
+
+
+def synthetic_catalog(n: int = 3000, dim: int = 64, n_topics: int = 32, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors standing in for course embeddings."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    labels = rng.integers(0, n_topics, size=n)
+    return topics[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def synthetic_queries(catalog: np.ndarray, n: int = 50, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = catalog[rng.integers(0, len(catalog), size=n)]
+    return picks + 0.3 * rng.normal(size=picks.shape).astype(np.float32)
+
+
+def legacy_top_k(catalog: np.ndarray, query: np.ndarray, top_k: int):
+    """The original PathwayRecommender.recommend scoring."""
+    from sklearn.metrics.pairwise import cosine_similarity
+    sims = cosine_similarity(np.asarray(query, dtype=np.float64).reshape(1, -1),
+                             np.asarray(catalog, dtype=np.float64))[0]
+    top = sims.argsort()[::-1][:top_k]
+    return top, sims[top]
+
+
+def mock_courses(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    sectors = ["IT-ITeS", "Healthcare", "Automotive", "Electronics"]
+    providers = ["North", "South", "East"]
+    courses = []
+    for i in range(n):
+        level = int(rng.integers(3, 8))
+        course = {
+            "id": f"C-{1000 + i}",
+            "title": f"Course {i}",
+            "sector": sectors[int(rng.integers(len(sectors)))],
+            "nsqf_level": level,
+            "duration_hours": level * 50,
+            "provider": providers[int(rng.integers(len(providers)))],
+        }
+        if i % 17 == 0:
+            del course["sector"]  # missing values never match a filter
+        if i % 23 == 0:
+            del course["duration_hours"]
+        courses.append(course)
+    return courses
+
+
+def scan(courses, predicate) -> np.ndarray:
+    return np.array([i for i, c in enumerate(courses) if predicate(c)], dtype=np.int64)
+
+
+# -------------------------
+# ExactIndex vs. the original brute-force path
+# -------------------------
+def test_exact_index_matches_legacy_ranking():
+    catalog = synthetic_catalog()
+    index = ExactIndex(catalog)
+    for q in synthetic_queries(catalog):
+        idx, scores = index.search(q, TOP_K)
+        ref_idx, ref_scores = legacy_top_k(catalog, q, TOP_K)
+        np.testing.assert_allclose(scores, ref_scores, atol=1e-5)
+        assert idx.tolist() == ref_idx.tolist()
+
+
+def test_exact_index_candidates_match_legacy_on_subset():
+    catalog = synthetic_catalog()
+    candidates = np.arange(0, len(catalog), 7)
+    index = ExactIndex(catalog)
+    for q in synthetic_queries(catalog, n=20):
+        idx, scores = index.search(q, TOP_K, candidates=candidates)
+        ref_idx, ref_scores = legacy_top_k(catalog[candidates], q, TOP_K)
+        np.testing.assert_allclose(scores, ref_scores, atol=1e-5)
+        assert idx.tolist() == candidates[ref_idx].tolist()
+
+
+def test_exact_index_small_catalog_and_empty_candidates():
+    catalog = synthetic_catalog(n=3)
+    idx, scores = ExactIndex(catalog).search(catalog[0], TOP_K)
+    assert sorted(idx.tolist()) == [0, 1, 2]
+    assert idx[0] == 0 and scores[0] == pytest.approx(1.0, abs=1e-5)
+
+    idx, scores = ExactIndex(catalog).search(catalog[0], TOP_K, candidates=np.empty(0, dtype=np.int64))
+    assert len(idx) == 0 and len(scores) == 0
+
+
+# -------------------------
+# IVFIndex recall
+# -------------------------
+def test_ivf_recall_floor():
+    # Many small topics, so neighbours do spill over bucket boundaries
+    catalog = synthetic_catalog(n=20000, n_topics=1024)
+    queries = synthetic_queries(catalog, n=100)
+    stats = measure_recall(IVFIndex(catalog, nprobe=8), ExactIndex(catalog), queries, top_k=TOP_K)
+    assert stats[f"recall@{TOP_K}"] >= 0.95
+
+
+def test_ivf_probing_every_list_is_exact():
+    catalog = synthetic_catalog(n=2000)
+    ivf = IVFIndex(catalog, n_lists=16, nprobe=16)
+    exact = ExactIndex(catalog)
+    for q in synthetic_queries(catalog, n=20):
+        assert ivf.search(q, TOP_K)[0].tolist() == exact.search(q, TOP_K)[0].tolist()
+
+
+
+# -------------------------
+# Excluded (tombstoned) rows
+# -------------------------
+@pytest.mark.parametrize("make_index", [
+    ExactIndex,
+    lambda v: IVFIndex(v, n_lists=16, nprobe=16),
+    lambda v: CompressedIndex(v, rescore_factor=1000),
+])
+def test_excluded_rows_are_masked_before_top_k(make_index):
+    catalog = synthetic_catalog(n=2000)
+    index = make_index(catalog)
+    exact = ExactIndex(catalog)
+    for q in synthetic_queries(catalog, n=10):
+        # Exclude the whole unfiltered top 2k: top_k live rows must still come back
+        exclude = exact.search(q, 2 * TOP_K)[0]
+        idx, scores = index.search(q, TOP_K, exclude=exclude)
+        live = np.setdiff1d(np.arange(len(catalog)), exclude)
+        ref_idx, ref_scores = exact.search(q, TOP_K, candidates=live)
+        assert idx.tolist() == ref_idx.tolist()
+        np.testing.assert_allclose(scores, ref_scores, atol=1e-5)
+
+
+def test_excluding_every_row_returns_nothing():
+    catalog = synthetic_catalog(n=50)
+    idx, scores = ExactIndex(catalog).search(catalog[0], TOP_K, exclude=np.arange(50))
+    assert len(idx) == 0 and len(scores) == 0
+
+# -------------------------
+# CourseFilterIndex
+# -------------------------
+FILTER_CASES = [
+    ({"sector": "Healthcare"}, lambda c: c.get("sector") == "Healthcare"),
+    ({"sector": ["Healthcare", "Automotive"]}, lambda c: c.get("sector") in ("Healthcare", "Automotive")),
+    ({"nsqf_level": 5}, lambda c: c["nsqf_level"] == 5),
+    ({"nsqf_level": {"min": 4, "max": 6}}, lambda c: 4 <= c["nsqf_level"] <= 6),
+    ({"duration_hours": {"max": 200}}, lambda c: c.get("duration_hours", np.inf) <= 200),
+    ({"duration_hours": {"min": 250}}, lambda c: "duration_hours" in c and c["duration_hours"] >= 250),
+    ({"sector": "IT-ITeS", "nsqf_level": 5, "provider": "North"},
+     lambda c: c.get("sector") == "IT-ITeS" and c["nsqf_level"] == 5 and c["provider"] == "North"),
+    ({"sector": "Unknown sector"}, lambda c: False),
+]
+
+
+@pytest.mark.parametrize("filters,predicate", FILTER_CASES)
+def test_filter_candidates_match_scan(filters, predicate):
+    courses = mock_courses(1500)
+    rows = CourseFilterIndex(courses).candidates(filters)
+    assert rows.tolist() == scan(courses, predicate).tolist()
+
+
+def test_filter_without_constraints_searches_everything():
+    index = CourseFilterIndex(mock_courses(10))
+    assert index.candidates(None) is None
+    assert index.candidates({}) is None
+    assert index.candidates({"sector": None}) is None
+
+
+def test_filter_unknown_field_raises():
+    with pytest.raises(ValueError):
+        CourseFilterIndex(mock_courses(10)).candidates({"language": "Hindi"})
+
+
+def test_filtered_search_matches_legacy_on_filtered_rows():
+    courses = mock_courses(1500)
+    catalog = synthetic_catalog(n=len(courses))
+    filters = {"sector": "Healthcare", "nsqf_level": {"max": 5}}
+    candidates = CourseFilterIndex(courses).candidates(filters)
+    allowed = scan(courses, lambda c: c.get("sector") == "Healthcare" and c["nsqf_level"] <= 5)
+    index = ExactIndex(catalog)
+    for q in synthetic_queries(catalog, n=20):
+        idx, _ = index.search(q, TOP_K, candidates=candidates)
+        ref_idx, _ = legacy_top_k(catalog[allowed], q, TOP_K)
+        assert idx.tolist() == allowed[ref_idx].tolist()
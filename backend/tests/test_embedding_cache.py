@@ -0,0 +1,207 @@
+# backend/tests/test_embedding_cache.py
+"""
+EmbeddingCache tests: normalize_text canonicalizes profile texts, texts with
+the same normalized form share one embedding, the memory tier evicts the
+least recently used entries by count and by bytes, and the SQLite tier
+survives a new cache instance (a restart) without re-encoding.
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from ml_engine.embedding_cache import EmbeddingCache, normalize_text
+
+DIM = 4
+
+
+class CountingEncoder:
+    """Deterministic fake encoder recording every text it was asked to encode."""
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        rows = []
+        for t in texts:
+            seed = sum(t.encode("utf-8")) + len(t)
+            rows.append(np.random.default_rng(seed).standard_normal(DIM))
+        return np.array(rows, dtype=np.float32)
+
+
+# -------------------------
+# normalize_text
+# -------------------------
+@pytest.mark.parametrize("text, expected", [
+    ("Data Analyst", "data analyst"),
+    ("  data\tanalyst \n", "data analyst"),
+    ("Aspiration: Data  Analyst. Skills: SQL, python.",
+     "aspiration: data analyst; skills: python, sql"),
+    ("aspiration: data analyst; skills: python, sql",
+     "aspiration: data analyst; skills: python, sql"),
+    ("Aspiration: ML Engineer; Skills: python, Python , , docker",
+     "aspiration: ml engineer; skills: docker, python"),
+    ("Aspiration: ML Engineer; Skills:", "aspiration: ml engineer; skills: "),
+    ("skills: sql, python", "skills: sql, python"),  # not a profile text: order kept
+])
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+def test_normalize_text_is_idempotent():
+    text = normalize_text("Aspiration: Data Analyst. Skills: SQL, Python, sql")
+    assert normalize_text(text) == text
+
+
+# -------------------------
+# Shared embeddings for equal normalized texts
+# -------------------------
+def test_equal_normalized_texts_get_identical_vectors():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("model", path=None)
+    texts = [
+        "Aspiration: Data Analyst. Skills: SQL, Python.",
+        "aspiration: data  analyst; skills: python, sql",
+        "ASPIRATION: Data Analyst; Skills: python, SQL, sql",
+    ]
+    out = cache.encode(texts, encoder)
+
+    assert out.shape == (3, DIM)
+    assert encoder.seen == texts[:1]  # first text seen for the key is the one encoded
+    assert np.array_equal(out[0], out[1]) and np.array_equal(out[0], out[2])
+
+    again = cache.encode([texts[2]], encoder)
+    assert np.array_equal(again[0], out[0])
+    assert encoder.seen == texts[:1]
+    assert cache.stats()["hits"] == 1
+
+
+def test_different_models_do_not_share_keys():
+    a, b = EmbeddingCache("model-a", path=None), EmbeddingCache("model-b", path=None)
+    assert a.key("data analyst") != b.key("data analyst")
+    assert a.key("Data  Analyst") == a.key("data analyst")
+
+
+def test_cached_vectors_match_uncached_encoding():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("model", path=None)
+    texts = ["python developer", "data analyst", "python developer", "ux designer"]
+    first = cache.encode(texts, encoder)
+    second = cache.encode(texts, encoder)
+    assert np.array_equal(first, CountingEncoder()(texts))
+    assert np.array_equal(first, second)
+
+
+# -------------------------
+# Memory tier: LRU eviction
+# -------------------------
+def test_lru_evicts_least_recently_used_entry():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("model", max_entries=2, path=None)
+    cache.encode(["a"], encoder)
+    cache.encode(["b"], encoder)
+    cache.encode(["a"], encoder)  # "a" is now more recent than "b"
+    cache.encode(["c"], encoder)  # evicts "b"
+
+    assert cache.stats()["entries"] == 2
+    encoder.seen.clear()
+    cache.encode(["a", "c"], encoder)
+    assert encoder.seen == []
+    cache.encode(["b"], encoder)
+    assert encoder.seen == ["b"]
+
+
+def test_lru_is_bounded_by_bytes():
+    encoder = CountingEncoder()
+    row_bytes = DIM * 4
+    cache = EmbeddingCache("model", max_entries=100, max_bytes=3 * row_bytes, path=None)
+    cache.encode([f"text {i}" for i in range(10)], encoder)
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] == 3 * row_bytes
+    encoder.seen.clear()
+    cache.encode(["text 9"], encoder)
+    assert encoder.seen == []
+    cache.encode(["text 0"], encoder)
+    assert encoder.seen == ["text 0"]
+
+
+def test_zero_entries_disables_memory_tier():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("model", max_entries=0, path=None)
+    cache.encode(["a"], encoder)
+    cache.encode(["a"], encoder)
+    assert encoder.seen == ["a", "a"]
+    assert cache.stats()["entries"] == 0
+
+
+# -------------------------
+# Disk tier: persistence and reload
+# -------------------------
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.sqlite")
+    texts = ["data analyst", "Aspiration: ML Engineer. Skills: python, docker."]
+
+    first_encoder = CountingEncoder()
+    first = EmbeddingCache("model", path=path).encode(texts, first_encoder)
+    assert first_encoder.seen == texts
+
+    # A new instance starts with an empty memory tier and reads the file
+    second_encoder = CountingEncoder()
+    reloaded = EmbeddingCache("model", path=path)
+    again = reloaded.encode(["Data Analyst", "aspiration: ml engineer; skills: docker, python"], second_encoder)
+
+    assert second_encoder.seen == []
+    assert np.array_equal(again, first)
+    assert again.dtype == np.float32
+    stats = reloaded.stats()
+    assert stats["disk_hits"] == 2 and stats["misses"] == 0
+    assert stats["entries"] == 2  # disk hits are promoted into memory
+
+
+def test_sqlite_tier_is_per_model(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache("model-a", path=path).encode(["data analyst"], CountingEncoder())
+    encoder = CountingEncoder()
+    EmbeddingCache("model-b", path=path).encode(["data analyst"], encoder)
+    assert encoder.seen == ["data analyst"]
+
+
+def test_clear_keeps_disk_tier(tmp_path):
+    cache = EmbeddingCache("model", path=str(tmp_path / "embeddings.sqlite"))
+    cache.encode(["data analyst"], CountingEncoder())
+    cache.clear()
+    encoder = CountingEncoder()
+    cache.encode(["data analyst"], encoder)
+    assert encoder.seen == []
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_unusable_path_disables_disk_tier(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    cache = EmbeddingCache("model", path=str(blocker / "embeddings.sqlite"))
+    assert cache.path is None
+    out = cache.encode(["data analyst"], CountingEncoder())
+    assert out.shape == (1, DIM)
+
+
+def test_encode_async_matches_encode(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    texts = ["data analyst", "ux designer", "Data Analyst"]
+    expected = EmbeddingCache("model", path=None).encode(texts, CountingEncoder())
+
+    encoder = CountingEncoder()
+
+    async def encode_async(batch):
+        return encoder(batch)
+
+    out = asyncio.run(EmbeddingCache("model", path=path).encode_async(texts, encode_async))
+    assert np.array_equal(out, expected)
+    assert encoder.seen == ["data analyst", "ux designer"]
+
+    reloaded = asyncio.run(EmbeddingCache("model", path=path).encode_async(texts, encode_async))
+    assert np.array_equal(reloaded, expected)
+    assert encoder.seen == ["data analyst", "ux designer"]
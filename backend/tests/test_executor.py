@@ -0,0 +1,113 @@
+# backend/tests/test_executor.py
+"""
+BoundedExecutor tests: a saturated executor answers 503 + Retry-After, and a
+request that stops waiting keeps its slot until the pool has finished its job.
+"""
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import executor as executor_module
+from app.api.executor import BoundedExecutor, ExecutorSaturated
+from app.api.routes import recommendations
+from app.main import app
+
+PAYLOAD = {"user_profile": {"avg_score": 0.6}, "current_skills": ["python"], "career_aspiration": "Data Analyst"}
+
+
+def occupy(executor: BoundedExecutor, release: threading.Event) -> threading.Thread:
+    """Hold one executor slot from another event loop until `release` is set."""
+    started = threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=lambda: asyncio.run(executor.run(job)))
+    thread.start()
+    assert started.wait(5)
+    return thread
+
+
+@pytest.fixture
+def small_executor(monkeypatch):
+    executor = BoundedExecutor(kind="thread", max_workers=1, max_queue=0, retry_after=7)
+    monkeypatch.setattr(recommendations, "ml_executor", executor)
+    yield executor
+    executor.shutdown()
+
+
+def test_saturated_executor_answers_503_with_retry_after(small_executor, monkeypatch):
+    monkeypatch.setattr(recommendations, "generate_learning_pathway", lambda **kwargs: {"ok": True})
+    client = TestClient(app)
+    release = threading.Event()
+    holder = occupy(small_executor, release)
+    try:
+        response = client.post("/recommendations/", json=PAYLOAD)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+        assert client.post("/recommendations/batch", json={"items": [PAYLOAD]}).status_code == 503
+        assert small_executor.stats()["rejected"] == 2
+    finally:
+        release.set()
+        holder.join(5)
+
+    response = client.post("/recommendations/", json=PAYLOAD)
+    assert response.status_code == 200 and response.json() == {"ok": True}
+    assert small_executor.stats()["in_flight"] == 0
+
+
+def test_cancelled_request_keeps_its_slot_until_the_job_finishes():
+    executor = BoundedExecutor(kind="thread", max_workers=1, max_queue=0)
+    started, release, finished = threading.Event(), threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+        finished.set()
+
+    async def scenario():
+        task = asyncio.ensure_future(executor.run(job))
+        while not started.is_set():
+            await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The job is still running on the pool: its slot is still taken
+        assert executor.stats()["in_flight"] == 1
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(job)
+
+        release.set()
+        assert await asyncio.get_running_loop().run_in_executor(None, finished.wait, 5)
+        for _ in range(200):
+            if executor.stats()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.005)
+        assert executor.stats()["in_flight"] == 0
+        assert await executor.run(lambda: 42) == 42
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_failed_submit_releases_the_slot(monkeypatch):
+    executor = BoundedExecutor(kind="thread", max_workers=1, max_queue=0)
+
+    def broken_pool():
+        raise RuntimeError("pool is shut down")
+
+    monkeypatch.setattr(executor, "_get_pool", broken_pool)
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.run(lambda: None))
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_unknown_executor_kind():
+    with pytest.raises(ValueError):
+        executor_module.BoundedExecutor(kind="fiber")
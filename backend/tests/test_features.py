@@ -0,0 +1,158 @@
+# backend/tests/test_features.py
+"""
+Feature builder tests: the compiled SkillMatcher must extract exactly what
+the original per-skill substring loop extracted, and RoleSkillIndex must
+score and rank roles exactly like the nested coverage loop it replaced.
+
+Run from the backend directory: python -m pytest tests
+"""
+import random
+
+import pytest
+
+from ml_engine.features import (
+    CAREER_DEMAND_MAP, ROLE_REQUIRED_SKILLS, SKILL_VOCAB, RoleSkillIndex, SkillMatcher, build_feature_vector,
+    extract_skills_from_text, normalize,
+)
+
+# Skills that overlap or sit inside one another
+OVERLAPPING_VOCAB = [
+    "c", "c++", "c#", "java", "javascript", "script", "node", "node.js", "learning",
+    "machine learning", "deep learning", "ear", "sql", "nosql", "my sql", "Power BI", "power", "bi",
+    "ui/ux", "ux", "data", "data analysis", "analysis", "JAVA",
+]
+FILLER = ["I", "have", "built", "projects", "with", "and", "in", "experience", "years", "of", "the",
+          "machine", "teacher", "aws-certified", "node.js", "react/redux", "(python)", "c++17", "C#",
+          "mysql", "nosql", "ñandú", "résumé", "—", ",", ".", "/", "\n", "  "]
+
+
+def legacy_extract(text, vocab):
+    """The original extract_skills_from_text loop."""
+    if not text:
+        return []
+    text_lc = text.lower()
+    found = set()
+    for skill in vocab:
+        skill_lc = skill.lower()
+        if skill_lc in text_lc:
+            found.add(skill_lc)
+    return sorted(list(found))
+
+
+def resume_texts(vocab, n=500, seed=0):
+    rng = random.Random(seed)
+    texts = ["", " ", "C", "c++", "javascript", "machine learning", "MySQL and NoSQL", "ui/ux designer"]
+    for _ in range(n):
+        words = []
+        for _ in range(rng.randint(1, 40)):
+            word = rng.choice(vocab) if rng.random() < 0.4 else rng.choice(FILLER)
+            if rng.random() < 0.2:
+                word = word.upper()
+            if rng.random() < 0.1 and len(word) > 2:
+                # a fragment of a word, glued to the next one
+                word = word[rng.randint(0, len(word) - 2):]
+                words.append(word)
+                continue
+            words.append(word + rng.choice([" ", ", ", ". ", "/", "-", ""]))
+        texts.append("".join(words))
+    return texts
+
+
+@pytest.mark.parametrize("vocab", [SKILL_VOCAB, OVERLAPPING_VOCAB], ids=["skill_vocab", "overlapping"])
+def test_skill_matcher_matches_the_substring_loop(vocab):
+    for text in resume_texts(vocab):
+        assert extract_skills_from_text(text, vocab) == legacy_extract(text, vocab), text
+
+
+def test_skill_matcher_reports_nested_and_overlapping_skills():
+    matcher = SkillMatcher(OVERLAPPING_VOCAB)
+    assert matcher.find("JavaScript") == {"java", "javascript", "script", "c"}
+    assert matcher.find("deep learning") == {"deep learning", "learning", "ear"}
+    # word_boundary=True keeps only whole-token matches
+    assert matcher.find("machine learning, c++ and node.js", word_boundary=True) == \
+        {"machine learning", "learning", "c++", "node", "node.js"}
+
+
+
+def test_vocab_edited_in_place_is_recompiled():
+    vocab = ["python", "sql"]
+    assert extract_skills_from_text("python and tableau", vocab) == ["python"]
+    # Same list object, same length, different skill
+    vocab[1] = "tableau"
+    assert extract_skills_from_text("python and sql", vocab) == ["python"]
+    assert extract_skills_from_text("python and tableau", vocab) == ["python", "tableau"]
+    vocab.append("sql")
+    assert extract_skills_from_text("python and sql", vocab) == ["python", "sql"]
+
+# -------------------------
+# Role coverage bitsets
+# -------------------------
+def legacy_coverage(required, extracted_skills):
+    """The original nested loop in build_feature_vector: (matched, required count)."""
+    required_norm = [r.lower() for r in required]
+    matched = 0
+    for req in required_norm:
+        for s in extracted_skills:
+            if req in s or s in req:
+                matched += 1
+                break
+    return matched, len(required_norm)
+
+
+def legacy_best_fit(skills, role_skills, top_n):
+    scores = {}
+    for role, required in role_skills.items():
+        matched, n_required = legacy_coverage(required, skills)
+        scores[role] = matched / max(1, n_required)
+    ranked = sorted(scores.items(), key=lambda kv: (kv[1], CAREER_DEMAND_MAP.get(kv[0], 0.0)), reverse=True)
+    return ranked[:top_n]
+
+
+def skill_sets(n=1000, seed=0):
+    rng = random.Random(seed)
+    pool = sorted({r for skills in ROLE_REQUIRED_SKILLS.values() for r in skills} | set(SKILL_VOCAB))
+    # Substrings / superstrings of required skills also count under the old rule
+    pool += ["c", "java", "script", "learning", "ux", "net", "", "aws lambda", "html5", "unknown"]
+    sets = [set(), {""}, {"c"}]
+    for _ in range(n):
+        sets.append(set(rng.sample(pool, rng.randint(1, 12))))
+    return sets
+
+
+def test_role_scores_match_the_nested_loop():
+    index = RoleSkillIndex()
+    for skills in skill_sets():
+        scores = index.score_all_roles(skills)
+        assert list(scores) == list(ROLE_REQUIRED_SKILLS)
+        for role, required in ROLE_REQUIRED_SKILLS.items():
+            matched, n_required = legacy_coverage(required, skills)
+            assert index.coverage(role, index.user_mask(skills)) == (matched, n_required)
+            assert scores[role] == {"coverage": matched / max(1, n_required), "matched": matched,
+                                    "missing": n_required - matched}
+
+
+@pytest.mark.parametrize("role_skills", [
+    ROLE_REQUIRED_SKILLS,
+    # Identical requirements and equal demand: ties on both keys keep role order
+    {"data scientist": ["python", "sql"], "machine learning engineer": ["sql", "python"],
+     "web developer": ["html", "css"], "unknown role": ["html", "css"], "empty role": []},
+], ids=["roles", "ties"])
+def test_best_fit_roles_rank_like_the_nested_loop(role_skills):
+    index = RoleSkillIndex(role_skills)
+    for skills in skill_sets(n=300, seed=1):
+        for top_n in (1, 3, len(role_skills)):
+            assert index.best_fit_roles(skills, top_n=top_n) == legacy_best_fit(skills, role_skills, top_n)
+
+
+def test_build_feature_vector_coverage_matches_the_nested_loop():
+    rng = random.Random(2)
+    for skills in skill_sets(n=300, seed=3):
+        aspiration = rng.choice(list(ROLE_REQUIRED_SKILLS) + ["Chef", ""])
+        features = build_feature_vector({}, sorted(skills), aspiration)
+        matched, n_required = legacy_coverage(ROLE_REQUIRED_SKILLS.get(features["role"], []),
+                                              set(features["extracted_skills"]))
+        if n_required:
+            assert features["skill_coverage_ratio"] == matched / n_required
+            assert features["missing_skills_count"] == normalize(n_required - matched, 0.0, n_required)
+        else:
+            assert features["skill_coverage_ratio"] == features["missing_skills_count"] == 0.0
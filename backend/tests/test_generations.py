@@ -0,0 +1,102 @@
+# backend/tests/test_generations.py
+"""
+Published-generation tests for the course embedding store and the catalog
+bundle: a reader must always find a complete index or bundle while another
+thread keeps replacing it, and a manifest that does not name its own
+generation is never served.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from ml_engine import generations
+from ml_engine.catalog_bundle import build_bundle, open_bundle, read_manifest
+from ml_engine.course_store import CourseStore
+from ml_engine.embedding_store import CourseEmbeddingStore, content_keys
+
+MODEL = "test-model"
+
+
+def keys_and_vectors(n: int, value: float):
+    keys = content_keys([f"course {i}" for i in range(n)], MODEL)
+    return keys, np.full((n, 8), value, dtype=np.float32)
+
+
+def test_save_publishes_one_generation_and_keeps_the_previous(tmp_path):
+    store = CourseEmbeddingStore(str(tmp_path), MODEL)
+    assert store.load() is None and store.vectors_path is None
+    for value in (1.0, 2.0, 3.0):
+        store.save(*keys_and_vectors(10, value))
+        keys, vectors = store.load()
+        assert len(keys) == 10 and np.all(vectors == value)
+    names = sorted(os.listdir(store.path))
+    assert generations.POINTER in names
+    assert len([n for n in names if n.startswith(generations.PREFIX)]) == 2
+    assert store.vectors_path.startswith(os.path.join(store.path, generations.current_generation(store.path)))
+
+
+def test_old_single_directory_layout_is_replaced(tmp_path):
+    store = CourseEmbeddingStore(str(tmp_path), MODEL)
+    os.makedirs(store.path)
+    np.save(os.path.join(store.path, "vectors.npy"), np.zeros((2, 8), dtype=np.float32))
+    assert store.load() is None
+    store.save(*keys_and_vectors(4, 5.0))
+    assert not os.path.exists(os.path.join(store.path, "vectors.npy"))
+    assert np.all(store.load()[1] == 5.0)
+
+
+def test_readers_never_miss_the_store_while_it_is_replaced(tmp_path):
+    store = CourseEmbeddingStore(str(tmp_path), MODEL)
+    store.save(*keys_and_vectors(200, 0.0))
+    stop = threading.Event()
+    failures = []
+
+    def read():
+        while not stop.is_set():
+            loaded = store.load()
+            if loaded is None:
+                failures.append("missing")
+                continue
+            _, vectors = loaded
+            # Every row comes from the same generation
+            if not np.all(vectors == vectors[0, 0]):
+                failures.append("mixed")
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        for value in range(1, 60):
+            store.save(*keys_and_vectors(200, float(value)))
+            stop.wait(0.002)
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+    assert failures == []
+
+
+def sample_courses(n: int) -> CourseStore:
+    return CourseStore.from_records([
+        {"id": f"C-{i}", "title": f"Welding {i}", "description": "Arc welding", "skills": "Welding"}
+        for i in range(n)
+    ])
+
+
+def test_bundle_round_trip_and_generation_check(tmp_path):
+    directory = str(tmp_path / "bundle")
+    assert open_bundle(directory) is None
+    build_bundle(directory, sample_courses(5), np.ones((5, 8), dtype=np.float32), MODEL)
+    manifest = build_bundle(directory, sample_courses(7), np.ones((7, 8), dtype=np.float32), MODEL)
+    bundle = open_bundle(directory, model_name=MODEL)
+    assert len(bundle.courses) == 7 and bundle.vectors.shape == (7, 8)
+    assert bundle.manifest == manifest == read_manifest(directory)
+    assert os.path.basename(bundle.directory) == manifest["generation"]
+
+    # A manifest that does not name the generation it sits in is never served
+    manifest_path = os.path.join(bundle.directory, "manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(dict(manifest, generation="g-other"), f)
+    assert open_bundle(directory) is None and read_manifest(directory) is None
@@ -0,0 +1,61 @@
+# backend/tests/test_inference_daemon.py
+"""
+Inference daemon tests: the ops that change the served catalog (reload,
+upsert, delete) need ADMIN_TOKEN and are refused when none is configured.
+"""
+import threading
+
+import pytest
+
+from inference import InferenceServer, request_daemon
+
+
+class FakeRecommender:
+    batcher = embedding_cache = None
+
+    def upsert_courses(self, courses):
+        return {"upserted": len(courses)}
+
+    def delete_courses(self, ids):
+        return {"deleted": len(ids), "missing": []}
+
+
+class FakeSnapshots:
+    def reload(self, wait=False):
+        return {"started": True}
+
+    def status(self):
+        return {"active": None}
+
+
+@pytest.fixture
+def daemon(request):
+    server = InferenceServer(("127.0.0.1", 0), FakeRecommender(), FakeSnapshots(), admin_token=request.param)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+ADMIN_REQUESTS = [{"op": "reload"}, {"op": "upsert", "courses": [{"id": "C-1"}]}, {"op": "delete", "ids": ["C-1"]}]
+
+
+@pytest.mark.parametrize("daemon", ["s3cret"], indirect=True)
+@pytest.mark.parametrize("data", ADMIN_REQUESTS)
+def test_admin_ops_need_the_token(daemon, data):
+    host, port = daemon
+    for token in (None, "", "wrong"):
+        sent = dict(data) if token is None else dict(data, token=token)
+        assert request_daemon(sent, host, port) == {"status": "error", "message": "Invalid admin token"}
+    assert request_daemon(dict(data, token="s3cret"), host, port)["status"] == "ok"
+
+
+@pytest.mark.parametrize("daemon", [""], indirect=True)
+@pytest.mark.parametrize("data", ADMIN_REQUESTS)
+def test_admin_ops_are_disabled_without_a_configured_token(daemon, data):
+    host, port = daemon
+    response = request_daemon(dict(data, token=""), host, port)
+    assert response["status"] == "error" and "ADMIN_TOKEN is not set" in response["message"]
+    # Read-only ops stay open
+    assert request_daemon({"op": "snapshot"}, host, port) == {"status": "ok", "snapshot": {"active": None}}
@@ -0,0 +1,86 @@
+# backend/tests/test_pathway_cache.py
+"""
+Rule-based pathway cache tests: responses must be the same with the cache
+on and off, and a caller mutating one response must not change another.
+"""
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from ml_engine import pathway_engine
+from ml_engine.clustering import generate_dummy_dataset
+from ml_engine.pathway_engine import (
+    PathwayModels, generate_learning_pathway, generate_learning_pathway_batch, install_pathway_models,
+)
+
+ASPIRATIONS = ["Data Analyst", "Data Scientist", "Machine Learning Engineer", "Web Developer", "Chef", ""]
+SKILLS = ["python", "excel", "sql", "tableau", "statistics", "html", "css", "javascript", "pandas"]
+
+
+@pytest.fixture(scope="module")
+def trained_models():
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    data = generate_dummy_dataset(n=300).values
+    scaler = StandardScaler().fit(data)
+    kmeans = KMeans(n_clusters=3, n_init=10, random_state=0).fit(scaler.transform(data))
+    with open(os.path.join(os.path.dirname(pathway_engine.__file__), "courses.json"), encoding="utf-8") as f:
+        courses_db = json.load(f)
+    return kmeans, scaler, courses_db
+
+
+@pytest.fixture
+def serve(trained_models, monkeypatch):
+    """serve(cache=True/False) installs fresh pathway state with the cache on or off."""
+    monkeypatch.setattr(pathway_engine, "_next_check", math.inf)  # never re-read the files
+
+    def install(cache: bool):
+        models = PathwayModels(*trained_models, model_version=0, courses_signature=None)
+        if not cache:
+            models.cache.max_entries = 0
+        install_pathway_models(models)
+        return models
+
+    yield install
+    install_pathway_models(None)
+
+
+def random_profiles(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [{
+        "user_profile": {"avg_score": float(rng.random()), "experience_years": float(rng.uniform(0, 6))},
+        "current_skills": list(rng.choice(SKILLS, size=int(rng.integers(0, 6)), replace=False)),
+        "career_aspiration": ASPIRATIONS[int(rng.integers(len(ASPIRATIONS)))],
+    } for _ in range(n)]
+
+
+def test_cache_on_and_off_give_the_same_responses(serve):
+    # Repeats make the second pass hit the cache
+    profiles = random_profiles(200) * 2
+    serve(cache=False)
+    expected = [generate_learning_pathway(**p) for p in profiles]
+    expected_batch = generate_learning_pathway_batch(profiles)
+
+    models = serve(cache=True)
+    assert [generate_learning_pathway(**p) for p in profiles] == expected
+    assert generate_learning_pathway_batch(profiles) == expected_batch == expected
+    assert models.cache.hits > 0
+    assert any(r["recommended_courses"] for r in expected)
+
+
+def test_mutating_a_response_does_not_leak_into_later_ones(serve):
+    profile = random_profiles(1, seed=3)[0]
+    for cache in (True, False):
+        serve(cache=cache)
+        first = generate_learning_pathway(**profile)
+        untouched = json.loads(json.dumps(first))
+        first["recommended_courses"][0]["title"] = "Changed by the caller"
+        first["recommended_courses"].append({"title": "Extra"})
+        assert generate_learning_pathway(**profile) == untouched
+
+        batch = generate_learning_pathway_batch([profile, profile])
+        batch[0]["recommended_courses"][0]["url"] = "changed"
+        assert batch[1] == untouched
@@ -0,0 +1,83 @@
+# backend/tests/test_pipeline.py
+"""
+RecommendationPipeline tests: by default the course search uses the
+retrieval query's own embedding (the rankings inference.py always had),
+computed in the same encoder call as the profile embedding; sharing the
+profile vector for retrieval is opt-in.
+"""
+import numpy as np
+
+from ml_engine.features import build_feature_vector, build_profile_text
+from ml_engine.pipeline import RecommendationPipeline, build_query_text
+
+ASPIRATION = "Data Analyst"
+SKILLS = ["Python", "SQL"]
+
+
+def text_vector(text):
+    """Distinct, deterministic vector per text."""
+    return np.random.default_rng(sum(text.encode("utf-8")) + len(text)).standard_normal(8).astype(np.float32)
+
+
+class StubRecommender:
+    def __init__(self):
+        self.encode_calls = []
+        self.searched_with = None
+
+    def retrieval_mode(self, mode=None):
+        return mode or "dense"
+
+    def encode(self, texts):
+        self.encode_calls.append(list(texts))
+        return np.stack([text_vector(t) for t in texts])
+
+    def recommend_by_vector(self, user_vector, top_k=5, filters=None, snapshot=None, query_text=None, mode=None):
+        self.searched_with = user_vector
+        return []
+
+
+class StubProfiler:
+    def __init__(self):
+        self.predicted_from = None
+
+    def predict_persona(self, user_vector):
+        self.predicted_from = user_vector
+        return 0
+
+    def get_cluster_insights(self, cluster_id):
+        return "persona"
+
+
+def expected_texts():
+    features = build_feature_vector({}, SKILLS, ASPIRATION)
+    profile_text = build_profile_text(ASPIRATION, features.get("extracted_skills", []))
+    return profile_text, build_query_text(ASPIRATION, SKILLS)
+
+
+def test_default_searches_with_the_query_embedding_in_one_encode_call():
+    rec, profiler = StubRecommender(), StubProfiler()
+    RecommendationPipeline(rec, profiler).run(ASPIRATION, SKILLS)
+
+    profile_text, query_text = expected_texts()
+    assert rec.encode_calls == [[profile_text, query_text]]
+    assert np.array_equal(rec.searched_with, text_vector(query_text))
+    assert np.array_equal(profiler.predicted_from, text_vector(profile_text))
+
+
+def test_shared_embedding_is_opt_in():
+    rec, profiler = StubRecommender(), StubProfiler()
+    RecommendationPipeline(rec, profiler, shared_embedding=True).run(ASPIRATION, SKILLS)
+
+    profile_text, _ = expected_texts()
+    assert rec.encode_calls == [[profile_text]]
+    assert np.array_equal(rec.searched_with, text_vector(profile_text))
+    assert np.array_equal(profiler.predicted_from, text_vector(profile_text))
+
+
+def test_lexical_mode_does_not_encode():
+    rec, profiler = StubRecommender(), StubProfiler()
+    out = RecommendationPipeline(rec, profiler).run(ASPIRATION, SKILLS, retrieval="lexical")
+
+    assert rec.encode_calls == []
+    assert rec.searched_with is None
+    assert out["persona_id"] is None and out["retrieval"] == "lexical"
@@ -0,0 +1,175 @@
+# backend/tests/test_retrieval.py
+"""
+Lexical / hybrid retrieval tests: LexicalIndex must score like a plain BM25
+over the weighted fields, lexical match_score must stay in [0, 1] (raw score
+in bm25_score), hybrid must fuse both rankings, and a delta index built
+against a much smaller base must still score its courses positively.
+
+Run from the backend directory: python -m pytest tests
+"""
+import math
+
+import numpy as np
+import pytest
+
+from ml_engine.course_store import CourseStore
+from ml_engine.lexical_index import BM25_B, BM25_K1, FIELD_WEIGHTS, LexicalIndex, tokenize
+from ml_engine.snapshot import CatalogSnapshot
+
+SKILLS = ["Python", "Excel", "Phlebotomy", "Welding", "PCB Assembly", "Tally", "C++", "Nursing",
+          "CNC Machining", "Safety", "Teamwork", "Customer Service"]
+QUERIES = ["phlebotomy", "python excel", "pcb assembly safety", "c++ teamwork", "cnc welding nursing"]
+
+
+def seeded_courses(n: int = 400, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    courses = []
+    for i in range(n):
+        skills = list(rng.choice(SKILLS, size=int(rng.integers(1, 4)), replace=False))
+        courses.append({
+            "id": f"C-{1000 + i}",
+            "title": f"{skills[0]} Specialist - NSQF Level {int(rng.integers(3, 8))}",
+            "description": f"A course covering {' and '.join(skills)} with hands-on practice.",
+            "skills": ", ".join(skills),
+            "sector": ["IT-ITeS", "Healthcare", "Automotive"][i % 3],
+            "nsqf_level": int(rng.integers(3, 8)),
+        })
+    return courses
+
+
+def seeded_vectors(n: int, dim: int = 32, seed: int = 1) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def reference_bm25(courses, query: str) -> np.ndarray:
+    """Plain per-course BM25F loop, the definition LexicalIndex precomputes."""
+    docs = []
+    for course in courses:
+        tf = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(course.get(field)):
+                tf[token] = tf.get(token, 0.0) + weight
+        docs.append(tf)
+    lengths = [sum(tf.values()) for tf in docs]
+    avgdl = sum(lengths) / len(lengths)
+    scores = np.zeros(len(courses))
+    for token in dict.fromkeys(tokenize(query)):
+        df = sum(token in tf for tf in docs)
+        if not df:
+            continue
+        idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+        for i, tf in enumerate(docs):
+            if token in tf:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[i] / avgdl)
+                scores[i] += idf * tf[token] * (BM25_K1 + 1) / (tf[token] + norm)
+    return scores
+
+
+def build_snapshot(courses, vectors=None) -> CatalogSnapshot:
+    vectors = seeded_vectors(len(courses)) if vectors is None else vectors
+    return CatalogSnapshot.build(CourseStore.from_records(courses), vectors)
+
+
+# -------------------------
+# LexicalIndex
+# -------------------------
+@pytest.mark.parametrize("query", QUERIES)
+def test_lexical_scores_match_reference_bm25(query):
+    courses = seeded_courses()
+    store = CourseStore.from_records(courses)
+    scores = LexicalIndex.build(store).score(query, len(store))
+    # Impacts are stored as float16
+    np.testing.assert_allclose(scores, reference_bm25(courses, query), rtol=2e-3, atol=2e-3)
+
+
+def test_lexical_unknown_terms_score_nothing():
+    store = CourseStore.from_records(seeded_courses(20))
+    index = LexicalIndex.build(store)
+    assert index.score("astrophysics", len(store)) is None
+    assert index.score("", len(store)) is None
+    assert index.term_bounds("astrophysics the") == {}
+
+
+# -------------------------
+# CatalogSnapshot.search_lexical
+# -------------------------
+@pytest.mark.parametrize("query", QUERIES)
+def test_lexical_search_ranks_by_bm25_with_match_score_in_unit_range(query):
+    courses = seeded_courses()
+    results = build_snapshot(courses).search_lexical(query, top_k=10)
+    reference = reference_bm25(courses, query)
+    assert results
+    raw = [r["bm25_score"] for r in results]
+    assert raw == sorted(raw, reverse=True)
+    assert raw[0] == pytest.approx(reference.max(), rel=2e-3)
+    for r in results:
+        assert 0.0 < r["match_score"] <= 1.0
+        assert r["bm25_score"] == pytest.approx(reference[int(r["id"][2:]) - 1000], rel=2e-3, abs=2e-3)
+
+
+def test_lexical_match_score_reaches_one_for_a_perfect_match():
+    snap = build_snapshot(seeded_courses())
+    top = snap.search_lexical("phlebotomy", top_k=1)[0]
+    assert top["match_score"] == pytest.approx(1.0)
+
+
+def test_lexical_search_respects_filters():
+    snap = build_snapshot(seeded_courses())
+    results = snap.search_lexical("python", top_k=20, filters={"sector": "Healthcare"})
+    assert results and all(r["sector"] == "Healthcare" for r in results)
+
+
+# -------------------------
+# CatalogSnapshot.search_hybrid
+# -------------------------
+def test_hybrid_alpha_one_is_the_dense_ranking():
+    courses = seeded_courses()
+    snap = build_snapshot(courses)
+    query = seeded_vectors(1, seed=7)[0]
+    dense = [r["id"] for r in snap.search(query, top_k=5)]
+    hybrid = snap.search_hybrid(query, "python", top_k=5, alpha=1.0)
+    assert [r["id"] for r in hybrid] == dense
+
+
+def test_hybrid_alpha_zero_is_the_lexical_ranking():
+    snap = build_snapshot(seeded_courses())
+    query = seeded_vectors(1, seed=7)[0]
+    lexical = snap.search_lexical("pcb assembly safety", top_k=5)
+    hybrid = snap.search_hybrid(query, "pcb assembly safety", top_k=5, alpha=0.0)
+    assert [r["match_score"] for r in hybrid] == pytest.approx(
+        [r["bm25_score"] / lexical[0]["bm25_score"] for r in lexical], abs=1e-6)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_hybrid_match_score_is_bounded(query):
+    snap = build_snapshot(seeded_courses())
+    results = snap.search_hybrid(seeded_vectors(1, seed=3)[0], query, top_k=10)
+    assert len(results) == 10
+    for r in results:
+        assert np.isfinite(r["match_score"]) and -1.0 <= r["match_score"] <= 1.0
+
+
+# -------------------------
+# Delta indexes built against the base statistics
+# -------------------------
+def test_large_upsert_onto_small_base_keeps_positive_scores():
+    base = seeded_courses(5)
+    snap = build_snapshot(base)
+    # Far more delta courses share a term than the base has documents
+    upserts = [{"id": f"N-{i}", "title": f"Phlebotomy Technician {i}", "skills": "Phlebotomy",
+                "description": "Blood collection"} for i in range(50)]
+    snap, missing = snap.with_changes(upserts, seeded_vectors(50, seed=5), [], version=2)
+    assert missing == []
+    impacts = snap.delta.chunks[-1].lexical.impacts.astype(np.float32)
+    assert np.all(np.isfinite(impacts)) and np.all(impacts > 0)
+    # No term can be worth more than a term found in a single course of the catalog
+    assert impacts.max() <= (BM25_K1 + 1) * math.log1p(len(snap))
+
+    results = snap.search_lexical("phlebotomy technician", top_k=10)
+    assert len(results) == 10
+    assert all(r["id"].startswith("N-") for r in results)
+    for r in results:
+        assert np.isfinite(r["match_score"]) and 0.0 < r["match_score"] <= 1.0
+
+    hybrid = snap.search_hybrid(seeded_vectors(1, seed=9)[0], "phlebotomy technician", top_k=10)
+    assert all(np.isfinite(r["match_score"]) and r["match_score"] <= 1.0 for r in hybrid)
@@ -15,12 +15,13 @@ interface Recommendation {
   duration_hours: number;
   provider: string;
   match_score: number;
+  bm25_score?: number;
 }
 
 interface PathwayResponse {
   status: string;
   profile: {
-    persona_id: number;
+    persona_id: number | null;
     persona_label: string;
     inferred_role: string;
   };